@@ -6,11 +6,43 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
-    # Ensure database is initialized
-    from app.models import init_database
+    # Connection pool, returned to on teardown
+    from app import db
+    db.init_app(app)
+
+    # Bounded password hashing pool and login rate limits
+    from app import passwords
+    passwords.init_app(app)
+
+    # Apply schema.sql only if PRAGMA user_version is behind SCHEMA_VERSION
+    from app.models import init_database, SCHEMA_VERSION
     with app.app_context():
-        init_database()
-        print("Database initialized successfully.")
+        if init_database():
+            print(f"Database schema updated to version {SCHEMA_VERSION}.")
+
+    # Catch up the search index on rows written outside the app
+    from app import search
+    search.init_app(app)
+
+    # In-memory donor index for browse_donors
+    from app import donor_index
+    donor_index.init_app(app)
+
+    # Per-request g.current_user backed by a small user cache
+    from app import user_cache
+    user_cache.init_app(app)
+
+    # Cached donor supply forecast for the admin trends page
+    from app import forecast
+    forecast.init_app(app)
+
+    # Background sender for the outbound mail queue
+    from app.utils import email
+    email.init_app(app)
+
+    # Periodic jobs such as the cooldown expiry sweep
+    from app import scheduler
+    scheduler.init_app(app)
 
     # Language Support
     from flask import request, session, g
@@ -0,0 +1,183 @@
+# Daily supply/demand rollups by city and blood type.
+#
+# Triggers (see schema.sql) record every day whose numbers a write may have
+# changed in rollup_dirty_days; refresh_rollups() recomputes only those days
+# with one indexed GROUP BY per metric and day, plus the eligible-donor
+# snapshot for today. The admin trend charts read daily_rollups only.
+import json
+from datetime import date, timedelta
+
+from app.models import get_db_connection
+
+FLOW_COLUMNS = ['requests_created', 'requests_fulfilled', 'requests_cancelled', 'donations', 'new_donors']
+ROLLUP_COLUMNS = FLOW_COLUMNS + ['eligible_donors']
+
+# Each returns (city, blood_type, count) for the day bound to both ?s
+FLOW_QUERIES = {
+    'requests_created': """
+        SELECT city, blood_type_required, COUNT(*) FROM donation_requests
+        WHERE created_at >= ? AND created_at < date(?, '+1 day')
+        GROUP BY city, blood_type_required
+    """,
+    'requests_fulfilled': """
+        SELECT city, blood_type_required, COUNT(*) FROM donation_requests
+        WHERE donation_date >= ? AND donation_date < date(?, '+1 day') AND status = 'fulfilled'
+        GROUP BY city, blood_type_required
+    """,
+    'requests_cancelled': """
+        SELECT city, blood_type_required, COUNT(*) FROM donation_requests
+        WHERE donation_date >= ? AND donation_date < date(?, '+1 day') AND status = 'cancelled'
+        GROUP BY city, blood_type_required
+    """,
+    'donations': """
+        SELECT r.city, r.blood_type_required, COUNT(*) FROM donation_requests r
+        JOIN donations d ON d.request_id = r.id
+        WHERE r.donation_date >= ? AND r.donation_date < date(?, '+1 day') AND d.status != 'cancelled'
+        GROUP BY r.city, r.blood_type_required
+    """,
+    'new_donors': """
+        SELECT city, COALESCE(blood_type, ''), COUNT(*) FROM users
+        WHERE created_at >= ? AND created_at < date(?, '+1 day') AND role IN ('donor', 'both')
+        GROUP BY city, COALESCE(blood_type, '')
+    """,
+}
+
+# Active donors minus those in cooldown; both walk an index rather than users
+ACTIVE_DONORS = """
+    SELECT city, COALESCE(blood_type, ''), COUNT(*) FROM users
+    WHERE role IN ('donor', 'both') AND is_active = 1
+    GROUP BY city, COALESCE(blood_type, '')
+"""
+COOLING_DOWN = """
+    SELECT city, COALESCE(blood_type, ''), COUNT(*) FROM users
+    WHERE is_available = 0 AND role IN ('donor', 'both') AND is_active = 1
+    GROUP BY city, COALESCE(blood_type, '')
+"""
+
+UPSERT = """
+    INSERT INTO daily_rollups (day, city, blood_type, {column}) VALUES (?, ?, ?, ?)
+    ON CONFLICT (day, city, blood_type) DO UPDATE SET {column} = excluded.{column}
+"""
+
+
+def _recompute_day(cursor, day):
+    cursor.execute(
+        f"UPDATE daily_rollups SET {', '.join(c + ' = 0' for c in FLOW_COLUMNS)} WHERE day = ?", (day,)
+    )
+    for column, query in FLOW_QUERIES.items():
+        cursor.execute(query, (day, day))
+        rows = [(day, city, blood_type, count) for city, blood_type, count in cursor.fetchall()]
+        cursor.executemany(UPSERT.format(column=column), rows)
+
+
+def _count_eligible(cursor):
+    # One read transaction, so both counts see the same users
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute(ACTIVE_DONORS)
+        eligible = {(city, blood_type): count for city, blood_type, count in cursor.fetchall()}
+        cursor.execute(COOLING_DOWN)
+        for city, blood_type, count in cursor.fetchall():
+            eligible[(city, blood_type)] = eligible.get((city, blood_type), 0) - count
+    finally:
+        cursor.connection.commit()
+    return eligible
+
+
+def _store_eligible(cursor, day, eligible):
+    cursor.execute("UPDATE daily_rollups SET eligible_donors = 0 WHERE day = ?", (day,))
+    cursor.executemany(
+        UPSERT.format(column='eligible_donors'),
+        [(day, city, blood_type, count) for (city, blood_type), count in eligible.items()],
+    )
+
+
+def refresh_rollups(today=None, days_per_transaction=31):
+    """Recompute the dirty days and today's eligible-donor snapshot.
+
+    Each transaction takes the write lock, so triggers cannot mark a day
+    dirty again between recomputing it and clearing its flag.
+    """
+    today = today or date.today().isoformat()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    refreshed = 0
+    try:
+        # The snapshot reads every donor, so count before taking the write lock
+        eligible = _count_eligible(cursor)
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT day FROM rollup_dirty_days ORDER BY day LIMIT ?", (days_per_transaction,))
+            days = [row[0] for row in cursor.fetchall()]
+            for day in days:
+                _recompute_day(cursor, day)
+            cursor.executemany("DELETE FROM rollup_dirty_days WHERE day = ?", [(day,) for day in days])
+            if len(days) < days_per_transaction:
+                _store_eligible(cursor, today, eligible)
+                # Drop rows that are all zeros, e.g. after a day lost its last request
+                cursor.execute(
+                    f"DELETE FROM daily_rollups WHERE day IN (SELECT value FROM json_each(?)) AND "
+                    f"{' AND '.join(c + ' = 0' for c in ROLLUP_COLUMNS)}",
+                    (json.dumps(days + [today]),),
+                )
+                conn.commit()
+                return {'days': refreshed + len(days)}
+            conn.commit()
+            refreshed += len(days)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def ensure_rollups(conn):
+    """Mark every day with data dirty once, when the rollups are first created."""
+    if conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone() is None:
+        conn.execute("""
+            INSERT OR IGNORE INTO rollup_dirty_days (day)
+            SELECT date(created_at) FROM donation_requests
+            UNION SELECT date(donation_date) FROM donation_requests
+            UNION SELECT date(created_at) FROM users
+        """)
+        conn.commit()
+
+
+def trend(city=None, blood_type=None, days=30, today=None):
+    """Per-day totals over the last `days` days, oldest first, zeros filled in."""
+    end = date.fromisoformat(today) if today else date.today()
+    start = end - timedelta(days=days - 1)
+    query = f"SELECT day, {', '.join(f'SUM({c})' for c in ROLLUP_COLUMNS)} FROM daily_rollups WHERE day >= ? AND day <= ?"
+    params = [start.isoformat(), end.isoformat()]
+    if city:
+        query += " AND city = ?"
+        params.append(city)
+    if blood_type:
+        query += " AND blood_type = ?"
+        params.append(blood_type)
+    query += " GROUP BY day"
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(query, tuple(params))
+    by_day = {row[0]: row[1:] for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        series.append(dict(zip(['day'] + ROLLUP_COLUMNS, (day,) + tuple(by_day.get(day, (0,) * len(ROLLUP_COLUMNS))))))
+    return series
+
+
+def rollup_cities():
+    """Cities that appear in the rollups, for the chart filter."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT city FROM daily_rollups WHERE day >= date('now', '-365 days') ORDER BY city")
+    cities = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return cities
@@ -0,0 +1,196 @@
+import threading
+from array import array
+
+from app.models import DonationRequest, get_db_connection
+from app.utils.email import enqueue
+
+# Eligible = active, available, in the request's city and able to give to the
+# blood type it needs.
+ELIGIBLE_DONORS_QUERY = """
+    SELECT u.id
+    FROM blood_compatibility bc
+    JOIN users u ON u.blood_type = bc.donor_type
+    WHERE bc.recipient_type = ?
+    AND (u.role = 'donor' OR u.role = 'both') AND u.is_active = 1
+    AND u.city = ?
+    AND u.is_available = 1
+"""
+
+
+def fan_out(request, batch_size=1000):
+    """Queue one notification per eligible donor; returns how many were queued.
+
+    Donor ids are streamed into a compact array before any insert so the read
+    never holds a lock the inserts need. Every batch takes its own pooled
+    connection and commits on its own, so neither a connection nor the write
+    lock is held for the whole run.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ELIGIBLE_DONORS_QUERY, (request.blood_type_required, request.city))
+        donor_ids = array('q')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            donor_ids.extend(row[0] for row in rows)
+    finally:
+        cursor.close()
+        conn.close()
+
+    queued = 0
+    for start in range(0, len(donor_ids), batch_size):
+        batch = donor_ids[start:start + batch_size]
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO broadcast_notifications (request_id, donor_id) VALUES (?, ?)",
+                ((request.id, donor_id) for donor_id in batch),
+            )
+            queued += cursor.rowcount
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+    return queued
+
+
+def broadcast_message(request):
+    """Subject and body of the email every donor of a broadcast gets."""
+    body = (
+        f"Urgent: {request.blood_type_required} blood is needed at {request.hospital_location}, "
+        f"{request.city} on {request.donation_date} between {request.donation_time_start} "
+        f"and {request.donation_time_end}.\n\n{request.message or ''}"
+    )
+    return 'Emergency blood donation request', body
+
+
+def queue_mail(request, batch_size=1000):
+    """Hand every queued notification of a broadcast to the outbound mail queue.
+
+    Each batch of notifications and its outbound_mail rows commit in one
+    transaction. Delivery pace is the MailSender's (MAIL_RATE); nothing here
+    throttles. Returns how many messages were queued.
+    """
+    subject, body = broadcast_message(request)
+    queued = 0
+    while True:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # Taking the write lock before the read means two runners of the
+            # same broadcast never queue a donor twice
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT bn.id, u.email
+                FROM broadcast_notifications bn
+                JOIN users u ON u.id = bn.donor_id
+                WHERE bn.request_id = ? AND bn.status = 'queued' AND bn.mail_id IS NULL
+                ORDER BY bn.id
+                LIMIT ?
+            """, (request.id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return queued
+
+            handed, missing = [], []
+            for notification_id, to_email in rows:
+                if to_email:
+                    handed.append((enqueue(cursor, to_email, subject, body), notification_id))
+                else:
+                    missing.append((notification_id,))
+            cursor.executemany(
+                "UPDATE broadcast_notifications SET mail_id = ?, attempts = attempts + 1 WHERE id = ?",
+                handed,
+            )
+            cursor.executemany(
+                "UPDATE broadcast_notifications SET status = 'failed', error = 'donor has no email address' "
+                "WHERE id = ?",
+                missing,
+            )
+            conn.commit()
+            queued += len(handed)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def run_broadcast(app, request_id):
+    """Fan out and queue the mail of one broadcast. Safe to run again: donors
+    already notified or queued are skipped."""
+    with app.app_context():
+        try:
+            request = DonationRequest.get_by_id(request_id)
+            if request is None:
+                return
+            fan_out(request, app.config['BROADCAST_BATCH_SIZE'])
+            queue_mail(request, app.config['BROADCAST_BATCH_SIZE'])
+        except Exception as err:
+            # What is left stays queued for resume_broadcasts
+            print(f"Broadcast {request_id} failed: {err}")
+
+
+def start_broadcast(app, request_id):
+    """Fan out and queue the mail in a background thread so the web request returns at once."""
+    thread = threading.Thread(target=run_broadcast, args=(app, request_id), name=f'broadcast-{request_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def resume_broadcasts(app):
+    """Finish broadcasts with notifications not yet handed to the mail queue,
+    left behind by a restart or a failed run. Returns their request ids."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT request_id FROM broadcast_notifications
+        WHERE status = 'queued' AND mail_id IS NULL
+    """)
+    request_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    for request_id in request_ids:
+        run_broadcast(app, request_id)
+    return request_ids
+
+
+def get_progress(limit=5):
+    """Delivery counts of the most recent broadcasts, newest first.
+
+    A notification handed to the mail queue counts as sent or failed only once
+    the MailSender has dealt with its outbound_mail row.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, blood_type_required, city, created_at FROM donation_requests
+        WHERE is_broadcast = 1
+        ORDER BY created_at DESC
+        LIMIT ?
+    """, (limit,))
+    broadcasts = [dict(r, queued=0, sent=0, failed=0) for r in cursor.fetchall()]
+    for broadcast in broadcasts:
+        cursor.execute("""
+            SELECT CASE
+                       WHEN om.status IS NULL THEN bn.status
+                       WHEN om.status = 'sending' THEN 'queued'
+                       ELSE om.status
+                   END,
+                   COUNT(*)
+            FROM broadcast_notifications bn
+            LEFT JOIN outbound_mail om ON om.id = bn.mail_id
+            WHERE bn.request_id = ?
+            GROUP BY 1
+        """, (broadcast['id'],))
+        for status, count in cursor.fetchall():
+            broadcast[status] = count
+        broadcast['total'] = broadcast['queued'] + broadcast['sent'] + broadcast['failed']
+    cursor.close()
+    conn.close()
+    return broadcasts
@@ -0,0 +1,113 @@
+# Typed date columns for databases created before schema.sql declared them;
+# migration 2 in app/migrations.py.
+#
+# The declared type is what makes sqlite3 hand back date/datetime objects, and
+# SQLite has no ALTER COLUMN. Rebuilding users (with its triggers, FTS table
+# and foreign keys) just to change a type name would be a lot of risk, so the
+# CREATE TABLE text is edited in place instead. 'DATE TEXT' keeps TEXT affinity,
+# so nothing stored on disk changes meaning; this is the writable_schema
+# procedure the SQLite ALTER TABLE docs allow for such changes.
+#
+# Every value is first rewritten to the canonical ISO form the converters
+# expect, in batches. A value that can't be parsed stops the migration until
+# the offending rows are fixed by hand. The final step checks again for
+# values written meanwhile and changes the declared types.
+import re
+from datetime import datetime
+
+# (table, column) -> declared type
+TYPED_COLUMNS = {
+    ('users', 'last_donation_date'): 'DATE',
+    ('users', 'next_eligible_date'): 'DATE',
+    ('donation_requests', 'donation_date'): 'DATE',
+    ('contact_requests', 'approved_at'): 'TIMESTAMP',
+}
+
+# SQLite's own functions give back the canonical form, so values that
+# round-trip through them need no rewrite
+CANONICAL = {'DATE': 'date', 'TIMESTAMP': 'datetime'}
+
+FORMATS = ['%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S']
+
+
+class UnparseableDates(ValueError):
+    def __init__(self, rows):
+        self.rows = rows
+        super().__init__(f"{len(rows)} date values could not be parsed: " +
+                         ', '.join(f"{t}.{c} id={i} {v!r}" for t, c, i, v in rows[:10]))
+
+
+def parse(value, kind):
+    """The canonical text for value, or None if it isn't a date we recognise."""
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if parsed.tzinfo is not None:
+        # datetime('now') is UTC, so stored timestamps are naive UTC
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    if kind == 'DATE':
+        return parsed.date().isoformat()
+    return parsed.isoformat(' ', 'seconds')
+
+
+def pending_tables(conn):
+    """Tables whose CREATE TABLE still declares a typed column as plain TEXT."""
+    pending = {}
+    for (table, column), kind in TYPED_COLUMNS.items():
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        if not re.search(rf'\b{column}\s+{kind}\b', sql):
+            pending.setdefault(table, sql)
+    return pending
+
+
+def normalize(conn, table, column, start=None, end=None):
+    """Rewrite table.column to canonical ISO text for ids in (start, end]; returns rows rewritten."""
+    kind = TYPED_COLUMNS[(table, column)]
+    # CAST so the raw text comes back even if the converter would choke on it
+    query = (f"SELECT id, CAST({column} AS TEXT) FROM {table} "
+             f"WHERE {column} IS NOT NULL AND {CANONICAL[kind]}({column}) IS NOT {column}")
+    params = []
+    if start is not None:
+        query += " AND id > ? AND id <= ?"
+        params = [start, end]
+    updates, bad = [], []
+    for row_id, value in conn.execute(query, params).fetchall():
+        text = parse(value, kind)
+        if text is None:
+            bad.append((table, column, row_id, value))
+        else:
+            updates.append((text, row_id))
+    if bad:
+        raise UnparseableDates(bad)
+    conn.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+    return len(updates)
+
+
+def retype(conn):
+    """Check every column once more, then change the declared types in the stored CREATE TABLE statements."""
+    for table, column in TYPED_COLUMNS:
+        normalize(conn, table, column)
+    pending = pending_tables(conn)
+    if not pending:
+        return
+    conn.execute("PRAGMA writable_schema = ON")
+    try:
+        for table, sql in pending.items():
+            for (t, column), kind in TYPED_COLUMNS.items():
+                if t == table:
+                    sql = re.sub(rf'\b({column})\s+TEXT\b', rf'\1 {kind} TEXT', sql, count=1)
+            conn.execute("UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = ?", (sql, table))
+        # Other connections re-read the schema when the cookie changes
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        conn.execute(f"PRAGMA schema_version = {version + 1}")
+    finally:
+        conn.execute("PRAGMA writable_schema = OFF")
@@ -0,0 +1,414 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from urllib.request import pathname2url
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from flask import current_app, g, has_app_context, request
+
+
+
+# Named PRAGMA sets selectable with Config.DB_TUNING_PROFILE. 'default' keeps
+# SQLite's stock behaviour (rollback journal, synchronous=FULL).
+TUNING_PROFILES = {
+    'default': {},
+    'production': {
+        # Readers no longer block behind a writer and vice versa
+        'journal_mode': 'WAL',
+        # In WAL mode NORMAL only risks the last commits on power loss, not corruption
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # negative means KiB, so ~64 MB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -64000,
+        'busy_timeout': 5000,
+    },
+}
+
+
+# Columns declared DATE or TIMESTAMP in schema.sql (as 'DATE TEXT' so SQLite
+# keeps TEXT affinity) are read back as date/datetime; dates and datetimes
+# passed as parameters are stored in the same ISO form, which sorts and
+# compares correctly in SQL and matches date('now') / datetime('now').
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' ', 'seconds'))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+def apply_profile(conn, profile, readonly=False):
+    for name, value in TUNING_PROFILES[profile].items():
+        # The journal mode is stored in the file; only writers can set it
+        if readonly and name == 'journal_mode':
+            continue
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def file_lock(database):
+    """Hold an exclusive lock on <database>.lock across processes.
+
+    Without fcntl (Windows) nothing is locked; SQLite still locks each
+    statement, and what runs under this lock has to be idempotent anyway.
+    """
+    with open(database + '.lock', 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def try_lock(path):
+    """Take an exclusive lock on path without waiting.
+
+    Returns the open file, which holds the lock until it is closed or the
+    process exits, or None if another process has it. Without fcntl every
+    caller gets it.
+    """
+    handle = open(path, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection became free within the checkout timeout."""
+
+
+class PooledConnection(sqlite3.Connection):
+    # close() hands the connection back to its pool instead of closing it,
+    # so the models can keep their open/close pattern unchanged.
+    _pool = None
+    _in_use = False
+    _checkouts = 0  # bumped on every acquire, so a stale holder can tell it lost the connection
+    _generation = 0  # the pool's generation when opened; older ones are closed on release
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def really_close(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Connections to one database file, reused across requests.
+
+    readonly pools open the file with mode=ro and PRAGMA query_only, so a
+    stray write fails instead of taking the write lock; immutable additionally
+    tells SQLite the file never changes (snapshots), which skips locking. So
+    an immutable pool checks on every checkout whether the file was replaced
+    (by any process) and reopens its connections if it was.
+    """
+
+    def __init__(self, database, size=10, timeout=5.0, profile='default', readonly=False, immutable=False):
+        if profile not in TUNING_PROFILES:
+            raise ValueError(f"unknown SQLite tuning profile: {profile}")
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.profile = profile
+        self.readonly = readonly or immutable
+        self.immutable = immutable
+        self.generation = 0
+        self._file_id = None
+        self._idle = deque()
+        self._opened = 0
+        self._cond = threading.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def _connect(self):
+        if self.readonly:
+            uri = f"file:{pathname2url(os.path.abspath(self.database))}?mode=ro" + ("&immutable=1" if self.immutable else "")
+            conn = sqlite3.connect(uri, uri=True, factory=PooledConnection, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+        # Enable foreign key constraints in SQLite
+        conn.execute('PRAGMA foreign_keys = ON')
+        apply_profile(conn, self.profile, self.readonly)
+        conn._pool = self
+        conn._generation = self.generation
+        return conn
+
+    def _check_file(self):
+        try:
+            stat = os.stat(self.database)
+        except FileNotFoundError:
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._cond:
+            replaced = file_id != self._file_id
+            self._file_id = file_id
+        if replaced:
+            self.recycle()
+
+    def acquire(self):
+        if self.immutable:
+            self._check_file()
+        with self._cond:
+            if not self._idle and self._opened >= self.size:
+                self.waits += 1
+                deadline = time.monotonic() + self.timeout
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no database connection free after {self.timeout}s")
+                    self._cond.wait(remaining)
+            if self._idle:
+                # LIFO: the most recently used connection has the warmest cache
+                conn = self._idle.pop()
+                self.hits += 1
+            else:
+                self._opened += 1
+                self.misses += 1
+                conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                raise
+        conn._in_use = True
+        conn._checkouts += 1
+        return conn
+
+    def release(self, conn):
+        if not conn._in_use:
+            return
+        conn._in_use = False
+        if conn._generation != self.generation:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        conn.really_close()
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+        for conn in idle:
+            conn.really_close()
+
+    def recycle(self):
+        """Reopen every connection, e.g. after the file was replaced: idle ones
+        now, those in use when they come back."""
+        with self._cond:
+            self.generation += 1
+        self.close_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'profile': self.profile,
+                'readonly': self.readonly,
+                'size': self.size,
+                'opened': self._opened,
+                'idle': len(self._idle),
+                'in_use': self._opened - len(self._idle),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, size=10, timeout=5.0, profile='default', readonly=False, immutable=False):
+    """Return the process-wide pool for a database file and mode, creating it on first use."""
+    key = (database, readonly, immutable)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and pool.profile != profile:
+            # Connections carry the PRAGMAs they were opened with
+            pool.close_all()
+            pool = None
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(database, size, timeout, profile, readonly, immutable)
+        else:
+            pool.size = size
+            pool.timeout = timeout
+        return pool
+
+
+def _default_pool():
+    if has_app_context() and 'db_pool' in current_app.extensions:
+        return current_app.extensions['db_pool']
+    from config import Config
+    return get_pool(Config.DATABASE, Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT,
+                    Config.DB_TUNING_PROFILE)
+
+
+def _reader_pool(reader):
+    extensions = current_app.extensions
+    if reader == 'snapshot':
+        snapshot = extensions.get('db_snapshot_pool')
+        if snapshot is not None and os.path.exists(snapshot.database):
+            return snapshot
+    return extensions.get('db_read_pool')
+
+
+def connect():
+    pool = _default_pool()
+    if has_app_context() and g.get('_db_reader'):
+        pool = _reader_pool(g._db_reader) or pool
+    conn = pool.acquire()
+    if has_app_context():
+        # Remember the checkout so teardown can return it if a handler forgot to.
+        # A connection closed here may already be checked out again elsewhere,
+        # so only entries whose checkout count still matches are ours.
+        checkouts = [(c, n) for c, n in g.get('_db_checkouts', ()) if c._in_use and c._checkouts == n]
+        checkouts.append((conn, conn._checkouts))
+        g._db_checkouts = checkouts
+    return conn
+
+
+def release_request_connections(exc=None):
+    for conn, checkout in g.pop('_db_checkouts', []):
+        if conn._in_use and conn._checkouts == checkout:
+            conn.close()
+
+
+@contextmanager
+def reading(reader='read'):
+    """Open connections from the read-only pool ('read') or the snapshot
+    ('snapshot', falling back to 'read') inside this block. Nothing written
+    in the block can succeed."""
+    previous = g.get('_db_reader')
+    g._db_reader = reader
+    try:
+        yield
+    finally:
+        g._db_reader = previous
+
+
+# GET requests read through the read-only pool unless the view is marked:
+#   @db.writes   a GET that changes data (links such as /toggle_user/<id>)
+#   @db.reports  long reads that are fine a few minutes stale: the snapshot
+def writes(view):
+    view.db_reader = None
+    return view
+
+
+def reports(view):
+    view.db_reader = 'snapshot'
+    return view
+
+
+def route_request():
+    if request.method in ('GET', 'HEAD'):
+        view = current_app.view_functions.get(request.endpoint)
+        g._db_reader = getattr(view, 'db_reader', 'read')
+
+
+def end_request(exc=None):
+    # g outlives the request when the app context was pushed around it
+    g.pop('_db_reader', None)
+
+
+def refresh_snapshot(app):
+    """Copy the database into DB_SNAPSHOT_PATH with the backup API, then swap it in."""
+    snapshot = app.extensions['db_snapshot_pool']
+    started = time.perf_counter()
+    # Named per process in case two refresh at once (no scheduler lock
+    # without fcntl). Pools in other processes see the new file on their next
+    # checkout; this one reopens now.
+    partial = f"{snapshot.database}.{os.getpid()}.tmp"
+    source = app.extensions['db_read_pool'] or app.extensions['db_pool']
+    src = source.acquire()
+    try:
+        dst = sqlite3.connect(partial)
+        try:
+            # One step: in WAL mode the copy doesn't block writers, and a
+            # stepped copy restarts whenever they commit
+            src.backup(dst)
+            # The copy is never written, so it needs no -wal/-shm files
+            dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(partial, snapshot.database)
+    snapshot.recycle()
+    return {'bytes': os.path.getsize(snapshot.database),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def init_app(app):
+    app.extensions['db_pool'] = get_pool(
+        app.config['DATABASE'],
+        app.config['DB_POOL_SIZE'],
+        app.config['DB_POOL_TIMEOUT'],
+        app.config['DB_TUNING_PROFILE'],
+    )
+    # Readers get their own connections so they never wait for a free writer one
+    app.extensions['db_read_pool'] = None
+    if app.config['DB_READ_POOL_SIZE'] > 0:
+        app.extensions['db_read_pool'] = get_pool(
+            app.config['DATABASE'],
+            app.config['DB_READ_POOL_SIZE'],
+            app.config['DB_POOL_TIMEOUT'],
+            app.config['DB_TUNING_PROFILE'],
+            readonly=True,
+        )
+    app.extensions['db_snapshot_pool'] = None
+    if app.config['DB_SNAPSHOT_PATH']:
+        app.extensions['db_snapshot_pool'] = get_pool(
+            app.config['DB_SNAPSHOT_PATH'],
+            app.config['DB_READ_POOL_SIZE'] or app.config['DB_POOL_SIZE'],
+            app.config['DB_POOL_TIMEOUT'],
+            app.config['DB_TUNING_PROFILE'],
+            immutable=True,
+        )
+    app.before_request(route_request)
+    app.teardown_request(end_request)
+    app.teardown_appcontext(release_request_connections)
@@ -0,0 +1,208 @@
+import sys
+import threading
+
+from flask import current_app, has_app_context
+
+from app.matching import donor_types_for
+from app.models import get_db_connection, users_changed
+
+DONOR_COLUMNS = "id, name, city, blood_type, is_available, next_eligible_date, last_donation_date"
+
+
+class DonorRecord:
+    __slots__ = ('id', 'name', 'city', 'blood_type', 'is_available', 'next_eligible_date', 'last_donation_date')
+
+    def __init__(self, id, name, city, blood_type, is_available, next_eligible_date, last_donation_date):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.blood_type = blood_type
+        self.is_available = is_available
+        self.next_eligible_date = next_eligible_date
+        self.last_donation_date = last_donation_date
+
+    def __getitem__(self, column):
+        # Lets records stand in for sqlite3.Row results
+        return getattr(self, column)
+
+    @property
+    def key(self):
+        return (self.city, self.blood_type)
+
+
+class DonorIndex:
+    """In-process index of active donors bucketed by (city, blood_type).
+
+    Local writes are applied through the users_changed signal. Writes made by
+    other processes are picked up from the user_changes log: every lookup
+    compares the newest log entry with the last one applied, and only reloads
+    the users that changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._by_id = {}
+        self._seq = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    # -- loading -----------------------------------------------------------
+
+    def rebuild(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM user_changes")
+        seq = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT {DONOR_COLUMNS} FROM users WHERE (role = 'donor' OR role = 'both') AND is_active = 1"
+        )
+        buckets, by_id = {}, {}
+        for row in cursor:
+            record = DonorRecord(*row)
+            by_id[record.id] = record
+            buckets.setdefault(record.key, {})[record.id] = record
+        cursor.close()
+        with self._lock:
+            self._buckets, self._by_id, self._seq = buckets, by_id, seq
+            self.rebuilds += 1
+
+    def _reload(self, conn, user_ids):
+        placeholders = ', '.join('?' * len(user_ids))
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {DONOR_COLUMNS} FROM users WHERE id IN ({placeholders}) "
+            "AND (role = 'donor' OR role = 'both') AND is_active = 1",
+            tuple(user_ids),
+        )
+        fresh = {row[0]: DonorRecord(*row) for row in cursor}
+        cursor.close()
+        with self._lock:
+            for user_id in user_ids:
+                old = self._by_id.pop(user_id, None)
+                if old is not None:
+                    bucket = self._buckets[old.key]
+                    bucket.pop(user_id, None)
+                    if not bucket:
+                        del self._buckets[old.key]
+                record = fresh.get(user_id)
+                if record is not None:
+                    self._by_id[user_id] = record
+                    self._buckets.setdefault(record.key, {})[user_id] = record
+
+    def refresh(self, user_ids):
+        """Re-read the given users; called after local writes."""
+        if self._seq is None or not user_ids:
+            return
+        conn = get_db_connection()
+        try:
+            self._reload(conn, list(set(user_ids)))
+        finally:
+            conn.close()
+
+    def sync(self):
+        conn = get_db_connection()
+        try:
+            if self._seq is None:
+                self.misses += 1
+                self.rebuild(conn)
+                return
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(seq) FROM user_changes")
+            latest = cursor.fetchone()[0] or 0
+            if latest == self._seq:
+                self.hits += 1
+                cursor.close()
+                return
+            self.misses += 1
+            cursor.execute("SELECT seq, user_id FROM user_changes WHERE seq > ? ORDER BY seq", (self._seq,))
+            changes = cursor.fetchall()
+            cursor.close()
+            if not changes or changes[0][0] != self._seq + 1:
+                # The log was trimmed past our position
+                self.rebuild(conn)
+                return
+            self._reload(conn, list({user_id for _, user_id in changes}))
+            with self._lock:
+                self._seq = max(self._seq, changes[-1][0])
+        finally:
+            conn.close()
+
+    # -- lookups -----------------------------------------------------------
+
+    def _bucket_records(self, keys):
+        with self._lock:
+            records = []
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket:
+                    records.extend(bucket.values())
+            return records
+
+    def get_active_donors(self, city=None, blood_type=None):
+        """Same rows as User.get_active_donors, served from memory."""
+        self.sync()
+        if city and blood_type:
+            keys = [(city, blood_type)]
+        else:
+            with self._lock:
+                keys = [k for k in self._buckets
+                        if (not city or k[0] == city) and (not blood_type or k[1] == blood_type)]
+        return sorted(self._bucket_records(keys), key=lambda r: r.id)
+
+    def get_compatible_donors(self, blood_type, city=None, available_only=False):
+        """Same ranking as User.get_compatible_donors, served from memory."""
+        self.sync()
+        donor_types = donor_types_for(blood_type)
+        with self._lock:
+            keys = [k for k in self._buckets if k[1] in donor_types and (not city or k[0] == city)]
+        records = self._bucket_records(keys)
+        if available_only:
+            records = [r for r in records if r.is_available]
+        records.sort(key=lambda r: (
+            r.blood_type != blood_type,
+            not r.is_available,
+            r.last_donation_date is not None,
+            r.last_donation_date or '',
+        ))
+        return records
+
+    # -- metrics -----------------------------------------------------------
+
+    def memory_bytes(self):
+        with self._lock:
+            total = sys.getsizeof(self._by_id) + sys.getsizeof(self._buckets)
+            total += sum(sys.getsizeof(b) for b in self._buckets.values())
+            total += sum(sys.getsizeof(r) for r in self._by_id.values())
+        return total
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'donors': len(self._by_id),
+            'buckets': len(self._buckets),
+            'memory_bytes': self.memory_bytes(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'rebuilds': self.rebuilds,
+            'log_position': self._seq,
+        }
+
+
+def get_donor_index():
+    if has_app_context():
+        return current_app.extensions.get('donor_index')
+    return None
+
+
+def _on_users_changed(sender, user_ids=(), **extra):
+    index = get_donor_index()
+    if index is not None:
+        index.refresh(user_ids)
+
+
+def init_app(app):
+    if app.config['DONOR_INDEX_ENABLED']:
+        app.extensions['donor_index'] = DonorIndex()
+        users_changed.connect(_on_users_changed)
@@ -0,0 +1,132 @@
+# Streaming admin exports.
+#
+# Rows are read in keyset chunks on the primary key, each chunk on its own
+# short read from the pool, so an export of any size keeps one chunk in
+# memory and never pins a lock for longer than a chunk takes to read. That
+# also means a long export is not a single snapshot: rows written while it
+# runs may or may not be included.
+import csv
+import io
+import json
+import zlib
+
+from app.models import get_db_connection
+
+
+class Export:
+    def __init__(self, name, table, columns, date_column, city_column, joins=''):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.date_column = date_column
+        self.city_column = city_column
+        self.joins = joins
+
+    @property
+    def headers(self):
+        return [c.split('.')[-1].split(' AS ')[-1] for c in self.columns]
+
+
+EXPORTS = {
+    # Never password_hash
+    'users': Export('users', 'users t', [
+        't.id', 't.role', 't.name', 't.phone', 't.email', 't.city', 't.blood_type', 't.nni',
+        't.is_available', 't.last_donation_date', 't.next_eligible_date', 't.is_active', 't.created_at',
+    ], 't.created_at', 't.city'),
+    'donation_requests': Export('donation_requests', 'donation_requests t', [
+        't.id', 't.requester_id', 't.blood_type_required', 't.city', 't.hospital_location',
+        't.donation_date', 't.donation_time_start', 't.donation_time_end', 't.message', 't.status',
+        't.is_broadcast', 't.created_at',
+    ], 't.created_at', 't.city'),
+    'donations': Export('donations', 'donations t', [
+        't.id', 't.request_id', 't.donor_id', 't.status', 't.completed_at',
+        'r.city', 'r.blood_type_required', 'r.donation_date',
+    ], 'r.donation_date', 'r.city', joins='JOIN donation_requests r ON r.id = t.request_id'),
+    'contact_requests': Export('contact_requests', 'contact_requests t', [
+        't.id', 't.requester_id', 't.donor_id', 't.status', 't.created_at', 't.approved_at',
+        'u.city AS donor_city',
+    ], 't.created_at', 'u.city', joins='JOIN users u ON u.id = t.donor_id'),
+}
+
+
+def iter_rows(export, since=None, until=None, city=None, batch_size=5000):
+    """Yield the export's rows as tuples, in id order, one chunk per query.
+
+    since/until are inclusive YYYY-MM-DD dates.
+    """
+    where, params = [], []
+    if since:
+        where.append(f"{export.date_column} >= ?")
+        params.append(since)
+    if until:
+        where.append(f"{export.date_column} < date(?, '+1 day')")
+        params.append(until)
+    if city:
+        where.append(f"{export.city_column} = ?")
+        params.append(city)
+    query = f"""
+        SELECT {', '.join(export.columns)} FROM {export.table} {export.joins}
+        WHERE t.id > ? {''.join(' AND ' + w for w in where)}
+        ORDER BY t.id LIMIT ?
+    """
+
+    last_id = 0
+    while True:
+        conn = get_db_connection()
+        try:
+            rows = [tuple(r) for r in conn.execute(query, (last_id, *params, batch_size))]
+        finally:
+            conn.close()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _buffered(lines, chunk_bytes):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def csv_lines(export, rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(export.headers)
+    for row in rows:
+        writer.writerow(row)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+
+def jsonl_lines(export, rows):
+    headers = export.headers
+    for row in rows:
+        # Typed date columns come back as date/datetime; str() is their stored ISO form
+        yield json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(name, fmt='csv', compress=False, chunk_bytes=64 * 1024, **options):
+    """Body of an export as an iterator of byte chunks; options go to iter_rows."""
+    export = EXPORTS[name]
+    rows = iter_rows(export, **options)
+    lines = jsonl_lines(export, rows) if fmt == 'jsonl' else csv_lines(export, rows)
+    chunks = _buffered(lines, chunk_bytes)
+    return gzip_chunks(chunks) if compress else chunks
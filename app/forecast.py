@@ -0,0 +1,175 @@
+# Donor supply forecast.
+#
+# Supply for (city, blood type) on a day is every active donor who is
+# available now plus those whose next_eligible_date has come by then. Demand
+# is the open requests scheduled that day. A day is flagged as a shortage
+# when the donors able to give to the requested type (any compatible type in
+# the same city) are fewer than FORECAST_DONORS_PER_REQUEST per request.
+#
+# Donors put on hold by Donation.create without a next_eligible_date have no
+# known return date and are left out of the supply.
+#
+# The result is cached until users (user_changes) or donation_requests
+# (data_versions) change, or the date rolls over.
+import threading
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from flask import current_app, has_app_context
+
+from app.matching import donor_types_for
+from app.models import get_db_connection
+
+# Both group in index order (role first) so SQLite needs no temp B-tree;
+# compute() folds donor and both together.
+AVAILABLE_DONORS = """
+    SELECT role, city, blood_type, COUNT(*) FROM users
+    WHERE role IN ('donor', 'both') AND is_active = 1
+    GROUP BY role, city, blood_type
+"""
+
+# Donors on hold per return date (NULL when unknown), from the covering
+# partial index idx_users_cooldown_supply
+COOLING_DOWN = """
+    SELECT role, city, blood_type, next_eligible_date, COUNT(*) FROM users
+    WHERE is_available = 0 AND role IN ('donor', 'both') AND is_active = 1
+    GROUP BY role, city, blood_type, next_eligible_date
+"""
+
+OPEN_DEMAND = """
+    SELECT city, blood_type_required, donation_date, COUNT(*) FROM donation_requests
+    WHERE status = 'open' AND donation_date >= ? AND donation_date < ?
+    GROUP BY city, blood_type_required, donation_date
+"""
+
+
+def _data_version(cursor):
+    cursor.execute("SELECT MAX(seq) FROM user_changes")
+    users = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT version FROM data_versions WHERE name = 'donation_requests'")
+    row = cursor.fetchone()
+    return users, row[0] if row else 0
+
+
+class SupplyForecast:
+    def __init__(self, days=90, donors_per_request=3):
+        self.days = days
+        self.donors_per_request = donors_per_request
+        self._lock = threading.Lock()
+        self._key = None
+        self._result = None
+        self.hits = 0
+        self.misses = 0
+        self.last_compute_ms = None
+
+    def compute(self, conn, start):
+        """Build the forecast from the database, starting at `start` (a date)."""
+        days = self.days
+        end = start + timedelta(days=days)
+        cursor = conn.cursor()
+
+        # One read transaction, so all three queries see the same users and requests
+        cursor.execute("BEGIN")
+        try:
+            # Donors available today: all active donors minus those on hold
+            today_supply = {}
+            cursor.execute(AVAILABLE_DONORS)
+            for _, city, bt, count in cursor.fetchall():
+                key = (city, bt or '')
+                today_supply[key] = today_supply.get(key, 0) + count
+
+            # Donors coming back, bucketed by day offset; overdue ones count from day 0
+            returning = {}
+            cursor.execute(COOLING_DOWN)
+            for _, city, bt, eligible_on, count in cursor.fetchall():
+                key = (city, bt or '')
+                today_supply[key] = today_supply.get(key, 0) - count
+                if eligible_on is None or eligible_on >= end:
+                    continue
+                offset = max((eligible_on - start).days, 0)
+                returning.setdefault(key, [0] * days)[offset] += count
+
+            supply = {}
+            for key in set(today_supply) | set(returning):
+                buckets = returning.get(key, [0] * days)
+                buckets[0] += today_supply.get(key, 0)
+                supply[key] = list(accumulate(buckets))
+
+            demand = {}
+            cursor.execute(OPEN_DEMAND, (start, end))
+            for city, bt, donation_date, count in cursor.fetchall():
+                offset = (donation_date - start).days
+                demand.setdefault((city, bt), [0] * days)[offset] += count
+        finally:
+            conn.commit()
+            cursor.close()
+
+        shortages = []
+        zeros = [0] * days
+        for (city, bt), needed in demand.items():
+            sources = [supply.get((city, donor_type), zeros) for donor_type in donor_types_for(bt)]
+            for offset, requests in enumerate(needed):
+                if not requests:
+                    continue
+                available = sum(s[offset] for s in sources)
+                if available < requests * self.donors_per_request:
+                    shortages.append({
+                        'day': (start + timedelta(days=offset)).isoformat(),
+                        'city': city,
+                        'blood_type': bt,
+                        'requests': requests,
+                        'compatible_donors': available,
+                        'needed': requests * self.donors_per_request,
+                    })
+        shortages.sort(key=lambda s: (s['day'], s['compatible_donors'] - s['needed']))
+        return {'start': start.isoformat(), 'days': days, 'supply': supply, 'demand': demand, 'shortages': shortages}
+
+    def get(self, today=None):
+        """The cached forecast, recomputed only if the data or the date changed."""
+        start = date.fromisoformat(today) if today else date.today()
+        conn = get_db_connection()
+        try:
+            key = (start,) + _data_version(conn.cursor())
+            with self._lock:
+                if key == self._key:
+                    self.hits += 1
+                    return self._result
+                self.misses += 1
+                started = time.perf_counter()
+                result = self.compute(conn, start)
+                self.last_compute_ms = round((time.perf_counter() - started) * 1000, 2)
+                self._key, self._result = key, result
+                return result
+        finally:
+            conn.close()
+
+    def supply_on(self, city, blood_type, day, today=None):
+        """Donors of exactly this type expected to be eligible in city on day."""
+        result = self.get(today)
+        offset = (date.fromisoformat(day) - date.fromisoformat(result['start'])).days
+        if not 0 <= offset < result['days']:
+            raise ValueError(f"{day} is outside the forecast window")
+        return result['supply'].get((city, blood_type), [0] * result['days'])[offset]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'last_compute_ms': self.last_compute_ms,
+            'shortages': len(self._result['shortages']) if self._result else None,
+        }
+
+
+def get_supply_forecast():
+    if has_app_context():
+        return current_app.extensions.get('supply_forecast')
+    return None
+
+
+def init_app(app):
+    app.extensions['supply_forecast'] = SupplyForecast(
+        app.config['FORECAST_DAYS'], app.config['FORECAST_DONORS_PER_REQUEST'],
+    )
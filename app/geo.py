@@ -0,0 +1,139 @@
+import math
+import threading
+
+from flask import current_app, has_app_context
+
+from app.models import get_db_connection
+
+EARTH_RADIUS_KM = 6371.0
+# Largest radius browse_donors searches; CityGrid.within's cost grows with its square
+MAX_RADIUS_KM = 500
+KM_PER_DEGREE = 111.2
+
+# Default gazetteer: (name, latitude, longitude). Seeded into the cities table
+# on startup; more towns can be inserted there directly. Donor and request
+# city values have to match these names to be found by distance.
+GAZETTEER = [
+    ('Nouakchott', 18.0735, -15.9582),
+    ('Nouadhibou', 20.9310, -17.0347),
+    ('Rosso', 16.5138, -15.8050),
+    ('Kaedi', 16.1517, -13.5050),
+    ('Kiffa', 16.6202, -11.4044),
+    ('Atar', 20.5170, -13.0499),
+    ('Zouerat', 22.7354, -12.4714),
+    ('Selibaby', 15.1585, -12.1843),
+    ('Nema', 16.6170, -7.2500),
+    ('Aleg', 17.0531, -13.9164),
+    ('Boutilimit', 17.5500, -14.7000),
+    ('Tidjikja', 18.5564, -11.4271),
+    ('Akjoujt', 19.7460, -14.3850),
+    ('Ayoun el Atrous', 16.6614, -9.6149),
+    ('Boghe', 16.5883, -14.2722),
+    ('Bababe', 16.3333, -13.9500),
+    ('Mbout', 16.0244, -12.5833),
+    ('Guerou', 16.8167, -11.8333),
+    ('Tintane', 16.4114, -10.1711),
+    ('Timbedra', 16.2447, -8.1675),
+    ('Fderik', 22.6833, -12.7167),
+    ('Chinguetti', 20.4636, -12.3594),
+    ('Ouadane', 20.9333, -11.6167),
+    ('Maghama', 15.5167, -12.8500),
+    ('Kankossa', 15.9358, -11.5153),
+]
+
+
+def seed_cities(conn):
+    """Fill the cities table with the default gazetteer; safe to run on every startup."""
+    conn.executemany("INSERT OR IGNORE INTO cities (name, latitude, longitude) VALUES (?, ?, ?)", GAZETTEER)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class CityGrid:
+    """Uniform lat/lon grid over the gazetteer for radius queries."""
+
+    def __init__(self, cities, cell_degrees=1.0):
+        self.cell_degrees = cell_degrees
+        self._cells = {}
+        self._locations = {}
+        for name, lat, lon in cities:
+            self._locations[name.lower()] = (name, lat, lon)
+            self._cells.setdefault(self._cell(lat, lon), []).append((name, lat, lon))
+
+    @classmethod
+    def load(cls, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, latitude, longitude FROM cities")
+        grid = cls(cursor.fetchall())
+        cursor.close()
+        return grid
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def location(self, city):
+        """(name, lat, lon) for a city name, case-insensitively, or None."""
+        return self._locations.get(city.strip().lower()) if city else None
+
+    def within(self, lat, lon, radius_km):
+        """Cities within radius_km of a point as (name, distance_km), nearest first."""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - lat_span, lon - lon_span)
+        lat_hi, lon_hi = self._cell(lat + lat_span, lon + lon_span)
+
+        found = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                for name, c_lat, c_lon in self._cells.get((i, j), ()):
+                    distance = haversine_km(lat, lon, c_lat, c_lon)
+                    if distance <= radius_km:
+                        found.append((name, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+_grid_lock = threading.Lock()
+
+
+def get_city_grid():
+    app = current_app._get_current_object()
+    with _grid_lock:
+        grid = app.extensions.get('city_grid')
+        if grid is None:
+            conn = get_db_connection()
+            try:
+                grid = app.extensions['city_grid'] = CityGrid.load(conn)
+            finally:
+                conn.close()
+        return grid
+
+
+def nearest_donors(city, blood_type, k=10, radius_km=100, source=None):
+    """Up to k available donors compatible with blood_type, nearest city first.
+
+    Returns a list of (donor, distance_km). source is anything with the
+    User.get_compatible_donors signature (the User model or the donor index).
+    Returns None when the origin city is not in the gazetteer.
+    """
+    if source is None:
+        from app.donor_index import get_donor_index
+        from app.models import User
+        source = (get_donor_index() if has_app_context() else None) or User
+
+    grid = get_city_grid()
+    origin = grid.location(city)
+    if origin is None:
+        return None
+
+    results = []
+    for name, distance in grid.within(origin[1], origin[2], radius_km):
+        for donor in source.get_compatible_donors(blood_type, name, available_only=True):
+            results.append((donor, round(distance, 1)))
+            if len(results) >= k:
+                return results
+    return results
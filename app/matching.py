@@ -0,0 +1,51 @@
+# Blood-type compatibility rules (red cell donation).
+#
+# Each ABO/Rh type is encoded as a bitmask of the antigens present on the red
+# cells. A donor can give to a recipient when the donor carries no antigen the
+# recipient lacks: donor_mask & ~recipient_mask == 0. The resulting pairs are
+# stored in the blood_compatibility table so the matching queries can join on
+# it instead of comparing blood types for equality.
+
+ANTIGEN_A = 1
+ANTIGEN_B = 2
+ANTIGEN_RH = 4
+
+BLOOD_TYPE_MASKS = {
+    'O-': 0,
+    'O+': ANTIGEN_RH,
+    'A-': ANTIGEN_A,
+    'A+': ANTIGEN_A | ANTIGEN_RH,
+    'B-': ANTIGEN_B,
+    'B+': ANTIGEN_B | ANTIGEN_RH,
+    'AB-': ANTIGEN_A | ANTIGEN_B,
+    'AB+': ANTIGEN_A | ANTIGEN_B | ANTIGEN_RH,
+}
+
+
+def can_donate(donor_type, recipient_type):
+    donor_mask = BLOOD_TYPE_MASKS.get(donor_type)
+    recipient_mask = BLOOD_TYPE_MASKS.get(recipient_type)
+    if donor_mask is None or recipient_mask is None:
+        # 'Unknown' or missing blood types never match
+        return False
+    return donor_mask & ~recipient_mask == 0
+
+
+def compatibility_pairs():
+    return [(d, r) for d in BLOOD_TYPE_MASKS for r in BLOOD_TYPE_MASKS if can_donate(d, r)]
+
+
+def recipient_types_for(donor_type):
+    return [r for r in BLOOD_TYPE_MASKS if can_donate(donor_type, r)]
+
+
+def donor_types_for(recipient_type):
+    return [d for d in BLOOD_TYPE_MASKS if can_donate(d, recipient_type)]
+
+
+def seed_compatibility(conn):
+    """Fill the blood_compatibility table; safe to run on every startup."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO blood_compatibility (donor_type, recipient_type) VALUES (?, ?)",
+        compatibility_pairs(),
+    )
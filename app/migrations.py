@@ -0,0 +1,333 @@
+# Versioned migrations for databases that already exist.
+#
+# schema.sql always describes the latest shape, so a new database is created
+# from it directly and stamped with every version here. An existing database
+# runs its pending migrations in order first (init_database on startup, or
+# python migrate.py by hand), then schema.sql is applied over it as before.
+# The schema_migrations table records what ran, and how far.
+#
+# A migration is a list of steps:
+#   SQL, Call     run in one write transaction, together with recording the step
+#   AddColumn     ALTER TABLE ... ADD COLUMN only rewrites the schema, not the
+#                 rows, so it is instant on any table; skipped if the column
+#                 exists, or the table doesn't yet (schema.sql, applied after
+#                 the migrations, creates it with the column)
+#   CreateIndex   has to read the whole table and holds the write lock while it
+#                 builds (about a second per million rows), so keep it on
+#                 narrow columns or use a partial index
+#   Backfill      anything that touches every row: runs over rowid windows of
+#                 batch_size rows, one short transaction each with the position
+#                 saved, so writers get the lock between batches and a run that
+#                 stops picks up where it left off
+#
+# Never edit a migration that has shipped; add the next version. Steps must
+# not commit themselves (no executescript).
+import time
+from collections import namedtuple
+
+from app import date_columns
+
+# A writer that finds the database locked backs off in SQLite's busy handler
+# for up to 100ms at a time, so back-to-back batches starve it even when each
+# one is short; the pause gives it a window to get in.
+BATCH_SIZE = 1000
+PAUSE = 0.02
+
+Migration = namedtuple('Migration', 'version name steps')
+
+
+class Step:
+    description = ''
+
+    def estimate(self, conn):
+        """Rows the step will go through, for the dry-run plan."""
+        return 0
+
+
+class SQL(Step):
+    def __init__(self, *statements, description=None):
+        self.statements = statements
+        self.description = description or statements[0].strip().splitlines()[0]
+
+    def run(self, conn):
+        for statement in self.statements:
+            conn.execute(statement)
+
+
+class Call(Step):
+    def __init__(self, func, description):
+        self.func = func
+        self.description = description
+
+    def run(self, conn):
+        self.func(conn)
+
+
+class AddColumn(Step):
+    def __init__(self, table, column, definition):
+        self.table, self.column = table, column
+        self.description = f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+
+    def run(self, conn):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+        if columns and self.column not in columns:
+            conn.execute(self.description)
+
+
+class CreateIndex(SQL):
+    def __init__(self, name, table, columns, where=None):
+        self.table = table
+        statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        if where:
+            statement += f" WHERE {where}"
+        super().__init__(statement)
+
+    def estimate(self, conn):
+        return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class Backfill(Step):
+    """batch(conn, start, end) changes the rows with start < rowid <= end.
+
+    needed(conn), if given, can say the table is already done (created by a
+    later schema.sql) so the scan is skipped.
+    """
+
+    def __init__(self, table, batch, description, needed=None):
+        self.table = table
+        self.batch = batch
+        self.description = description
+        self.needed = needed
+
+    def estimate(self, conn, start=0):
+        if self.needed and not self.needed(conn):
+            return 0
+        return conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE rowid > ?", (start,)).fetchone()[0]
+
+
+def _normalize(table, column):
+    return Backfill(table, lambda conn, start, end: date_columns.normalize(conn, table, column, start, end),
+                    f"rewrite {table}.{column} as ISO text",
+                    needed=lambda conn: table in date_columns.pending_tables(conn))
+
+
+MIGRATIONS = [
+    # schema.sql as of the move to SQLite. It already has everything
+    # migrate_db.py and migrate_phase2/4/5/6.py did to the MySQL database.
+    Migration(1, 'baseline', []),
+    Migration(2, 'typed_date_columns', [
+        *[_normalize(table, column) for table, column in date_columns.TYPED_COLUMNS],
+        Call(date_columns.retype, "check for values written meanwhile, declare DATE/TIMESTAMP types"),
+    ]),
+    # The users_fts triggers called search_normalize() and name_skeleton(),
+    # which only exist on the app's own connections, so any other writer
+    # failed. They now queue the row and app/search.py writes the entry.
+    Migration(3, 'users_search_queue', [
+        SQL("""
+            CREATE TABLE IF NOT EXISTS search_pending (
+                tbl TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                PRIMARY KEY (tbl, row_id)
+            ) WITHOUT ROWID
+        """,
+            "DROP TRIGGER IF EXISTS trg_users_fts_insert",
+            "DROP TRIGGER IF EXISTS trg_users_fts_update",
+            "DROP TRIGGER IF EXISTS trg_users_fts_delete",
+            """
+            CREATE TRIGGER trg_users_fts_insert AFTER INSERT ON users
+            BEGIN
+                INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('users', NEW.id);
+            END
+        """,
+            """
+            CREATE TRIGGER trg_users_fts_update AFTER UPDATE OF name, email, phone, city ON users
+            BEGIN
+                INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('users', NEW.id);
+            END
+        """,
+            """
+            CREATE TRIGGER trg_users_fts_delete AFTER DELETE ON users
+            BEGIN
+                DELETE FROM users_fts WHERE rowid = OLD.id;
+                DELETE FROM search_pending WHERE tbl = 'users' AND row_id = OLD.id;
+            END
+        """, description="queue users_fts updates instead of calling app SQL functions in triggers"),
+    ]),
+    # Same for messages_fts
+    Migration(4, 'messages_search_queue', [
+        SQL("DROP TRIGGER IF EXISTS trg_messages_fts_insert",
+            "DROP TRIGGER IF EXISTS trg_messages_fts_update",
+            "DROP TRIGGER IF EXISTS trg_messages_fts_delete",
+            """
+            CREATE TRIGGER trg_messages_fts_insert AFTER INSERT ON messages
+            BEGIN
+                INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('messages', NEW.id);
+            END
+        """,
+            """
+            CREATE TRIGGER trg_messages_fts_update AFTER UPDATE OF name, email, message ON messages
+            BEGIN
+                INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('messages', NEW.id);
+            END
+        """,
+            """
+            CREATE TRIGGER trg_messages_fts_delete AFTER DELETE ON messages
+            BEGIN
+                DELETE FROM messages_fts WHERE rowid = OLD.id;
+                DELETE FROM search_pending WHERE tbl = 'messages' AND row_id = OLD.id;
+            END
+        """, description="queue messages_fts updates instead of calling app SQL functions in triggers"),
+    ]),
+    # Broadcasts hand their mail to outbound_mail instead of sending it
+    # themselves, and read delivery status back through mail_id
+    Migration(5, 'broadcast_mail_id', [
+        AddColumn('broadcast_notifications', 'mail_id', 'INTEGER REFERENCES outbound_mail (id)'),
+    ]),
+]
+
+LATEST = MIGRATIONS[-1].version
+
+
+def ensure_table(conn):
+    """Create schema_migrations if needed. A database from before it existed
+    gets the versions its PRAGMA user_version already covers marked as applied."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'").fetchone()
+    if exists:
+        return
+    conn.execute("""
+        CREATE TABLE schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            step INTEGER NOT NULL DEFAULT 0,
+            cursor INTEGER,
+            started_at TEXT DEFAULT (datetime('now')),
+            applied_at TEXT
+        )
+    """)
+    user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    _stamp(conn, [m for m in MIGRATIONS if m.version <= user_version])
+    conn.commit()
+
+
+def _stamp(conn, migrations):
+    conn.executemany(
+        "INSERT OR REPLACE INTO schema_migrations (version, name, step, applied_at) VALUES (?, ?, ?, datetime('now'))",
+        [(m.version, m.name, len(m.steps)) for m in migrations],
+    )
+
+
+def stamp_all(conn):
+    """Mark every migration as applied, for a database just created from schema.sql."""
+    ensure_table(conn)
+    _stamp(conn, MIGRATIONS)
+    conn.commit()
+
+
+def _state(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'").fetchone()
+    if not exists:
+        return {}
+    return {row[0]: row for row in conn.execute("SELECT version, step, cursor, applied_at FROM schema_migrations")}
+
+
+def status(conn):
+    """(version, name, state) for every migration, without writing anything."""
+    state = _state(conn)
+    rows = []
+    for m in MIGRATIONS:
+        row = state.get(m.version)
+        if row is None:
+            label = 'pending'
+        elif row[3]:
+            label = f'applied {row[3]}'
+        else:
+            label = f'stopped at step {row[1] + 1} of {len(m.steps)}' + (f', rowid {row[2]}' if row[2] else '')
+        rows.append((m.version, m.name, label))
+    return rows
+
+
+def pending(conn, target=None):
+    state = _state(conn)
+    return [m for m in MIGRATIONS
+            if (target is None or m.version <= target) and not (m.version in state and state[m.version][3])]
+
+
+def plan(conn, target=None):
+    """The steps migrate() would run, as (migration, step, rows to go through). Read only."""
+    state = _state(conn)
+    steps = []
+    for m in pending(conn, target):
+        done, cursor = state[m.version][1:3] if m.version in state else (0, None)
+        for index, step in enumerate(m.steps):
+            if index < done:
+                continue
+            if isinstance(step, Backfill):
+                steps.append((m, step, step.estimate(conn, cursor if index == done and cursor else 0)))
+            else:
+                steps.append((m, step, step.estimate(conn)))
+    return steps
+
+
+def migrate(conn, target=None, batch_size=BATCH_SIZE, pause=PAUSE, log=print):
+    """Run the pending migrations in order; returns the versions applied.
+
+    pause is the sleep between backfill batches, in seconds.
+    """
+    ensure_table(conn)
+    state = _state(conn)
+    applied = []
+    for m in pending(conn, target):
+        if m.version not in state:
+            conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (m.version, m.name))
+            conn.commit()
+        done, cursor = state[m.version][1:3] if m.version in state else (0, None)
+        log(f"Migration {m.version} {m.name}")
+        for index, step in enumerate(m.steps):
+            if index < done:
+                continue
+            started = time.perf_counter()
+            if isinstance(step, Backfill):
+                rows = _backfill(conn, m, index, step, cursor if index == done and cursor else 0, batch_size, pause)
+                log(f"  {step.description}: {rows} rows changed in {time.perf_counter() - started:.1f}s")
+            else:
+                _transaction(conn, m, index, step.run)
+                log(f"  {step.description} ({time.perf_counter() - started:.1f}s)")
+        conn.execute("UPDATE schema_migrations SET applied_at = datetime('now') WHERE version = ?", (m.version,))
+        conn.commit()
+        applied.append(m.version)
+    return applied
+
+
+def _transaction(conn, migration, index, run, cursor=None, finished=True):
+    # The step's changes and the progress record commit together or not at all
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = run(conn)
+        conn.execute("UPDATE schema_migrations SET step = ?, cursor = ? WHERE version = ?",
+                     (index + 1 if finished else index, cursor, migration.version))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return result
+
+
+def _backfill(conn, migration, index, step, start, batch_size, pause):
+    changed = 0
+    if step.needed and not step.needed(conn):
+        _transaction(conn, migration, index, lambda conn: None)
+        return changed
+    if not start:
+        start = (conn.execute(f"SELECT MIN(rowid) FROM {step.table}").fetchone()[0] or 1) - 1
+    while True:
+        # Rows inserted while the backfill runs move the end along with them
+        top = conn.execute(f"SELECT MAX(rowid) FROM {step.table}").fetchone()[0] or 0
+        if start >= top:
+            _transaction(conn, migration, index, lambda conn: None)
+            return changed
+        end = start + batch_size
+        changed += _transaction(conn, migration, index, lambda conn: step.batch(conn, start, end) or 0,
+                                cursor=end, finished=False)
+        start = end
+        if pause:
+            time.sleep(pause)
@@ -1,21 +1,64 @@
 import sqlite3
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import json
 from datetime import date, timedelta
+from blinker import Namespace
+from app import db, migrations
+from app.search import match_expression, sync_search_index, USER_RANK, MESSAGE_RANK
+from app.passwords import hash_password, verify_password, needs_rehash, HashingBusy
+
+_signals = Namespace()
+# Sent with user_ids=[...] after a committed write to users rows, so
+# in-process caches can refresh just those users.
+users_changed = _signals.signal('users-changed')
 
 def get_db_connection():
-    # Get the database file path (relative to project root)
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # This allows accessing columns by name
-    # Enable foreign key constraints in SQLite
-    conn.execute('PRAGMA foreign_keys = ON')
-    return conn
-
-def init_database():
-    """Initialize the database by creating all tables if they don't exist"""
-    schema_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schema.sql')
+    # Connections come from the shared pool already configured (row_factory,
+    # foreign keys); close() returns them to the pool.
+    return db.connect()
+
+# The latest version in app/migrations.py. Every change to schema.sql or to
+# the backfills in apply_schema needs a new migration there (one with no
+# steps if applying the schema again is enough), which is what moves this.
+# Databases whose PRAGMA user_version is lower get migrated and the schema
+# applied again on next start.
+SCHEMA_VERSION = migrations.LATEST
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def init_database(**options):
+    """Bring the database up to SCHEMA_VERSION; returns True if it had to.
+
+    An up-to-date database costs one header read. Otherwise pending migrations
+    run and the schema is applied under a file lock next to the database, so
+    workers starting together do it once and the rest find the new version.
+    options go to migrations.migrate.
+    """
     conn = get_db_connection()
+    try:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return False
+        with db.file_lock(conn._pool.database):
+            if schema_version(conn) >= SCHEMA_VERSION:
+                return False
+            fresh = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone() is None
+            if not fresh:
+                migrations.migrate(conn, **options)
+            apply_schema(conn)
+            if fresh:
+                # Created from schema.sql in its latest shape
+                migrations.stamp_all(conn)
+        return True
+    finally:
+        conn.close()
+
+
+def apply_schema(conn):
+    """Create all tables if they don't exist, run the one-off backfills and record the version"""
+    schema_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schema.sql')
     cursor = conn.cursor()
     
     # Read and execute schema
@@ -24,26 +67,86 @@ def init_database():
     
     # Execute the schema (SQLite can handle multiple statements)
     cursor.executescript(schema)
+
+    from app.matching import seed_compatibility
+    from app.geo import seed_cities
+    seed_compatibility(conn)
+    seed_cities(conn)
     conn.commit()
-    conn.close()
-
-
-class User:
-    def __init__(self, id, role, name, phone, email, password_hash, city, blood_type=None, nni=None, is_available=True, last_donation_date=None, next_eligible_date=None, is_active=True, created_at=None, **kwargs):
-        self.id = id
-        self.role = role
-        self.name = name
-        self.phone = phone
-        self.email = email
-        self.password_hash = password_hash
-        self.city = city
-        self.blood_type = blood_type
-        self.nni = nni
-        self.is_available = is_available
-        self.last_donation_date = last_donation_date
-        self.next_eligible_date = next_eligible_date
-        self.is_active = is_active
-        self.created_at = created_at
+
+    from app.stats import ensure_counters
+    from app.search import ensure_search_index
+    from app.analytics import ensure_rollups
+    ensure_counters(conn)
+    ensure_search_index(conn)
+    ensure_rollups(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    cursor.close()
+
+
+class Model:
+    """Base for the row classes: attributes live in __slots__, not a __dict__.
+
+    Queries select only the columns their page needs; attributes a query
+    didn't select get the class DEFAULTS (None unless listed). Naming a
+    column the class doesn't have is an error rather than silently dropped.
+    """
+    __slots__ = ()
+    DEFAULTS = {}
+
+    def __init__(self, **columns):
+        unknown = columns.keys() - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} has no column {', '.join(sorted(unknown))}")
+        for name in self.__slots__:
+            setattr(self, name, columns.get(name, self.DEFAULTS.get(name)))
+
+    def __getitem__(self, column):
+        # Lets code written against sqlite3.Row keep using row['column']
+        return getattr(self, column)
+
+    @classmethod
+    def row_factory(cls):
+        """A cursor row_factory that builds instances straight from the row tuples.
+
+        The column names are read once per statement, so rows skip
+        sqlite3.Row, the dict and the keyword arguments.
+        """
+        new = cls.__new__
+        plan = [None, None, None]  # description, column names, (name, default) for the rest
+
+        def factory(cursor, row):
+            if cursor.description is not plan[0]:
+                names = [column[0] for column in cursor.description]
+                unknown = set(names) - set(cls.__slots__)
+                if unknown:
+                    raise TypeError(f"{cls.__name__} has no column {', '.join(sorted(unknown))}")
+                missing = [(name, cls.DEFAULTS.get(name)) for name in cls.__slots__ if name not in names]
+                plan[:] = [cursor.description, names, missing]
+            obj = new(cls)
+            for name, value in zip(plan[1], row):
+                setattr(obj, name, value)
+            for name, value in plan[2]:
+                setattr(obj, name, value)
+            return obj
+        return factory
+
+    @classmethod
+    def cursor(cls, conn):
+        cursor = conn.cursor()
+        cursor.row_factory = cls.row_factory()
+        return cursor
+
+
+class User(Model):
+    __slots__ = ('id', 'role', 'name', 'phone', 'email', 'password_hash', 'city', 'blood_type', 'nni',
+                 'is_available', 'last_donation_date', 'next_eligible_date', 'is_active', 'created_at')
+    DEFAULTS = {'is_available': True, 'is_active': True}
+
+    # Everything but password_hash, which only the auth flow (get_by_email) loads
+    PROFILE_COLUMNS = ("id, role, name, phone, email, city, blood_type, nni, is_available, "
+                       "last_donation_date, next_eligible_date, is_active, created_at")
 
     @property
     def is_donor(self):
@@ -55,78 +158,229 @@ class User:
 
     @staticmethod
     def create(role, name, phone, email, password, city, blood_type=None, nni=None):
-        # Strict Validation
-        if len(phone) > 8:
-            print("Validation Fail: Phone too long")
-            return False
+        user, errors = User.register(role, name, phone, email, password, city, blood_type, nni)
+        for field, error in errors.items():
+            print(f"Validation Fail: {field}: {error}")
+        return user is not None
+
+    # Unique columns, the form field each belongs to and its duplicate message
+    UNIQUE_FIELDS = {'phone': 'phone_exists_error', 'email': 'email_exists_error', 'nni': 'nni_exists_error'}
+
+    @staticmethod
+    def _conflicts(cursor, values):
+        """{field: message} for the unique values already taken."""
+        taken = {field: value for field, value in values.items() if value}
+        cursor.execute(
+            f"SELECT {', '.join(f'MAX({f} = :{f})' for f in taken)} FROM users "
+            f"WHERE {' OR '.join(f'{f} = :{f}' for f in taken)}",
+            taken,
+        )
+        row = cursor.fetchone()
+        return {field: User.UNIQUE_FIELDS[field] for field, hit in zip(taken, row) if hit}
+
+    @staticmethod
+    def register(role, name, phone, email, password, city, blood_type=None, nni=None):
+        """Create a user in one INSERT ... RETURNING.
+
+        Returns (user, {}) or (None, {field: translation key}). Duplicates are
+        looked up first so a taken phone doesn't cost a password hash; the
+        UNIQUE constraints still settle concurrent sign-ups, and the loser gets
+        the same field errors. May raise HashingBusy.
+        """
+        phone = (phone or '').strip()
+        email = (email or '').strip() or None  # '' would collide between users without one
+        nni = (nni or '').strip() or None
+        errors = {}
+        if not phone or len(phone) > 8:
+            errors['phone'] = 'phone_invalid_error'
         if nni and len(nni) > 10:
-            print("Validation Fail: NNI too long")
-            return False
-            
-        hashed_password = generate_password_hash(password)
+            errors['nni'] = 'nni_invalid_error'
+        if errors:
+            return None, errors
+        unique = {'phone': phone, 'email': email, 'nni': nni}
+
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            query = """
+            errors = User._conflicts(cursor, unique)
+        finally:
+            cursor.close()
+            conn.close()
+        if errors:
+            return None, errors
+
+        # Hashed with no connection checked out
+        hashed_password = hash_password(password)
+        conn = get_db_connection()
+        cursor = User.cursor(conn)
+        try:
+            cursor.execute(f"""
                 INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(query, (role, name, phone, email, hashed_password, city, blood_type, nni))
+                RETURNING {User.PROFILE_COLUMNS}
+            """, (role, name, phone, email, hashed_password, city, blood_type, nni))
+            row = cursor.fetchone()
+            sync_search_index(conn)
             conn.commit()
-            return True
+        except sqlite3.IntegrityError as err:
+            conn.rollback()
+            # Lost a race with another sign-up, or a CHECK constraint failed
+            errors = User._conflicts(conn.cursor(), unique)
+            if not errors:
+                print(f"Error: {err}")
+                errors = {'form': 'registration_failed'}
+            return None, errors
         except sqlite3.Error as err:
+            conn.rollback()
             print(f"Error: {err}")
-            return False
+            return None, {'form': 'registration_failed'}
         finally:
             cursor.close()
             conn.close()
+        users_changed.send(None, user_ids=[row.id])
+        return row, {}
 
     @staticmethod
     def get_by_email(email):
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-        user_data = cursor.fetchone()
+        cursor = User.cursor(conn)
+        cursor.execute(f"SELECT {User.PROFILE_COLUMNS}, password_hash FROM users WHERE email = ?", (email,))
+        user = cursor.fetchone()
         cursor.close()
         conn.close()
-        if user_data:
-            return User(**dict(user_data))
-        return None
+        return user
 
     @staticmethod
     def get_by_id(user_id):
+        """The user without password_hash; see app/user_cache.py for cached lookups."""
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        user_data = cursor.fetchone()
+        cursor = User.cursor(conn)
+        cursor.execute(f"SELECT {User.PROFILE_COLUMNS} FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
         cursor.close()
         conn.close()
-        if user_data:
-            return User(**dict(user_data))
-        return None
+        return user
 
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    def check_password(self, password, suspect=False):
+        """Verify on the hashing pool; may raise HashingBusy.
+
+        A hash made with an older PASSWORD_HASH_METHOD is replaced on success.
+        """
+        if not self.password_hash or '$' not in self.password_hash:
+            return False  # not loaded (get_by_id), or unusable like roster imports without one
+        if not verify_password(self.password_hash, password, suspect):
+            return False
+        if needs_rehash(self.password_hash):
+            try:
+                new_hash = hash_password(password)
+            except HashingBusy:
+                return True  # try again at the next login
+            if User.update_password_hash(self.id, self.password_hash, new_hash):
+                self.password_hash = new_hash
+        return True
 
     @staticmethod
-    def get_all_users():
+    def update_password_hash(user_id, old_hash, new_hash):
+        """Swap the hash unless it changed since old_hash was read."""
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users ORDER BY created_at DESC")
+        try:
+            cursor.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                           (new_hash, user_id, old_hash))
+            conn.commit()
+            return cursor.rowcount == 1
+        except sqlite3.Error as err:
+            print(f"Error: {err}")
+            return False
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_all_users():
+        conn = get_db_connection()
+        cursor = User.cursor(conn)
+        cursor.execute(f"SELECT {User.LISTING_COLUMNS} FROM users ORDER BY created_at DESC")
         results = cursor.fetchall()
         cursor.close()
         conn.close()
-        return [User(**dict(r)) for r in results]
+        return results
     
+    # Columns the admin listing shows; never password_hash or nni
+    LISTING_COLUMNS = "id, role, name, phone, email, city, blood_type, is_active, created_at"
+
     @staticmethod
-    def check_nni_exists(nni):
+    def get_users_page(role=None, is_active=None, cursor=None, per_page=50):
+        """One page of users, newest first, using keyset pagination on (created_at, id).
+
+        cursor is the (created_at, id) of the last row of the previous page.
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE nni = ?", (nni,))
-        exists = cursor.fetchone() is not None
-        cursor.close()
+        db_cursor = User.cursor(conn)
+        query = f"SELECT {User.LISTING_COLUMNS} FROM users WHERE 1 = 1"
+        params = []
+        if role:
+            query += " AND role = ?"
+            params.append(role)
+        if is_active is not None:
+            query += " AND is_active = ?"
+            params.append(int(is_active))
+        if cursor:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        # One extra row tells us whether there is a next page
+        params.append(per_page + 1)
+
+        db_cursor.execute(query, tuple(params))
+        rows = db_cursor.fetchall()
+        db_cursor.close()
         conn.close()
-        return exists
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = (rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def search(query, role=None, is_active=None, page=1, per_page=50):
+        """Users matching a free-text query, best match first.
+
+        Matches partial names in Arabic or Latin script, emails, phone numbers
+        and cities through users_fts. Returns (rows, has_next).
+        """
+        match = match_expression(query)
+        if match is None:
+            return [], False
+        columns = ', '.join(f'u.{c.strip()}' for c in User.LISTING_COLUMNS.split(','))
+        sql = f"""
+            SELECT {columns} FROM users_fts
+            JOIN users u ON u.id = users_fts.rowid
+            WHERE users_fts MATCH ?
+        """
+        params = [match]
+        if role:
+            sql += " AND u.role = ?"
+            params.append(role)
+        if is_active is not None:
+            sql += " AND u.is_active = ?"
+            params.append(int(is_active))
+        sql += f" ORDER BY {USER_RANK} LIMIT ? OFFSET ?"
+        params.extend([per_page + 1, (max(page, 1) - 1) * per_page])
+
+        conn = get_db_connection()
+        cursor = User.cursor(conn)
+        try:
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+        except sqlite3.Error as err:
+            print(f"Error searching users: {err}")
+            rows = []
+        finally:
+            cursor.close()
+            conn.close()
+        return rows[:per_page], len(rows) > per_page
 
     @staticmethod
     def get_active_donors(city=None, blood_type=None):
@@ -148,6 +402,37 @@ class User:
         conn.close()
         return results
 
+    @staticmethod
+    def get_compatible_donors(blood_type, city=None, available_only=False):
+        """Active donors whose blood can be given to a recipient of blood_type.
+
+        Exact blood type matches come first, then available donors, then the
+        donors who have gone longest without donating.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        query = """
+            SELECT u.id, u.name, u.city, u.blood_type, u.is_available, u.next_eligible_date,
+                   u.blood_type = bc.recipient_type AS exact_match
+            FROM blood_compatibility bc
+            JOIN users u ON u.blood_type = bc.donor_type
+            WHERE bc.recipient_type = ?
+            AND (u.role = 'donor' OR u.role = 'both') AND u.is_active = 1
+        """
+        params = [blood_type]
+        if city:
+            query += " AND u.city = ?"
+            params.append(city)
+        if available_only:
+            query += " AND u.is_available = 1"
+        query += " ORDER BY exact_match DESC, u.is_available DESC, u.last_donation_date ASC"
+
+        cursor.execute(query, tuple(params))
+        results = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return results
+
     def set_cooldown(self):
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -157,10 +442,32 @@ class User:
         conn.commit()
         cursor.close()
         conn.close()
+        users_changed.send(None, user_ids=[self.id])
         self.is_available = False
         self.next_eligible_date = next_date
 
 
+    @staticmethod
+    def reactivate_expired():
+        """Mark every donor whose cooldown has passed as available again.
+
+        Returns the ids of the donors that changed.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE users SET is_available = 1
+            WHERE is_available = 0 AND next_eligible_date <= date('now')
+            RETURNING id
+        """)
+        user_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        cursor.close()
+        conn.close()
+        if user_ids:
+            users_changed.send(None, user_ids=user_ids)
+        return user_ids
+
     @staticmethod
     def toggle_active(user_id):
         conn = get_db_connection()
@@ -174,67 +481,95 @@ class User:
             conn.commit()
             cursor.close()
             conn.close()
+            users_changed.send(None, user_ids=[user_id])
             return True
         cursor.close()
         conn.close()
         return False
 
-class DonationRequest:
-    def __init__(self, id, requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message, status, created_at, is_broadcast, **kwargs):
-        self.id = id
-        self.requester_id = requester_id
-        self.blood_type_required = blood_type_required
-        self.city = city
-        self.hospital_location = hospital_location
-        self.donation_date = donation_date
-        self.donation_time_start = donation_time_start
-        self.donation_time_end = donation_time_end
-        self.message = message
-        self.status = status
-        self.created_at = created_at
-        self.is_broadcast = is_broadcast
+class DonationRequest(Model):
+    __slots__ = ('id', 'requester_id', 'blood_type_required', 'city', 'hospital_location', 'donation_date',
+                 'donation_time_start', 'donation_time_end', 'message', 'status', 'created_at', 'is_broadcast',
+                 'exact_match')
+
+    # Named rather than *, so a column added by a migration can't trip the
+    # unknown-column check in workers still running the old code
+    COLUMNS = ("id, requester_id, blood_type_required, city, hospital_location, donation_date, "
+               "donation_time_start, donation_time_end, message, status, created_at, is_broadcast")
+
+    # What the donor and requester dashboards show
+    LISTING_COLUMNS = ("id, blood_type_required, city, hospital_location, donation_date, "
+                       "donation_time_start, donation_time_end, message, status, created_at")
 
     @staticmethod
     def get_open_requests(city, blood_type):
         conn = get_db_connection()
-        cursor = conn.cursor()
-        query = """
-            SELECT * FROM donation_requests 
+        cursor = DonationRequest.cursor(conn)
+        query = f"""
+            SELECT {DonationRequest.LISTING_COLUMNS} FROM donation_requests 
             WHERE status = 'open' 
             AND city = ? 
             AND blood_type_required = ?
+            AND donation_date >= ?
             ORDER BY donation_date ASC
         """
-        cursor.execute(query, (city, blood_type))
+        cursor.execute(query, (city, blood_type, date.today()))
+        results = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return results
+
+    @staticmethod
+    def get_compatible_requests(city, blood_type):
+        """Upcoming open requests in city that a donor of blood_type can serve, exact matches first."""
+        conn = get_db_connection()
+        cursor = DonationRequest.cursor(conn)
+        columns = ', '.join(f'dr.{c.strip()}' for c in DonationRequest.LISTING_COLUMNS.split(','))
+        query = f"""
+            SELECT {columns}, dr.blood_type_required = bc.donor_type AS exact_match
+            FROM blood_compatibility bc
+            JOIN donation_requests dr ON dr.blood_type_required = bc.recipient_type
+            WHERE bc.donor_type = ?
+            AND dr.status = 'open'
+            AND dr.city = ?
+            AND dr.donation_date >= ?
+            ORDER BY exact_match DESC, dr.donation_date ASC
+        """
+        cursor.execute(query, (blood_type, city, date.today()))
         results = cursor.fetchall()
         cursor.close()
         conn.close()
-        return [DonationRequest(**dict(r)) for r in results]
+        return results
 
     @staticmethod
     def get_by_id(request_id):
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM donation_requests WHERE id = ?", (request_id,))
+        cursor = DonationRequest.cursor(conn)
+        cursor.execute(f"SELECT {DonationRequest.COLUMNS} FROM donation_requests WHERE id = ?", (request_id,))
         result = cursor.fetchone()
         cursor.close()
         conn.close()
-        if result:
-            return DonationRequest(**dict(result))
-        return None
+        return result
 
     @staticmethod
-    def create(requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message):
+    def create(requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message, is_broadcast=False):
+        # Returns the new request id (truthy) or False
+        try:
+            if not isinstance(donation_date, date):
+                donation_date = date.fromisoformat(donation_date)
+        except (TypeError, ValueError):
+            print(f"Error: invalid donation date {donation_date!r}")
+            return False
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
             query = """
-                INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message, is_broadcast)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            cursor.execute(query, (requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message))
+            cursor.execute(query, (requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message, int(is_broadcast)))
             conn.commit()
-            return True
+            return cursor.lastrowid
         except sqlite3.Error as err:
             print(f"Error: {err}")
             return False
@@ -245,21 +580,16 @@ class DonationRequest:
     @staticmethod
     def get_by_requester(requester_id):
         conn = get_db_connection()
-        cursor = conn.cursor()
-        query = "SELECT * FROM donation_requests WHERE requester_id = ? ORDER BY created_at DESC"
+        cursor = DonationRequest.cursor(conn)
+        query = f"SELECT {DonationRequest.LISTING_COLUMNS} FROM donation_requests WHERE requester_id = ? ORDER BY created_at DESC"
         cursor.execute(query, (requester_id,))
         results = cursor.fetchall()
         cursor.close()
         conn.close()
-        return [DonationRequest(**dict(r)) for r in results]
+        return results
 
-class Donation:
-    def __init__(self, id, request_id, donor_id, status, completed_at, **kwargs):
-        self.id = id
-        self.request_id = request_id
-        self.donor_id = donor_id
-        self.status = status
-        self.completed_at = completed_at
+class Donation(Model):
+    __slots__ = ('id', 'request_id', 'donor_id', 'status', 'completed_at')
 
     @staticmethod
     def create(request_id, donor_id):
@@ -273,6 +603,7 @@ class Donation:
             cursor.execute("UPDATE users SET is_available = 0 WHERE id = ?", (donor_id,))
             
             conn.commit()
+            users_changed.send(None, user_ids=[donor_id])
             return True
         except sqlite3.Error as err:
             print(f"Error: {err}")
@@ -281,15 +612,8 @@ class Donation:
             cursor.close()
             conn.close()
 
-class ContactRequest:
-    def __init__(self, id, requester_id, donor_id, status, created_at, approved_at=None, requester_name=None, **kwargs):
-        self.id = id
-        self.requester_id = requester_id
-        self.donor_id = donor_id
-        self.status = status
-        self.created_at = created_at
-        self.approved_at = approved_at
-        self.requester_name = requester_name
+class ContactRequest(Model):
+    __slots__ = ('id', 'requester_id', 'donor_id', 'status', 'created_at', 'approved_at', 'requester_name')
 
     @staticmethod
     def create(requester_id, donor_id):
@@ -310,10 +634,10 @@ class ContactRequest:
     @staticmethod
     def get_requests_for_donor(donor_id):
         conn = get_db_connection()
-        cursor = conn.cursor()
+        cursor = ContactRequest.cursor(conn)
         # Fetch request details + requester name
         query = """
-            SELECT cr.*, u.name as requester_name 
+            SELECT cr.id, cr.requester_id, cr.status, cr.created_at, u.name as requester_name 
             FROM contact_requests cr
             JOIN users u ON cr.requester_id = u.id
             WHERE cr.donor_id = ? AND cr.status = 'pending'
@@ -323,7 +647,7 @@ class ContactRequest:
         results = cursor.fetchall()
         cursor.close()
         conn.close()
-        return [ContactRequest(**dict(r)) for r in results]
+        return results
 
     @staticmethod
     def update_status(request_id, status):
@@ -349,21 +673,16 @@ class ContactRequest:
     def check_status(requester_id, donor_id):
         conn = get_db_connection()
         cursor = conn.cursor()
-        query = "SELECT * FROM contact_requests WHERE requester_id = ? AND donor_id = ?"
+        query = "SELECT status, approved_at FROM contact_requests WHERE requester_id = ? AND donor_id = ?"
         cursor.execute(query, (requester_id, donor_id))
         result = cursor.fetchone()
         cursor.close()
         conn.close()
         return dict(result) if result else None
 
-class Message:
-    def __init__(self, id, name, email, message, is_read, created_at, **kwargs):
-        self.id = id
-        self.name = name
-        self.email = email
-        self.message = message
-        self.is_read = is_read
-        self.created_at = created_at
+class Message(Model):
+    __slots__ = ('id', 'name', 'email', 'message', 'is_read', 'created_at')
+    COLUMNS = "id, name, email, message, is_read, created_at"
 
     @staticmethod
     def create(name, email, message):
@@ -372,6 +691,7 @@ class Message:
         try:
             query = "INSERT INTO messages (name, email, message) VALUES (?, ?, ?)"
             cursor.execute(query, (name, email, message))
+            sync_search_index(conn)
             conn.commit()
             return True
         except sqlite3.Error as err:
@@ -384,29 +704,121 @@ class Message:
     @staticmethod
     def get_all():
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM messages ORDER BY created_at DESC")
+        cursor = Message.cursor(conn)
+        cursor.execute(f"SELECT {Message.COLUMNS} FROM messages ORDER BY created_at DESC")
         results = cursor.fetchall()
         cursor.close()
         conn.close()
-        return [Message(**dict(r)) for r in results]
+        return results
 
     @staticmethod
     def get_unread_count():
+        # Trigger-maintained counter (see app/stats.py)
+        from app.stats import get_counter
+        return get_counter('messages.unread')
+
+    @staticmethod
+    def get_page(is_read=None, cursor=None, per_page=30):
+        """One page of the inbox, newest first, keyset-paginated on (created_at, id).
+
+        Returns (messages, next_cursor) like User.get_users_page.
+        """
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM messages WHERE is_read = 0")
-        count = cursor.fetchone()[0]
-        cursor.close()
+        db_cursor = Message.cursor(conn)
+        query = f"SELECT {Message.COLUMNS} FROM messages WHERE 1 = 1"
+        params = []
+        if is_read is not None:
+            # Literal rather than a parameter so the partial indexes apply
+            query += " AND is_read = 1" if is_read else " AND is_read = 0"
+        if cursor:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(per_page + 1)
+
+        db_cursor.execute(query, tuple(params))
+        rows = db_cursor.fetchall()
+        db_cursor.close()
         conn.close()
-        return count
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = (rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def search(query, is_read=None, page=1, per_page=30):
+        """Messages matching a free-text query over name, email and body, best match first.
+
+        Returns (messages, has_next).
+        """
+        match = match_expression(query, columns='name email message')
+        if match is None:
+            return [], False
+        columns = ', '.join(f'm.{c.strip()}' for c in Message.COLUMNS.split(','))
+        sql = f"""
+            SELECT {columns} FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            WHERE messages_fts MATCH ?
+        """
+        params = [match]
+        if is_read is not None:
+            sql += " AND m.is_read = ?"
+            params.append(int(is_read))
+        sql += f" ORDER BY {MESSAGE_RANK} LIMIT ? OFFSET ?"
+        params.extend([per_page + 1, (max(page, 1) - 1) * per_page])
+
+        conn = get_db_connection()
+        cursor = Message.cursor(conn)
+        try:
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+        except sqlite3.Error as err:
+            print(f"Error searching messages: {err}")
+            rows = []
+        finally:
+            cursor.close()
+            conn.close()
+        return rows[:per_page], len(rows) > per_page
 
     @staticmethod
     def mark_read(message_id):
+        return Message.mark_many_read([message_id]) is not None
+
+    @staticmethod
+    def mark_many_read(message_ids):
+        """Mark the given messages read in one statement; returns how many changed."""
+        ids = [int(i) for i in message_ids]
+        if not ids:
+            return 0
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("UPDATE messages SET is_read = 1 WHERE id = ?", (message_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True
+        try:
+            # One JSON parameter instead of a placeholder per id
+            cursor.execute(
+                "UPDATE messages SET is_read = 1 WHERE is_read = 0 AND id IN (SELECT value FROM json_each(?))",
+                (json.dumps(ids),),
+            )
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as err:
+            print(f"Error: {err}")
+            return None
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def mark_all_read():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("UPDATE messages SET is_read = 1 WHERE is_read = 0")
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as err:
+            print(f"Error: {err}")
+            return None
+        finally:
+            cursor.close()
+            conn.close()
@@ -0,0 +1,231 @@
+# Password hashing off the request threads.
+#
+# scrypt and PBKDF2 are deliberately slow, and hashlib releases the GIL while
+# it runs them. A burst of logins would otherwise have every request thread
+# hashing at once. PasswordHasher runs them on a fixed number of worker
+# threads and admits at most PASSWORD_HASH_QUEUE waiting jobs. Beyond that,
+# new work is refused at once with HashingBusy, and the route answers 503,
+# so the CPU (and scrypt's memory) stays bounded and the queue never grows
+# unbounded. Callers that are "suspect" (see LoginGuard.is_suspect) only get
+# half the queue and wait behind everyone else, so a stuffing burst cannot
+# push legitimate logins back.
+#
+# LoginGuard puts sliding-window limits in front of that: login attempts per
+# IP, and failed logins per email and IP, so one client cannot keep the
+# hashers busy or guess at one account. The email limit is per client so
+# that failing on purpose cannot lock the owner out of their account. While
+# the hashers are more than half loaded the per-IP limit is halved.
+#
+# Hashes made with a method other than PASSWORD_HASH_METHOD are replaced on
+# the next successful login (User.check_password).
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.utils.ratelimit import SlidingWindowLimiter
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HashingBusy(Exception):
+    """The hashing queue is full; the caller should retry shortly."""
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=None, queue_limit=16, timeout=10.0):
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        # (priority, sequence, future, func, args); priority 1 is suspect
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._prefix = None
+        self._latencies = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+        self._threads = [threading.Thread(target=self._work, name=f'password-hash-{i}', daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            _, _, future, func, args = self._queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as err:
+                future.set_exception(err)
+
+    @property
+    def prefix(self):
+        """The method part of a hash made with self.method, e.g. 'pbkdf2:sha256:600000'.
+
+        Werkzeug fills in default parameters, so it is taken from a real hash.
+        """
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, password_hash):
+        return '$' in password_hash and password_hash.split('$', 1)[0] != self.prefix
+
+    def load(self):
+        return self._pending / (self.workers + self.queue_limit)
+
+    def _run(self, func, *args, suspect=False):
+        limit = self.workers + (self.queue_limit // 2 if suspect else self.queue_limit)
+        with self._lock:
+            if self._pending >= limit:
+                self.rejected += 1
+                raise HashingBusy()
+            self._pending += 1
+        started = time.perf_counter()
+        future = Future()
+        # A job that timed out may still be hashing; it stays pending until
+        # a worker finishes it (or cancel() takes it off the queue)
+        future.add_done_callback(self._done)
+        self._queue.put((int(suspect), next(self._sequence), future, func, args))
+        try:
+            result = future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy()
+        self.completed += 1
+        self._latencies.append(time.perf_counter() - started)
+        return result
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password, suspect=False):
+        return self._run(generate_password_hash, password, self.method, suspect=suspect)
+
+    def verify(self, password_hash, password, suspect=False):
+        return self._run(check_password_hash, password_hash, password, suspect=suspect)
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put((2, next(self._sequence), None, None, None))
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'pending': self._pending,
+            'queue_limit': self.queue_limit,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'latency_p50_ms': pct(0.50),
+            'latency_p95_ms': pct(0.95),
+        }
+
+
+class LoginGuard:
+    def __init__(self, hasher, ip_limit=30, email_limit=5, window=300):
+        self.hasher = hasher
+        self.ip_attempts = SlidingWindowLimiter(ip_limit, window)
+        self.email_failures = SlidingWindowLimiter(email_limit, window)
+
+    def check(self, ip, email=None):
+        """Count an attempt from ip; returns seconds to wait, 0 if allowed."""
+        if email:
+            wait = self.email_failures.retry_after((email, ip))
+            if wait:
+                self.email_failures.blocked += 1
+                return wait
+        limit = self.ip_attempts.limit
+        if self.hasher.load() >= 0.5:
+            limit = max(1, limit // 2)
+        return self.ip_attempts.hit(ip, limit)
+
+    def is_suspect(self, ip, email=None):
+        """Another attempt from ip in the window, or a recent failure for email from ip.
+
+        Known before hashing, unlike the outcome of the attempts in flight.
+        """
+        return self.ip_attempts.count(ip) > 1 or bool(email and self.email_failures.count((email, ip)))
+
+    def failed(self, ip, email):
+        if email:
+            self.email_failures.record((email, ip))
+
+    def succeeded(self, ip, email):
+        self.email_failures.reset((email, ip))
+
+    def stats(self):
+        return {
+            'ip_attempts': self.ip_attempts.stats(),
+            'email_failures': self.email_failures.stats(),
+        }
+
+
+def get_password_hasher():
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
+
+
+def hash_method():
+    hasher = get_password_hasher()
+    return hasher.method if hasher else DEFAULT_METHOD
+
+
+def hash_password(password, suspect=False):
+    """Hash on the pool when the app has one, inline otherwise (scripts)."""
+    hasher = get_password_hasher()
+    if hasher is None:
+        return generate_password_hash(password, DEFAULT_METHOD)
+    return hasher.hash(password, suspect)
+
+
+def verify_password(password_hash, password, suspect=False):
+    hasher = get_password_hasher()
+    if hasher is None:
+        return check_password_hash(password_hash, password)
+    return hasher.verify(password_hash, password, suspect)
+
+
+def needs_rehash(password_hash):
+    hasher = get_password_hasher()
+    return hasher is not None and hasher.needs_rehash(password_hash)
+
+
+def get_login_guard():
+    if has_app_context():
+        return current_app.extensions.get('login_guard')
+    return None
+
+
+def init_app(app):
+    hasher = app.extensions['password_hasher'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE'],
+        app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    app.extensions['login_guard'] = LoginGuard(
+        hasher,
+        app.config['LOGIN_IP_LIMIT'],
+        app.config['LOGIN_EMAIL_LIMIT'],
+        app.config['LOGIN_WINDOW'],
+    )
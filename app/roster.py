@@ -0,0 +1,261 @@
+# Bulk donor roster import.
+#
+# Hospitals and blood banks send donor lists as CSV with a header row:
+#
+#     name,phone,email,city,blood_type,nni,password,role
+#
+# name, phone, city and blood_type are required; role defaults to donor.
+# Rows are validated as they stream in and collected into batches. For each
+# batch, duplicates of existing users are found with one set-based query per
+# unique column, passwords are hashed in a process pool, and the rows go in
+# with one executemany in one transaction. Every rejected row is recorded in
+# roster_import_errors with its line number and reason.
+#
+# Donors imported without a password get the unusable hash '!', which never
+# matches at login, until someone sets one for them.
+import csv
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from werkzeug.security import generate_password_hash
+
+from app.models import get_db_connection, users_changed
+from app.passwords import hash_method
+from app.search import sync_search_index
+
+BLOOD_TYPES = {'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'}
+ROLES = {'donor', 'both'}
+UNUSABLE_PASSWORD = '!'
+
+INSERT_USER = """
+    INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def validate_row(row):
+    """Clean one CSV row. Returns (values, None) or (None, reason)."""
+    def field(name):
+        return (row.get(name) or '').strip()
+
+    name, phone, city, blood_type = field('name'), field('phone').replace(' ', ''), field('city'), field('blood_type').upper()
+    email, nni, role = field('email') or None, field('nni') or None, field('role').lower() or 'donor'
+    for label, value in (('name', name), ('phone', phone), ('city', city), ('blood_type', blood_type)):
+        if not value:
+            return None, f'missing {label}'
+    if not phone.isdigit() or len(phone) > 8:
+        return None, 'phone must be at most 8 digits'
+    if nni and len(nni) > 10:
+        return None, 'nni longer than 10 characters'
+    if email and '@' not in email:
+        return None, 'invalid email'
+    if blood_type not in BLOOD_TYPES:
+        return None, f'unknown blood type {blood_type}'
+    if role not in ROLES:
+        return None, f'role must be donor or both, not {role}'
+    return {'role': role, 'name': name, 'phone': phone, 'email': email, 'city': city,
+            'blood_type': blood_type, 'nni': nni, 'password': field('password') or None}, None
+
+
+def create_import(source):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO roster_imports (source) VALUES (?)", (source,))
+    conn.commit()
+    import_id = cursor.lastrowid
+    cursor.close()
+    conn.close()
+    return import_id
+
+
+class RosterImporter:
+    """Imports one roster into the users table; see the module comment."""
+
+    def __init__(self, import_id, batch_size=1000, workers=None):
+        self.import_id = import_id
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.total_rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self._seen = {'phone': set(), 'email': set(), 'nni': set()}
+        self._pool = None
+        self._hash = partial(generate_password_hash, method=hash_method())
+
+    def _hash_passwords(self, rows):
+        passwords = [r['password'] for r in rows if r['password']]
+        if passwords and self._pool is None:
+            # spawn, not fork: the app has the scheduler and mail threads running
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        hashes = iter(self._pool.map(self._hash, passwords, chunksize=16) if passwords else ())
+        return [next(hashes) if r['password'] else UNUSABLE_PASSWORD for r in rows]
+
+    def _existing(self, cursor, column, values):
+        values = [v for v in values if v]
+        if not values:
+            return set()
+        cursor.execute(
+            f"SELECT {column} FROM users WHERE {column} IN (SELECT value FROM json_each(?))",
+            (json.dumps(values),),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def _insert(self, cursor, rows, hashes, errors):
+        params = [(r['role'], r['name'], r['phone'], r['email'], h, r['city'], r['blood_type'], r['nni'])
+                  for (_, r), h in zip(rows, hashes)]
+        cursor.execute("SAVEPOINT roster_batch")
+        try:
+            cursor.executemany(INSERT_USER, params)
+            cursor.execute("RELEASE roster_batch")
+            return [r for _, r in rows]
+        except sqlite3.IntegrityError:
+            # Someone registered one of these after the duplicate check; go row by row
+            cursor.execute("ROLLBACK TO roster_batch")
+            cursor.execute("RELEASE roster_batch")
+        inserted = []
+        for (line, r), p in zip(rows, params):
+            try:
+                cursor.execute(INSERT_USER, p)
+                inserted.append(r)
+            except sqlite3.IntegrityError as err:
+                errors.append((line, str(err)))
+        return inserted
+
+    def flush(self, batch, errors):
+        """Insert one batch of (line, values) and record its errors in one transaction."""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            taken = {column: self._existing(cursor, column, [v[column] for _, v in batch])
+                     for column in ('phone', 'email', 'nni')}
+            rows = []
+            for line, values in batch:
+                duplicate = next((c for c in ('phone', 'email', 'nni') if values[c] and values[c] in taken[c]), None)
+                if duplicate:
+                    errors.append((line, f'{duplicate} already registered'))
+                else:
+                    rows.append((line, values))
+
+            # Hash before taking the write lock; this is the slow part
+            hashes = self._hash_passwords([r for _, r in rows])
+            cursor.execute("BEGIN IMMEDIATE")
+            inserted = self._insert(cursor, rows, hashes, errors)
+            cursor.executemany(
+                "INSERT OR REPLACE INTO roster_import_errors (import_id, line, reason) VALUES (?, ?, ?)",
+                [(self.import_id, line, reason) for line, reason in errors],
+            )
+            self.imported += len(inserted)
+            self.rejected += len(errors)
+            cursor.execute(
+                "UPDATE roster_imports SET total_rows = ?, imported = ?, rejected = ? WHERE id = ?",
+                (self.total_rows, self.imported, self.rejected, self.import_id),
+            )
+            sync_search_index(conn)
+            conn.commit()
+            if inserted:
+                cursor.execute(
+                    "SELECT id FROM users WHERE phone IN (SELECT value FROM json_each(?))",
+                    (json.dumps([r['phone'] for r in inserted]),),
+                )
+                users_changed.send(None, user_ids=[row[0] for row in cursor.fetchall()])
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def run(self, lines):
+        """Import CSV text lines (a file object or any iterable of str)."""
+        batch, errors = [], []
+        try:
+            reader = csv.DictReader(lines)
+            for row in reader:
+                self.total_rows += 1
+                line = reader.line_num
+                values, reason = validate_row({(k or '').strip().lower(): v for k, v in row.items()})
+                if values is not None:
+                    repeated = next((c for c in ('phone', 'email', 'nni') if values[c] and values[c] in self._seen[c]), None)
+                    if repeated:
+                        values, reason = None, f'duplicate {repeated} earlier in the file'
+                if values is None:
+                    errors.append((line, reason))
+                else:
+                    for column in ('phone', 'email', 'nni'):
+                        if values[column]:
+                            self._seen[column].add(values[column])
+                    batch.append((line, values))
+                if len(batch) >= self.batch_size or len(errors) >= self.batch_size:
+                    self.flush(batch, errors)
+                    batch, errors = [], []
+            self.flush(batch, errors)
+            self._finish('done')
+        except Exception as err:
+            self._finish('failed', str(err))
+            raise
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return self.summary()
+
+    def _finish(self, status, error=None):
+        conn = get_db_connection()
+        conn.execute(
+            "UPDATE roster_imports SET status = ?, error = ?, total_rows = ?, imported = ?, rejected = ?, "
+            "finished_at = datetime('now') WHERE id = ?",
+            (status, error, self.total_rows, self.imported, self.rejected, self.import_id),
+        )
+        conn.commit()
+        conn.close()
+
+    def summary(self):
+        return {'import_id': self.import_id, 'total_rows': self.total_rows,
+                'imported': self.imported, 'rejected': self.rejected}
+
+
+def import_roster(lines, source, batch_size=1000, workers=None):
+    return RosterImporter(create_import(source), batch_size, workers).run(lines)
+
+
+def run_import(app, import_id, path):
+    with app.app_context():
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                RosterImporter(import_id, app.config['ROSTER_BATCH_SIZE'], app.config['ROSTER_HASH_WORKERS']).run(f)
+        except Exception as err:
+            print(f"Roster import {import_id} failed: {err}")
+        finally:
+            os.remove(path)
+
+
+def start_import(app, import_id, path):
+    """Run an uploaded roster in a background thread so the web request returns at once."""
+    thread = threading.Thread(target=run_import, args=(app, import_id, path), name=f'roster-import-{import_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_imports(limit=10):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM roster_imports ORDER BY id DESC LIMIT ?", (limit,))
+    imports = [dict(r) for r in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return imports
+
+
+def get_errors(import_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT line, reason FROM roster_import_errors WHERE import_id = ? ORDER BY line", (import_id,))
+    errors = [tuple(r) for r in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return errors
@@ -1,5 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, session, request
-from app.models import User, DonationRequest, get_db_connection
+import base64
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash, session, request, Response, stream_with_context, abort
+from app import db
+from app.models import User, DonationRequest
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -11,22 +18,40 @@ def dashboard():
     if not is_admin():
         return redirect(url_for('auth.login'))
     
-    # Simple stats
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role='donor'")
-    donor_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role='requester'")
-    requester_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM donation_requests WHERE status='open'")
-    open_requests_count = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
+    # Trigger-maintained counters, O(1) to read
+    from app.stats import get_counters, breakdown
+    counters = get_counters(['users.donor', 'users.requester', 'requests.open'])
+    donor_count = counters['users.donor']
+    requester_count = counters['users.requester']
+    open_requests_count = counters['requests.open']
+    open_by_blood_type = breakdown('requests.open', by='blood_type')
+    open_by_city = breakdown('requests.open', by='city')[:10]
+
+    from app.broadcast import get_progress
+    broadcasts = get_progress()
     
     return render_template('admin/dashboard.html', 
                            donor_count=donor_count, 
                            requester_count=requester_count, 
-                           open_requests_count=open_requests_count)
+                           open_requests_count=open_requests_count,
+                           open_by_blood_type=open_by_blood_type,
+                           open_by_city=open_by_city,
+                           broadcasts=broadcasts)
+
+def _encode_cursor(cursor):
+    # Opaque page token for the last (created_at, id) of a page
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(f'{cursor[0]}|{cursor[1]}'.encode()).decode()
+
+def _decode_cursor(token):
+    if not token:
+        return None
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(token.encode()).decode().rsplit('|', 1)
+        return (created_at, int(row_id))
+    except (ValueError, UnicodeDecodeError):
+        return None
 
 @bp.route('/users')
 def users():
@@ -34,22 +59,28 @@ def users():
         return redirect(url_for('auth.login'))
     
     search = request.args.get('search', '')
+    role = request.args.get('role', '')
+    active = request.args.get('active', '')
     
+    is_active = {'1': True, '0': False}.get(active)
+    page = request.args.get('page', 1, type=int)
+    has_next = False
     if search:
-        # Search by name or email
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM users WHERE name LIKE %s OR email LIKE %s ORDER BY created_at DESC"
-        cursor.execute(query, (f'%{search}%', f'%{search}%'))
-        users_list = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        users_list, has_next = User.search(search, role=role or None, is_active=is_active, page=page)
+        next_cursor = None
     else:
-        users_list = [u.__dict__ for u in User.get_all_users()]
+        users_list, next_cursor = User.get_users_page(
+            role=role or None,
+            is_active=is_active,
+            cursor=_decode_cursor(request.args.get('cursor')),
+        )
     
-    return render_template('admin/users.html', users=users_list, search=search)
+    return render_template('admin/users.html', users=users_list, search=search,
+                           role=role, active=active, next_cursor=_encode_cursor(next_cursor),
+                           page=page, has_next=has_next)
 
 @bp.route('/toggle_user/<int:user_id>')
+@db.writes
 def toggle_user(user_id):
     if not is_admin():
         return redirect(url_for('auth.login'))
@@ -75,8 +106,13 @@ def broadcast():
         message = request.form.get('message')
         
         # Admin ID as requester
-        if DonationRequest.create(session['user_id'], blood_type, city, hospital, date, start_time, end_time, message):
-            flash('Broadcast request created!', 'success')
+        request_id = DonationRequest.create(session['user_id'], blood_type, city, hospital, date, start_time, end_time, message, is_broadcast=True)
+        if request_id:
+            # Donors are notified in the background; progress shows on the dashboard
+            from flask import current_app
+            from app.broadcast import start_broadcast
+            start_broadcast(current_app._get_current_object(), request_id)
+            flash('Broadcast request created! Notifying eligible donors...', 'success')
             return redirect(url_for('admin.dashboard'))
         else:
             flash('Error creating broadcast.', 'danger')
@@ -89,11 +125,27 @@ def messages():
         return redirect(url_for('auth.login'))
     
     from app.models import Message
-    messages_list = Message.get_all()
+    search = request.args.get('search', '')
+    status = request.args.get('status', '')
+    is_read = {'unread': False, 'read': True}.get(status)
+    page = request.args.get('page', 1, type=int)
+    has_next = False
+    if search:
+        messages_list, has_next = Message.search(search, is_read=is_read, page=page)
+        next_cursor = None
+    else:
+        messages_list, next_cursor = Message.get_page(
+            is_read=is_read,
+            cursor=_decode_cursor(request.args.get('cursor')),
+        )
     
-    return render_template('admin/messages.html', messages=messages_list)
+    return render_template('admin/messages.html', messages=messages_list, search=search,
+                           status=status, next_cursor=_encode_cursor(next_cursor),
+                           page=page, has_next=has_next,
+                           unread_count=Message.get_unread_count())
 
 @bp.route('/messages/<int:message_id>/read')
+@db.writes
 def mark_message_read(message_id):
     if not is_admin():
         return redirect(url_for('auth.login'))
@@ -102,3 +154,145 @@ def mark_message_read(message_id):
     Message.mark_read(message_id)
     flash('Message marked as read.', 'success')
     return redirect(url_for('admin.messages'))
+
+@bp.route('/messages/read', methods=['POST'])
+def mark_messages_read():
+    if not is_admin():
+        return redirect(url_for('auth.login'))
+    
+    from app.models import Message
+    if request.form.get('all'):
+        changed = Message.mark_all_read()
+    else:
+        changed = Message.mark_many_read(request.form.getlist('message_ids', type=int))
+    if changed is None:
+        flash('Error updating messages.', 'danger')
+    else:
+        flash(f'{changed} message(s) marked as read.', 'success')
+    return redirect(url_for('admin.messages', search=request.form.get('search') or None,
+                            status=request.form.get('status') or None))
+
+def _export_date(name):
+    value = request.args.get(name) or None
+    if value:
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            abort(400)
+    return value
+
+@bp.route('/export/<name>')
+@db.reports
+def export(name):
+    if not is_admin():
+        return redirect(url_for('auth.login'))
+
+    from app.export import EXPORTS, stream_export
+    fmt = request.args.get('format', 'csv')
+    if name not in EXPORTS or fmt not in ('csv', 'jsonl'):
+        abort(404)
+    compress = request.args.get('gzip') == '1'
+    body = stream_export(
+        name, fmt, compress,
+        since=_export_date('since'),
+        until=_export_date('until'),
+        city=request.args.get('city') or None,
+    )
+
+    filename = f"{name}-{datetime.now():%Y%m%d}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    # No Content-Length, so the body goes out with chunked transfer as it is produced
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@bp.route('/import', methods=['GET', 'POST'])
+def import_roster():
+    if not is_admin():
+        return redirect(url_for('auth.login'))
+
+    from app.roster import create_import, start_import, get_imports
+    if request.method == 'POST':
+        upload = request.files.get('roster')
+        if not upload or not upload.filename:
+            flash('Choose a CSV file to import.', 'danger')
+        else:
+            # The import runs after this request ends, so keep the upload on disk
+            fd, path = tempfile.mkstemp(prefix='roster_', suffix='.csv')
+            with os.fdopen(fd, 'wb') as f:
+                upload.save(f)
+            from flask import current_app
+            import_id = create_import(upload.filename)
+            start_import(current_app._get_current_object(), import_id, path)
+            flash('Import started. Refresh this page to follow its progress.', 'success')
+            return redirect(url_for('admin.import_roster'))
+
+    return render_template('admin/import.html', imports=get_imports())
+
+@bp.route('/import/<int:import_id>/errors')
+def import_errors(import_id):
+    if not is_admin():
+        return redirect(url_for('auth.login'))
+
+    from app.roster import get_errors
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['line', 'reason'])
+    writer.writerows(get_errors(import_id))
+    return Response(out.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="import-{import_id}-errors.csv"'})
+
+@bp.route('/analytics')
+@db.reports
+def analytics():
+    if not is_admin():
+        return redirect(url_for('auth.login'))
+
+    from app.analytics import trend, rollup_cities
+    from app.forecast import get_supply_forecast
+    city = request.args.get('city', '')
+    blood_type = request.args.get('blood_type', '')
+    days = request.args.get('days', 30, type=int)
+    if days not in (30, 90, 365):
+        days = 30
+    series = trend(city or None, blood_type or None, days)
+    charts = [
+        ('Requests created', 'requests_created'),
+        ('Requests fulfilled', 'requests_fulfilled'),
+        ('Requests cancelled', 'requests_cancelled'),
+        ('Donations', 'donations'),
+        ('New donors', 'new_donors'),
+        ('Eligible donors', 'eligible_donors'),
+    ]
+    peaks = {column: max(day[column] for day in series) for _, column in charts}
+    totals = {column: sum(day[column] for day in series) for _, column in charts}
+    shortages = [s for s in get_supply_forecast().get()['shortages']
+                 if (not city or s['city'] == city) and (not blood_type or s['blood_type'] == blood_type)]
+    return render_template('admin/analytics.html', series=series, charts=charts, peaks=peaks,
+                           totals=totals, cities=rollup_cities(), city=city,
+                           blood_type=blood_type, days=days, shortages=shortages[:50])
+
+@bp.route('/metrics')
+def metrics():
+    if not is_admin():
+        return {'success': False, 'message': 'Unauthorized'}, 401
+
+    from flask import current_app
+    from app.donor_index import get_donor_index
+    from app.forecast import get_supply_forecast
+    from app.passwords import get_login_guard, get_password_hasher
+    from app.user_cache import get_user_cache
+    from app.utils.email import get_mail_sender, queue_depth
+    donor_index = get_donor_index()
+    mail_sender = get_mail_sender()
+    return {
+        'db_pool': current_app.extensions['db_pool'].stats(),
+        'db_read_pool': current_app.extensions['db_read_pool'] and current_app.extensions['db_read_pool'].stats(),
+        'db_snapshot_pool': current_app.extensions['db_snapshot_pool'] and current_app.extensions['db_snapshot_pool'].stats(),
+        'donor_index': donor_index.stats() if donor_index else None,
+        'forecast': get_supply_forecast().stats(),
+        'password_hashing': get_password_hasher().stats(),
+        'login_guard': get_login_guard().stats(),
+        'user_cache': get_user_cache().stats(),
+        'mail': dict(queue_depth(), **(mail_sender.stats() if mail_sender else {})),
+        'scheduler': current_app.extensions['scheduler'].stats(),
+    }
@@ -1,9 +1,16 @@
+import math
+
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session
 from app.models import User
+from app.passwords import HashingBusy, get_login_guard
 from app.translations import get_text
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+def _retry_later(template, message, status, wait):
+    flash(get_text(message), 'danger')
+    return render_template(template), status, {'Retry-After': str(max(1, math.ceil(wait)))}
+
 @bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -22,31 +29,28 @@ def register():
         blood_type = request.form.get('blood_type')
         nni = request.form.get('nni')
 
-        # NNI Validation
-        if nni and User.check_nni_exists(nni):
-            flash(get_text('nni_exists_error'), 'danger')
-            return render_template('auth/register.html')
-        
         # Determine if blood type needed. Donors need it.
         if role == 'donor' and not blood_type:
              flash(get_text('blood_type_required_error'), 'danger')
              return render_template('auth/register.html')
 
-        if User.create(role, name, phone, email, password, city, blood_type, nni):
+        # Uniqueness check, insert and id in one statement (User.register)
+        try:
+            user, errors = User.register(role, name, phone, email, password, city, blood_type, nni)
+        except HashingBusy:
+            return _retry_later('auth/register.html', 'server_busy', 503, 1)
+
+        if user:
             # Auto login
-            user = User.get_by_email(email)
-            if user:
-                session['user_id'] = user.id
-                session['role'] = user.role
-                session['name'] = user.name
-                
-                # Show success modal/page or flash special message
-                return render_template('auth/register_success.html', user=user)
+            session['user_id'] = user.id
+            session['role'] = user.role
+            session['name'] = user.name
 
-            flash(get_text('registration_success'), 'success')
-            return redirect(url_for('auth.login'))
-        else:
-            flash(get_text('registration_failed'), 'danger')
+            # Show success modal/page or flash special message
+            return render_template('auth/register_success.html', user=user)
+
+        for error in errors.values():
+            flash(get_text(error), 'danger')
 
     return render_template('auth/register.html')
 
@@ -55,10 +59,23 @@ def login():
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
-        
+        guard = get_login_guard()
+        ip = request.remote_addr
+        email_key = (email or '').strip().lower()
+
+        wait = guard.check(ip, email_key)
+        if wait:
+            return _retry_later('auth/login.html', 'too_many_attempts', 429, wait)
+
         user = User.get_by_email(email)
-        
-        if user and user.check_password(password):
+
+        try:
+            valid = user is not None and user.check_password(password, guard.is_suspect(ip, email_key))
+        except HashingBusy:
+            return _retry_later('auth/login.html', 'server_busy', 503, 1)
+
+        if valid:
+            guard.succeeded(ip, email_key)
             session['user_id'] = user.id
             session['role'] = user.role
             session['name'] = user.name
@@ -78,6 +95,7 @@ def login():
                 
             return redirect(url_for('index')) # Fallback
         else:
+            guard.failed(ip, email_key)
             flash(get_text('invalid_credentials'), 'danger')
             
     return render_template('auth/login.html')
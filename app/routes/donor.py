@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, session
-from app.models import User, DonationRequest, Donation, get_db_connection
-from datetime import date, timedelta
+from app import db
+from app.models import DonationRequest, Donation
+from app.user_cache import get_current_user
+from datetime import date
 
 bp = Blueprint('donor', __name__, url_prefix='/donor')
 
@@ -9,29 +11,24 @@ def dashboard():
     if 'user_id' not in session or not session.get('role') in ['donor', 'both', 'admin']:
         return redirect(url_for('auth.login'))
     
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
+    if user is None:
+        return redirect(url_for('auth.login'))
     
-    # Check availability and cooldown
+    # Cooldowns are lifted by the scheduled sweep (User.reactivate_expired).
+    # Until it next runs, treat a passed cooldown as available without writing.
     if not user.is_available and user.next_eligible_date:
-        if date.today() >= user.next_eligible_date:
-            # Auto-update to available if cooldown passed
-            # In a real app, this might be a background job or checked on login
-            # Here we do it on dashboard load for simplicity
-             conn = get_db_connection()
-             cursor = conn.cursor()
-             cursor.execute("UPDATE users SET is_available = TRUE WHERE id = %s", (user.id,))
-             conn.commit()
-             cursor.close()
-             conn.close()
-             user.is_available = True # Update local object
+        if user.next_eligible_date <= date.today():
+            user.is_available = True
 
     requests = []
     if user.is_available:
-        requests = DonationRequest.get_open_requests(user.city, user.blood_type)
+        requests = DonationRequest.get_compatible_requests(user.city, user.blood_type)
     
     return render_template('donor/dashboard.html', user=user, requests=requests)
 
 @bp.route('/accept/<int:request_id>')
+@db.writes
 def accept_request(request_id):
     if 'user_id' not in session or not session.get('role') in ['donor', 'both', 'admin']:
         return redirect(url_for('auth.login'))
@@ -55,11 +52,12 @@ def contact_requests():
     return render_template('donor/contact_requests.html', requests=requests)
 
 @bp.route('/contact_action/<int:request_id>/<action>')
+@db.writes
 def contact_action(request_id, action):
     if 'user_id' not in session or not session.get('role') in ['donor', 'both', 'admin']:
         return redirect(url_for('auth.login'))
         
-    from app.models import ContactRequest, User
+    from app.models import ContactRequest
     from app.utils.email import send_email
     
     if action in ['approved', 'rejected']:
@@ -73,11 +71,11 @@ def contact_action(request_id, action):
             
             if action == 'approved':
                 # Trigger cooldown for donor
-                user = User.get_by_id(session['user_id'])
+                user = get_current_user()
                 user.set_cooldown()
                 flash('Cooldown activated: You are marked unavailable for 3 months.', 'info')
                 
-                # Send email to requester (Mock)
+                # Send email to requester (queued, delivered in the background)
                 # We need requester email. 
                 # Let's simplisticly log it or fetch if possible.
                 # Assuming requester_id can be found...
@@ -1,4 +1,7 @@
+import math
+
 from flask import Blueprint, render_template, redirect, url_for, flash, session, request
+from app import db
 from app.models import User, DonationRequest
 
 bp = Blueprint('requester', __name__, url_prefix='/requester')
@@ -40,12 +43,38 @@ def browse_donors():
     
     city = request.args.get('city')
     blood_type = request.args.get('blood_type')
+    nearest = request.args.get('mode') == 'nearest'
     
-    donors = User.get_active_donors(city, blood_type)
+    # Served from memory when the donor index is enabled
+    from app.donor_index import get_donor_index
+    source = get_donor_index() or User
+
+    distances = {}
+    if nearest and city and blood_type:
+        # k nearest available, compatible donors in and around the city
+        from app.geo import MAX_RADIUS_KM, nearest_donors
+        radius = request.args.get('radius', 100, type=float)
+        k = min(request.args.get('k', 20, type=int), 100)
+        if not math.isfinite(radius) or radius <= 0:
+            flash('Search radius must be a positive number of km.', 'warning')
+            found = []
+        else:
+            found = nearest_donors(city, blood_type, k=k, radius_km=min(radius, MAX_RADIUS_KM), source=source)
+            if found is None:
+                flash(f'Unknown city "{city}" for distance search.', 'warning')
+                found = []
+        donors = [donor for donor, _ in found]
+        distances = {donor['id']: km for donor, km in found}
+    elif blood_type:
+        # Everyone who can give to this blood type, exact matches first
+        donors = source.get_compatible_donors(blood_type, city)
+    else:
+        donors = source.get_active_donors(city, blood_type)
     
-    return render_template('requester/browse_donors.html', donors=donors)
+    return render_template('requester/browse_donors.html', donors=donors, distances=distances)
 
 @bp.route('/request_contact/<int:donor_id>', methods=['GET', 'POST'])
+@db.writes
 def request_contact(donor_id):
     if 'user_id' not in session or not session.get('role') in ['requester', 'both', 'admin']:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -88,27 +117,21 @@ def get_contact_info(donor_id):
     if 'user_id' not in session:
         return {'success': False, 'message': 'Unauthorized'}, 401
     
-    from app.models import ContactRequest, User
-    from datetime import datetime, timedelta
+    from app.models import ContactRequest
+    from app.user_cache import load_user
+    from datetime import datetime, timedelta, timezone
     
     status_record = ContactRequest.check_status(session['user_id'], donor_id)
     
     if status_record and status_record['status'] == 'approved':
         # Check expiry
         if status_record['approved_at']:
-            approved_at = status_record['approved_at']
-            # Ensure approved_at is datetime
-            if isinstance(approved_at, str):
-                try:
-                    approved_at = datetime.strptime(approved_at, '%Y-%m-%d %H:%M:%S')
-                except:
-                     pass # Fallback or error
-            
-            expiry_time = approved_at + timedelta(minutes=10)
-            if datetime.now() > expiry_time:
+            # A datetime in UTC, as written by datetime('now')
+            expiry_time = status_record['approved_at'] + timedelta(minutes=10)
+            if datetime.now(timezone.utc).replace(tzinfo=None) > expiry_time:
                 return {'success': False, 'message': 'Contact info expired. 10 minute window closed.'}
                 
-            donor = User.get_by_id(donor_id)
+            donor = load_user(donor_id)
             if donor:
                 return {
                     'success': True,
@@ -0,0 +1,149 @@
+import threading
+import time
+from datetime import datetime
+
+from app import db
+
+
+class Job:
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        # First run one interval after startup, not while the app is starting
+        self.next_run = time.monotonic() + interval
+        self.runs = 0
+        self.last_run = None
+        self.last_result = None
+        self.last_error = None
+        self.last_duration_ms = None
+
+
+class Scheduler:
+    """Runs registered jobs every `interval` seconds on one background thread.
+
+    Each run happens inside an app context, so jobs can use the models as
+    usual. A job's return value is kept as its last_result for /admin/metrics.
+    Only one process per database runs the jobs: the one holding
+    <database>.scheduler.lock. The other workers' schedulers poll for it every
+    lock_poll seconds and take over if that process exits.
+    """
+
+    lock_poll = 5.0
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = None
+
+    def add_job(self, name, interval, func):
+        if interval and interval > 0:
+            self.jobs.append(Job(name, interval, func))
+
+    def start(self):
+        if self.jobs and self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def run_job(self, job):
+        started = time.perf_counter()
+        job.last_run = datetime.now().isoformat(timespec='seconds')
+        try:
+            with self.app.app_context():
+                job.last_result = job.func()
+            job.last_error = None
+        except Exception as err:
+            job.last_error = str(err)
+            print(f"Scheduled job {job.name} failed: {err}")
+        job.runs += 1
+        job.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        job.next_run = time.monotonic() + job.interval
+
+    def _holds_lock(self):
+        if self._lock is None:
+            self._lock = db.try_lock(self.app.config['DATABASE'] + '.scheduler.lock')
+        return self._lock is not None
+
+    def run(self):
+        while not self._stop.is_set():
+            if not self._holds_lock():
+                self._stop.wait(self.lock_poll)
+                continue
+            now = time.monotonic()
+            for job in self.jobs:
+                if job.next_run <= now:
+                    self.run_job(job)
+            wait = min(job.next_run for job in self.jobs) - time.monotonic()
+            self._stop.wait(max(wait, 0.1))
+
+    def stats(self):
+        return {
+            job.name: {
+                'interval': job.interval,
+                'runs': job.runs,
+                'last_run': job.last_run,
+                'last_result': job.last_result,
+                'last_error': job.last_error,
+                'last_duration_ms': job.last_duration_ms,
+            }
+            for job in self.jobs
+        }
+
+
+def sweep_cooldowns():
+    from app.models import User
+    reactivated = User.reactivate_expired()
+    if reactivated:
+        print(f"Cooldown sweep: {len(reactivated)} donors available again.")
+    return {'reactivated': len(reactivated)}
+
+
+def refresh_analytics():
+    from app.analytics import refresh_rollups
+    return refresh_rollups()
+
+
+def sync_search():
+    from app.models import get_db_connection
+    from app.search import sync_search_index
+    conn = get_db_connection()
+    try:
+        indexed = sync_search_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return {'indexed': indexed}
+
+
+def refresh_snapshot():
+    from flask import current_app
+    from app.db import refresh_snapshot
+    return refresh_snapshot(current_app)
+
+
+def resume_broadcasts():
+    from flask import current_app
+    from app.broadcast import resume_broadcasts
+    return {'resumed': len(resume_broadcasts(current_app._get_current_object()))}
+
+
+def init_app(app):
+    scheduler = app.extensions['scheduler'] = Scheduler(app)
+    scheduler.add_job('cooldown_sweep', app.config['COOLDOWN_SWEEP_INTERVAL'], sweep_cooldowns)
+    scheduler.add_job('analytics_rollup', app.config['ANALYTICS_ROLLUP_INTERVAL'], refresh_analytics)
+    scheduler.add_job('search_sync', app.config['SEARCH_SYNC_INTERVAL'], sync_search)
+    scheduler.add_job('broadcast_resume', app.config['BROADCAST_RESUME_INTERVAL'], resume_broadcasts)
+    if app.config['DB_SNAPSHOT_PATH']:
+        scheduler.add_job('db_snapshot', app.config['DB_SNAPSHOT_INTERVAL'], refresh_snapshot)
+    if app.config['SCHEDULER_ENABLED']:
+        scheduler.start()
@@ -0,0 +1,103 @@
+# Full-text search over users_fts and messages_fts (see schema.sql).
+#
+# A query is split into words; every word has to match, either as a prefix of
+# a normalized name/email/phone/city token or by its consonant skeleton, which
+# is what lets "mohamed" find "محمد" and the other way round.
+import json
+import re
+
+from app.utils.text import ARABIC_MARKS, name_skeleton, normalize_search_text, word_skeleton
+
+# bm25 weights in column order: name, email, phone, city, skeleton
+USER_RANK = "bm25(users_fts, 10.0, 4.0, 4.0, 2.0, 3.0)"
+# name, email, message, skeleton
+MESSAGE_RANK = "bm25(messages_fts, 5.0, 3.0, 1.0, 2.0)"
+
+
+def match_expression(query, columns='name email phone city'):
+    """FTS5 MATCH string for a free-text query, or None if it has no words."""
+    terms = []
+    for raw in re.split(r'\W+', ARABIC_MARKS.sub('', query or '')):
+        word = normalize_search_text(raw)
+        if not word:
+            continue
+        term = f'{{{columns}}} : "{word}"*'
+        skeleton = word_skeleton(raw)
+        if len(skeleton) >= 2 and not word.isdigit():
+            term = f'({term} OR skeleton : "{skeleton}"*)'
+        terms.append(term)
+    return ' AND '.join(terms) or None
+
+
+def _user_entries(conn, ids):
+    rows = conn.execute("SELECT id, name, email, phone, city FROM users WHERE id IN (SELECT value FROM json_each(?))",
+                        (json.dumps(ids),))
+    for row_id, name, email, phone, city in rows:
+        phone = (phone or '').replace(' ', '').replace('-', '').replace('+', '')
+        yield (row_id, normalize_search_text(name), normalize_search_text(email), phone,
+               normalize_search_text(city), name_skeleton(name))
+
+
+def _message_entries(conn, ids):
+    rows = conn.execute("SELECT id, name, email, message FROM messages WHERE id IN (SELECT value FROM json_each(?))",
+                        (json.dumps(ids),))
+    for row_id, name, email, message in rows:
+        yield (row_id, normalize_search_text(name), normalize_search_text(email),
+               normalize_search_text(message), name_skeleton(name))
+
+
+# table -> (fts table, its columns, rows to index for a list of ids)
+INDEXES = {
+    'users': ('users_fts', 'name, email, phone, city, skeleton', _user_entries),
+    'messages': ('messages_fts', 'name, email, message, skeleton', _message_entries),
+}
+
+
+def sync_search_index(conn, batch_size=5000):
+    """Write the search entries for the rows the triggers queued in search_pending.
+
+    Runs in the caller's transaction: model methods call it after their
+    INSERT so the entry commits with the row. Returns rows indexed.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    indexed = 0
+    for table, (fts, columns, entries) in INDEXES.items():
+        while True:
+            ids = [row[0] for row in conn.execute(
+                "SELECT row_id FROM search_pending WHERE tbl = ? LIMIT ?", (table, batch_size))]
+            if not ids:
+                break
+            conn.execute(f"DELETE FROM {fts} WHERE rowid IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+            placeholders = ', '.join('?' * (columns.count(',') + 2))
+            conn.executemany(f"INSERT INTO {fts} (rowid, {columns}) VALUES ({placeholders})", entries(conn, ids))
+            conn.execute("DELETE FROM search_pending WHERE tbl = ? AND row_id IN (SELECT value FROM json_each(?))",
+                         (table, json.dumps(ids)))
+            indexed += len(ids)
+    return indexed
+
+
+def ensure_search_index(conn):
+    """Backfill the search tables once when first created, and catch up on
+    rows other writers queued."""
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    for table, (fts, _, _) in INDEXES.items():
+        if conn.execute(f"SELECT 1 FROM {fts} LIMIT 1").fetchone() is None:
+            conn.execute(f"INSERT OR IGNORE INTO search_pending (tbl, row_id) SELECT ?, id FROM {table}", (table,))
+    sync_search_index(conn)
+    conn.commit()
+
+
+def init_app(app):
+    """Index what other tools wrote while the app was down. With nothing
+    queued this is one read and takes no write lock."""
+    from app.models import get_db_connection
+    with app.app_context():
+        conn = get_db_connection()
+        try:
+            if conn.execute("SELECT 1 FROM search_pending LIMIT 1").fetchone():
+                sync_search_index(conn)
+                conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,122 @@
+# Dashboard counters.
+#
+# stats_counters is maintained by triggers on users, donation_requests and
+# messages (see schema.sql), so reading a count is a primary-key lookup.
+# reconcile() recomputes everything from the base tables, reports drift and
+# rewrites the table.
+from app.models import get_db_connection
+
+# Same shape as stats_counters: (metric, city, blood_type, value)
+RECOUNT_QUERIES = [
+    """
+    SELECT 'users.' || role, city, COALESCE(blood_type, ''), COUNT(*) FROM users
+    GROUP BY role, city, COALESCE(blood_type, '')
+    """,
+    """
+    SELECT 'users.' || role, '*', '*', COUNT(*) FROM users GROUP BY role
+    """,
+    """
+    SELECT 'requests.' || status, city, blood_type_required, COUNT(*) FROM donation_requests
+    GROUP BY status, city, blood_type_required
+    """,
+    """
+    SELECT 'requests.' || status, '*', '*', COUNT(*) FROM donation_requests GROUP BY status
+    """,
+    """
+    SELECT 'messages.total', '*', '*', COUNT(*) FROM messages
+    UNION ALL
+    SELECT 'messages.unread', '*', '*', COUNT(*) FROM messages WHERE is_read = 0
+    """,
+]
+
+
+def get_counter(metric, city='*', blood_type='*'):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT value FROM stats_counters WHERE metric = ? AND city = ? AND blood_type = ?",
+        (metric, city, blood_type),
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row[0] if row else 0
+
+
+def get_counters(metrics):
+    """Totals for several metrics in one query, as {metric: value}."""
+    placeholders = ', '.join('?' * len(metrics))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT metric, value FROM stats_counters WHERE metric IN ({placeholders}) AND city = '*' AND blood_type = '*'",
+        tuple(metrics),
+    )
+    values = dict.fromkeys(metrics, 0)
+    values.update(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return values
+
+
+def breakdown(metric, by='city'):
+    """Counts of one metric per city or per blood type, largest first."""
+    column = {'city': 'city', 'blood_type': 'blood_type'}[by]
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {column}, SUM(value) AS total FROM stats_counters
+        WHERE metric = ? AND city != '*'
+        GROUP BY {column}
+        HAVING total > 0
+        ORDER BY total DESC
+    """, (metric,))
+    rows = [(key, total) for key, total in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def reconcile(conn, fix=True):
+    """Recompute every counter from the base tables.
+
+    Returns a list of (metric, city, blood_type, stored, actual) for counters
+    that had drifted. With fix=True the table is rewritten in the same
+    transaction, so concurrent writers cannot slip in between.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        actual = {}
+        for query in RECOUNT_QUERIES:
+            cursor.execute(query)
+            for metric, city, blood_type, value in cursor.fetchall():
+                actual[(metric, city, blood_type)] = value
+
+        cursor.execute("SELECT metric, city, blood_type, value FROM stats_counters")
+        stored = {(m, c, b): v for m, c, b, v in cursor.fetchall()}
+
+        drift = []
+        for key in sorted(set(actual) | set(stored)):
+            if actual.get(key, 0) != stored.get(key, 0):
+                drift.append(key + (stored.get(key, 0), actual.get(key, 0)))
+
+        if fix and (drift or len(stored) != len(actual)):
+            cursor.execute("DELETE FROM stats_counters")
+            cursor.executemany(
+                "INSERT INTO stats_counters (metric, city, blood_type, value) VALUES (?, ?, ?, ?)",
+                [key + (value,) for key, value in actual.items()],
+            )
+        conn.commit()
+        return drift
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ensure_counters(conn):
+    """Backfill the counters once, when the table is first created on an existing database."""
+    if conn.execute("SELECT 1 FROM stats_counters LIMIT 1").fetchone() is None:
+        reconcile(conn)
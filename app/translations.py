@@ -51,6 +51,10 @@ TRANSLATIONS = {
         'go_to_dashboard': 'Go to your Dashboard',
         'role_required_error': 'Please select a role.',
         'nni_exists_error': 'This NNI is already registered.',
+        'nni_invalid_error': 'The NNI must be at most 10 characters.',
+        'phone_exists_error': 'This phone number is already registered.',
+        'phone_invalid_error': 'Please enter a phone number of at most 8 digits.',
+        'email_exists_error': 'This email is already registered.',
         'blood_type_required_error': 'Blood type is required for donors.',
         'registration_success': 'Registration successful! Please login.',
         'registration_failed': 'Registration failed. Email or Phone might already exist.',
@@ -59,6 +63,8 @@ TRANSLATIONS = {
         'continue_to_dashboard': 'Continue to Dashboard',
         'login_success': 'Login successful!',
         'invalid_credentials': 'Invalid email or password.',
+        'too_many_attempts': 'Too many attempts. Please wait a few minutes and try again.',
+        'server_busy': 'The server is busy. Please try again in a moment.',
         'logout_success': 'You have been logged out.',
         
         # Donor/Request
@@ -176,6 +182,10 @@ TRANSLATIONS = {
         'go_to_dashboard': 'الذهاب إلى لوحة التحكم',
         'role_required_error': 'يرجى اختيار دور.',
         'nni_exists_error': 'الرقم الوطني مسجل بالفعل.',
+        'nni_invalid_error': 'يجب ألا يتجاوز الرقم الوطني 10 أحرف.',
+        'phone_exists_error': 'رقم الهاتف مسجل بالفعل.',
+        'phone_invalid_error': 'يرجى إدخال رقم هاتف لا يتجاوز 8 أرقام.',
+        'email_exists_error': 'البريد الإلكتروني مسجل بالفعل.',
         'blood_type_required_error': 'فصيلة الدم مطلوبة للمتبرعين.',
         'registration_success': 'تم التسجيل بنجاح! يرجى تسجيل الدخول.',
         'registration_failed': 'فشل التسجيل. البريد الإلكتروني أو الهاتف قد يكون مستخدماً.',
@@ -184,6 +194,8 @@ TRANSLATIONS = {
         'continue_to_dashboard': 'المتابعة إلى لوحة التحكم',
         'login_success': 'تم تسجيل الدخول بنجاح!',
         'invalid_credentials': 'البريد الإلكتروني أو كلمة المرور غير صحيحة.',
+        'too_many_attempts': 'محاولات كثيرة جداً. يرجى الانتظار بضع دقائق ثم المحاولة مجدداً.',
+        'server_busy': 'الخادم مشغول. يرجى المحاولة بعد لحظات.',
         'logout_success': 'تم تسجيل الخروج.',
         
         # Donor/Request
@@ -0,0 +1,108 @@
+# Cached user lookups for authenticated requests.
+#
+# get_current_user() loads the session's user once per request into
+# g.current_user. Behind it, UserCache keeps recently used users (without
+# password_hash) for USER_CACHE_TTL seconds, least recently used evicted
+# first. Local writes drop the affected users through the users_changed
+# signal (set_cooldown, toggle_active, Donation.create, the cooldown sweep,
+# ...); the TTL bounds how long a write from another process can go unseen.
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context, session
+
+from app.models import User, users_changed
+
+
+class UserCache:
+    def __init__(self, max_size=2048, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # id -> (expires_at, User)
+        # Bumped by invalidate(), so a load that raced with a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        """A copy of the user, so callers may change it freely; None if not found."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return copy.copy(entry[1])
+            self.misses += 1
+            generation = self._generation
+        user = User.get_by_id(user_id)
+        if user is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._users[user_id] = (now + self.ttl, user)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_size:
+                    self._users.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if self._users.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._users.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._users),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+
+def get_user_cache():
+    if has_app_context():
+        return current_app.extensions.get('user_cache')
+    return None
+
+
+def load_user(user_id):
+    cache = get_user_cache()
+    return cache.get(user_id) if cache is not None else User.get_by_id(user_id)
+
+
+def get_current_user():
+    """The logged-in user for this request, or None; loaded at most once."""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = load_user(user_id) if user_id is not None else None
+    return g.current_user
+
+
+def _on_users_changed(sender, user_ids=(), **extra):
+    cache = get_user_cache()
+    if cache is not None:
+        cache.invalidate(user_ids)
+    current = g.get('current_user') if has_app_context() else None
+    if current is not None and current.id in user_ids:
+        g.pop('current_user')
+
+
+def init_app(app):
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    users_changed.connect(_on_users_changed)
@@ -1,14 +1,307 @@
-# Mock Email Service
+# Outbound email.
+#
+# send_email() only appends the message to the outbound_mail table, so request
+# handlers never wait on SMTP. A MailSender thread drains the queue: it claims
+# due messages in batches, sends each batch over one reused SMTP session,
+# retries transient failures with exponential backoff and paces itself with a
+# token bucket. Only one process sends at a time (it holds <database>.mail.lock,
+# the others stand by to take over), so MAIL_RATE is the rate for the whole
+# deployment. Without MAIL_SERVER configured, messages are printed instead
+# (the old mock behaviour).
+import smtplib
+import socket
+import threading
 import time
+from collections import deque
+from email.message import EmailMessage
+
+from flask import current_app, has_app_context
+
+from app import db
+from app.models import get_db_connection
+from app.utils.ratelimit import TokenBucket
+
+
+def enqueue(cursor, to_email, subject, body):
+    """Add a message to the queue in the caller's transaction; returns its id."""
+    cursor.execute(
+        "INSERT INTO outbound_mail (to_email, subject, body) VALUES (?, ?, ?)",
+        (to_email, subject, body),
+    )
+    return cursor.lastrowid
+
 
 def send_email(to_email, subject, body):
-    """
-    Mock email sending function.
-    In a real app, this would use SMTP or an API like SendGrid/Mailgun.
-    """
-    print(f"--- MOCK EMAIL START ---")
-    print(f"To: {to_email}")
-    print(f"Subject: {subject}")
-    print(f"Body: {body}")
-    print(f"--- MOCK EMAIL END ---")
-    return True
+    """Queue an email for background delivery. Returns True once it is queued."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        enqueue(cursor, to_email, subject, body)
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def queue_depth():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM outbound_mail WHERE status = 'queued'")
+    queued = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM outbound_mail WHERE status = 'sending'")
+    sending = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return {'queued': queued, 'sending': sending}
+
+
+class PermanentMailError(Exception):
+    """The server rejected the message itself; retrying will not help."""
+
+
+class MockTransport:
+    def send(self, message):
+        print(f"--- MOCK EMAIL START ---")
+        print(f"To: {message['To']}")
+        print(f"Subject: {message['Subject']}")
+        print(f"Body: {message.get_content()}")
+        print(f"--- MOCK EMAIL END ---")
+
+    def close(self):
+        pass
+
+
+class SMTPTransport:
+    """One SMTP session reused for as many messages as possible."""
+
+    def __init__(self, host, port, use_tls=False, username=None, password=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.use_tls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+
+    def send(self, message):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as err:
+            raise PermanentMailError(str(err)) from err
+        except smtplib.SMTPResponseException as err:
+            if err.smtp_code >= 500:
+                self._reset()
+                raise PermanentMailError(f"{err.smtp_code} {err.smtp_error!r}") from err
+            self.close()
+            raise
+        except (smtplib.SMTPException, OSError):
+            # Connection went away; the next message opens a new session
+            self.close()
+            raise
+
+    def _reset(self):
+        try:
+            self._smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            self.close()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+def make_transport(config):
+    if not config.get('MAIL_SERVER'):
+        return MockTransport()
+    return SMTPTransport(
+        config['MAIL_SERVER'],
+        config['MAIL_PORT'],
+        use_tls=config['MAIL_USE_TLS'],
+        username=config.get('MAIL_USERNAME'),
+        password=config.get('MAIL_PASSWORD'),
+    )
+
+
+class MailSender:
+    def __init__(self, app, transport=None):
+        self.app = app
+        config = app.config
+        self.sender = config['MAIL_DEFAULT_SENDER']
+        self.batch_size = config['MAIL_BATCH_SIZE']
+        self.max_attempts = config['MAIL_MAX_ATTEMPTS']
+        self.backoff = config['MAIL_RETRY_BACKOFF']
+        self.poll_interval = config['MAIL_POLL_INTERVAL']
+        self.transport = transport or make_transport(config)
+        self.limiter = TokenBucket(config['MAIL_RATE'], burst=self.batch_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = None
+        self._latencies = deque(maxlen=1000)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='mail-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.transport.close()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def _holds_lock(self):
+        if self._lock is None:
+            self._lock = db.try_lock(self.app.config['DATABASE'] + '.mail.lock')
+        return self._lock is not None
+
+    def run(self):
+        while not self._stop.is_set():
+            if not self._holds_lock():
+                # Another worker is sending; take over if it goes away
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                processed = self.process_batch()
+            except Exception as err:
+                print(f"Mail sender error: {err}")
+                processed = 0
+            if not processed:
+                # Queue is empty: don't hold the SMTP session open while idle
+                self.transport.close()
+                self._stop.wait(self.poll_interval)
+
+    def drain(self):
+        """Send everything that is due now; returns how many messages were handled."""
+        total = 0
+        while True:
+            processed = self.process_batch()
+            if not processed:
+                return total
+            total += processed
+
+    def _claim(self, conn):
+        # Claim atomically so a sender never shares a row with a manual drain
+        # or with the sender that took over from it.
+        # Rows left 'sending' by a crashed sender become claimable again once
+        # their lock expires.
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE outbound_mail
+            SET status = 'sending', locked_until = datetime('now', '+300 seconds'), attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM outbound_mail WHERE status = 'queued' AND next_attempt_at <= datetime('now')
+                UNION ALL
+                SELECT id FROM outbound_mail WHERE status = 'sending' AND locked_until < datetime('now')
+                LIMIT ?
+            )
+            RETURNING id, to_email, subject, body, attempts
+        """, (self.batch_size,))
+        rows = cursor.fetchall()
+        conn.commit()
+        cursor.close()
+        return rows
+
+    def _message(self, row):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = row['to_email']
+        message['Subject'] = row['subject']
+        message.set_content(row['body'])
+        return message
+
+    def process_batch(self):
+        with self.app.app_context():
+            conn = get_db_connection()
+            try:
+                rows = self._claim(conn)
+                if not rows:
+                    return 0
+
+                sent, retry, failed = [], [], []
+                for row in sorted(rows, key=lambda r: r['id']):
+                    self.limiter.acquire()
+                    started = time.perf_counter()
+                    try:
+                        self.transport.send(self._message(row))
+                    except PermanentMailError as err:
+                        failed.append((str(err)[:500], row['id']))
+                    except (smtplib.SMTPException, OSError, socket.timeout) as err:
+                        if row['attempts'] >= self.max_attempts:
+                            failed.append((str(err)[:500], row['id']))
+                        else:
+                            delay = self.backoff * 2 ** (row['attempts'] - 1)
+                            retry.append((f'+{int(delay)} seconds', str(err)[:500], row['id']))
+                    else:
+                        self._latencies.append(time.perf_counter() - started)
+                        sent.append((row['id'],))
+
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE outbound_mail SET status = 'sent', sent_at = datetime('now'), locked_until = NULL WHERE id = ?",
+                    sent,
+                )
+                cursor.executemany(
+                    "UPDATE outbound_mail SET status = 'queued', next_attempt_at = datetime('now', ?), "
+                    "last_error = ?, locked_until = NULL WHERE id = ?",
+                    retry,
+                )
+                cursor.executemany(
+                    "UPDATE outbound_mail SET status = 'failed', last_error = ?, locked_until = NULL WHERE id = ?",
+                    failed,
+                )
+                conn.commit()
+                cursor.close()
+                self.sent += len(sent)
+                self.retried += len(retry)
+                self.failed += len(failed)
+                return len(rows)
+            finally:
+                conn.close()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+        return {
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'send_latency_p50_ms': pct(0.50),
+            'send_latency_p95_ms': pct(0.95),
+        }
+
+
+def get_mail_sender():
+    if has_app_context():
+        return current_app.extensions.get('mail_sender')
+    return None
+
+
+def init_app(app):
+    if app.config['MAIL_SENDER_ENABLED']:
+        sender = app.extensions['mail_sender'] = MailSender(app)
+        sender.start()
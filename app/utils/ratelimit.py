@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Blocking token bucket: acquire() returns once a token is available.
+
+    rate is tokens per second; burst is how many may be taken back to back.
+    A rate of 0 or less disables the limit.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SlidingWindowLimiter:
+    """At most `limit` events per key in any `window` seconds.
+
+    Keeps the timestamps of the last `limit` events per key, so a key is
+    blocked exactly until its oldest event leaves the window. Keys idle for a
+    whole window are dropped once there are more than max_keys of them.
+    """
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = {}
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def _recent(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        return events
+
+    def _prune(self, now):
+        for key in [k for k, events in self._events.items() if not events or events[-1] <= now - self.window]:
+            del self._events[key]
+        # Still too many live keys: forget the oldest ones rather than grow
+        for key in list(self._events)[:len(self._events) - self.max_keys]:
+            del self._events[key]
+
+    def retry_after(self, key, limit=None):
+        """Seconds until key may act again under `limit`, 0 if it may now."""
+        limit = min(limit or self.limit, self.limit)
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            if not events or len(events) < limit:
+                return 0
+            return events[len(events) - limit] + self.window - now
+
+    def count(self, key):
+        with self._lock:
+            events = self._recent(key, time.monotonic())
+            return len(events) if events else 0
+
+    def record(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            if events is None:
+                if len(self._events) >= self.max_keys:
+                    self._prune(now)
+                events = self._events[key] = deque(maxlen=self.limit)
+            events.append(now)
+
+    def hit(self, key, limit=None):
+        """Record an event unless key is over `limit` (at most self.limit).
+
+        Returns 0 when the event was allowed, otherwise the seconds to wait.
+        """
+        wait = self.retry_after(key, limit)
+        if wait:
+            self.blocked += 1
+            return wait
+        self.record(key)
+        return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    def stats(self):
+        return {'keys': len(self._events), 'blocked': self.blocked}
@@ -0,0 +1,71 @@
+# Text normalization for full-text search.
+#
+# normalize_search_text() folds the spelling variants that make the same
+# Arabic name look different (diacritics, tatweel, alef/ya/ta marbuta forms)
+# and case-folds Latin text. name_skeleton() reduces a word in either script
+# to its consonant skeleton so "Mohamed", "Mohammed" and "محمد" all become
+# "mhmd". app/search.py applies both when it writes the users_fts and
+# messages_fts entries.
+import re
+import unicodedata
+
+ARABIC_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ی': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    'ک': 'ك',
+})
+
+# Arabic letters to the Latin consonant they are usually transliterated with;
+# long vowels, hamza and ain carry no consonant.
+ARABIC_TO_LATIN = {
+    'ب': 'b', 'ت': 't', 'ث': 't', 'ج': 'j', 'ح': 'h', 'خ': 'k', 'د': 'd', 'ذ': 'd',
+    'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 's', 'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z',
+    'غ': 'g', 'ف': 'f', 'ق': 'k', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h',
+    'ا': '', 'و': '', 'ي': '', 'ء': '', 'ع': '',
+}
+
+LATIN_DIGRAPHS = [('kh', 'k'), ('sh', 's'), ('ch', 's'), ('th', 't'), ('dh', 'd'), ('gh', 'g'), ('dj', 'j')]
+LATIN_FOLD = str.maketrans({'q': 'k', 'c': 'k', 'p': 'b', 'v': 'f'})
+LATIN_VOWELS = re.compile('[aeiouyw]')
+
+
+def normalize_search_text(text):
+    if text is None:
+        return None
+    text = unicodedata.normalize('NFKC', str(text))
+    text = ARABIC_MARKS.sub('', text)
+    return text.translate(ARABIC_FOLD).casefold()
+
+
+def _strip_latin_accents(word):
+    return ''.join(c for c in unicodedata.normalize('NFKD', word) if not unicodedata.combining(c))
+
+
+def word_skeleton(word):
+    # Ta marbuta is usually silent or a vowel in Latin spellings (Fatimetou,
+    # Khadija), and the article al- is often written apart or dropped.
+    word = normalize_search_text(word.replace('\u0629', ''))
+    if any(ch in ARABIC_TO_LATIN for ch in word):
+        if word.startswith('\u0627\u0644') and len(word) > 3:
+            word = word[2:]
+        latin = ''.join(ARABIC_TO_LATIN.get(ch, '') for ch in word)
+    else:
+        latin = ''.join(ch for ch in _strip_latin_accents(word) if 'a' <= ch <= 'z')
+        for digraph, single in LATIN_DIGRAPHS:
+            latin = latin.replace(digraph, single)
+    latin = LATIN_VOWELS.sub('', latin.translate(LATIN_FOLD))
+    # Doubled consonants (shadda, "mm" in Mohammed) count once
+    return re.sub(r'(.)\1+', r'\1', latin)
+
+
+def name_skeleton(text):
+    """Space separated consonant skeletons of every word in text."""
+    if text is None:
+        return None
+    words = re.split(r'\W+', ARABIC_MARKS.sub('', unicodedata.normalize('NFKC', str(text))))
+    return ' '.join(s for s in (word_skeleton(w) for w in words) if s)
+
@@ -0,0 +1,87 @@
+"""
+Admin user listing: full load versus keyset pages, at up to 1M users.
+
+Seeds a throwaway database, then times User.get_all_users (what admin.users
+used to render) against User.get_users_page for the first page, a page deep
+into the list, and a filtered page, and reports peak Python memory for each.
+Also times User.search (users_fts) for exact, prefix and cross-script queries.
+
+    python bench_admin_users.py --users 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app
+from app.models import User, get_db_connection
+from config import Config
+
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+FIRST_NAMES = ['Mohamed', 'Ahmed', 'Sidi', 'Fatimetou', 'Mariem', 'Khadija', 'Aicha', 'Cheikh',
+               'محمد', 'أحمد', 'فاطمة', 'خديجة', 'مريم', 'عبد الله', 'سيدي', 'عائشة']
+
+
+class BenchConfig(Config):
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_admin_users_'), 'app.db')
+    DONOR_INDEX_ENABLED = False
+
+
+def seed(users, batch=50000):
+    rnd = random.Random(3)
+    conn = get_db_connection()
+    for start in range(0, users, batch):
+        conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni, is_active, created_at) "
+            "VALUES (?, ?, ?, ?, 'x', ?, ?, ?, ?, datetime('2020-01-01', ? || ' minutes'))",
+            ((rnd.choice(['donor', 'donor', 'donor', 'requester', 'both']), f'{rnd.choice(FIRST_NAMES)} {i}', f'p{i}', f'u{i}@bench',
+              rnd.choice(CITIES), rnd.choice(BLOOD_TYPES), f'n{i}', int(rnd.random() < 0.95), str(rnd.randint(0, 3_000_000)))
+             for i in range(start, min(start + batch, users))),
+        )
+        conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def measure(name, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>28} | {elapsed:>10.2f} | {peak / 1024 / 1024:>10.2f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--pages', type=int, default=200, help='how deep to walk before timing a deep page')
+    parser.add_argument('--skip-full', action='store_true', help='skip the full get_all_users load')
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        started = time.perf_counter()
+        seed(args.users)
+        print(f"Seeded {args.users} users in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':>28} | {'ms':>10} | {'peak MB':>10}")
+        if not args.skip_full:
+            measure('get_all_users (old page)', lambda: [u.__dict__ for u in User.get_all_users()])
+        _, cursor = measure('keyset page 1', lambda: User.get_users_page())
+        for _ in range(args.pages - 2):
+            _, cursor = User.get_users_page(cursor=cursor)
+        measure(f'keyset page {args.pages}', lambda: User.get_users_page(cursor=cursor))
+        measure('keyset page 1, role+active', lambda: User.get_users_page(role='donor', is_active=True))
+        measure(f'keyset page {args.pages}, role', lambda: User.get_users_page(role='requester', cursor=cursor))
+        for query in ['u4242@bench', 'p12345', 'khadija 777', 'محمد 42', 'mariem', 'mo']:
+            measure(f'search {query!r}', lambda: User.search(query))
+
+
+if __name__ == '__main__':
+    main()
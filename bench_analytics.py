@@ -0,0 +1,121 @@
+"""
+Trend charts from daily_rollups versus aggregating the raw tables.
+
+Seeds a throwaway database with users and donation requests spread over two
+years, builds the rollups from scratch, then times a 90-day trend read from
+the rollups against the same numbers computed from the base tables, and an
+incremental refresh after a handful of writes.
+
+    python bench_analytics.py --users 500000 --requests 300000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import create_app
+from app.analytics import refresh_rollups, trend
+from app.models import get_db_connection
+from config import Config
+
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+TODAY = date(2026, 3, 1)
+
+RAW_TREND = """
+    SELECT day, SUM(created), SUM(fulfilled), SUM(cancelled), SUM(donations), SUM(new_donors) FROM (
+        SELECT date(created_at) AS day, 1 AS created, 0 AS fulfilled, 0 AS cancelled, 0 AS donations, 0 AS new_donors
+        FROM donation_requests WHERE created_at >= :start
+        UNION ALL
+        SELECT donation_date, 0, status = 'fulfilled', status = 'cancelled', 0, 0
+        FROM donation_requests WHERE donation_date >= :start
+        UNION ALL
+        SELECT r.donation_date, 0, 0, 0, 1, 0 FROM donations d JOIN donation_requests r ON r.id = d.request_id
+        WHERE r.donation_date >= :start
+        UNION ALL
+        SELECT date(created_at), 0, 0, 0, 0, 1 FROM users
+        WHERE created_at >= :start AND role IN ('donor', 'both')
+    ) GROUP BY day
+"""
+
+
+class BenchConfig(Config):
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_analytics_'), 'app.db')
+    DONOR_INDEX_ENABLED = False
+
+
+def seed(users, requests, batch=50000):
+    rnd = random.Random(11)
+
+    def when():
+        return (TODAY - timedelta(days=rnd.randint(0, 730))).isoformat()
+
+    conn = get_db_connection()
+    for start in range(0, users, batch):
+        conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni, created_at) "
+            "VALUES ('donor', 'Bench', ?, ?, 'x', ?, ?, ?, ? || ' 10:00:00')",
+            ((f'p{i}', f'u{i}@bench', rnd.choice(CITIES), rnd.choice(BLOOD_TYPES), f'n{i}', when())
+             for i in range(start, min(start + batch, users))),
+        )
+        conn.commit()
+    for start in range(0, requests, batch):
+        conn.executemany(
+            "INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location, donation_date, "
+            "donation_time_start, donation_time_end, status, created_at) "
+            "VALUES (1, ?, ?, 'H', ?, '08:00', '10:00', ?, ? || ' 09:00:00')",
+            ((rnd.choice(BLOOD_TYPES), rnd.choice(CITIES), when(), rnd.choice(['open', 'fulfilled', 'cancelled']), when())
+             for _ in range(start, min(start + batch, requests))),
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def timed(label, fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:>40}: {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500000)
+    parser.add_argument('--requests', type=int, default=300000)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        seed(args.users, args.requests)
+        started = time.perf_counter()
+        result = refresh_rollups(today=TODAY.isoformat())
+        print(f"Initial build: {result['days']} days in {time.perf_counter() - started:.1f}s\n")
+
+        start = (TODAY - timedelta(days=89)).isoformat()
+
+        def raw():
+            conn = get_db_connection()
+            rows = conn.execute(RAW_TREND, {'start': start}).fetchall()
+            conn.close()
+            return rows
+
+        timed('raw tables, 90 days', raw, repeat=2)
+        timed('rollups, 90 days', lambda: trend(days=90, today=TODAY.isoformat()))
+        timed('rollups, 90 days, one city + type', lambda: trend('Rosso', 'O-', days=90, today=TODAY.isoformat()))
+        timed('rollups, 365 days', lambda: trend(days=365, today=TODAY.isoformat()))
+
+        conn = get_db_connection()
+        conn.execute("UPDATE donation_requests SET status = 'fulfilled' WHERE id IN (10, 20, 30)")
+        conn.commit()
+        conn.close()
+        timed('incremental refresh after 3 updates', lambda: refresh_rollups(today=TODAY.isoformat()), repeat=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Donor supply forecast recompute time and cache hits.
+
+Seeds a throwaway database with donors, a share of them cooling down with
+next_eligible_date spread over the next 90 days, and open requests over the
+same window, then times a full recompute and a cached read.
+
+    python bench_forecast.py --users 500000 --requests 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import create_app
+from app.forecast import get_supply_forecast
+from app.models import get_db_connection
+from config import Config
+
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+TODAY = date(2026, 3, 1)
+
+
+class BenchConfig(Config):
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_forecast_'), 'app.db')
+    DONOR_INDEX_ENABLED = False
+
+
+def seed(users, requests, cooling=0.3, batch=50000):
+    rnd = random.Random(17)
+
+    def cooldown():
+        if rnd.random() < cooling:
+            return 0, (TODAY + timedelta(days=rnd.randint(-5, 95))).isoformat()
+        return 1, None
+
+    conn = get_db_connection()
+    for start in range(0, users, batch):
+        conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni, "
+            "is_available, next_eligible_date) VALUES ('donor', 'Bench', ?, ?, 'x', ?, ?, ?, ?, ?)",
+            ((f'p{i}', f'u{i}@bench', rnd.choice(CITIES), rnd.choice(BLOOD_TYPES), f'n{i}') + cooldown()
+             for i in range(start, min(start + batch, users))),
+        )
+        conn.commit()
+    conn.executemany(
+        "INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location, donation_date, "
+        "donation_time_start, donation_time_end) VALUES (1, ?, ?, 'H', ?, '08:00', '10:00')",
+        ((rnd.choice(BLOOD_TYPES), rnd.choice(CITIES), (TODAY + timedelta(days=rnd.randint(0, 89))).isoformat())
+         for _ in range(requests)),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500000)
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        seed(args.users, args.requests)
+        forecast = get_supply_forecast()
+
+        timings = []
+        for _ in range(5):
+            forecast._key = None
+            started = time.perf_counter()
+            result = forecast.get(TODAY.isoformat())
+            timings.append(time.perf_counter() - started)
+        print(f"{'full recompute':>20}: {min(timings) * 1000:9.1f} ms (best of 5)")
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            forecast.get(TODAY.isoformat())
+        print(f"{'cached read':>20}: {(time.perf_counter() - started):9.3f} ms (mean of 1000)")
+        print(f"{'shortages':>20}: {len(result['shortages'])}")
+        print(forecast.stats())
+
+
+if __name__ == '__main__':
+    main()
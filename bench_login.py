@@ -0,0 +1,136 @@
+"""
+Legitimate login latency during a credential-stuffing burst.
+
+Seeds a throwaway database with donors sharing one real password hash, then
+for each mode runs a few "legitimate" clients that log in with the right
+password (each login from a fresh address) while attacker threads hammer
+/auth/login with wrong passwords for random donors from a pool of addresses.
+
+Modes:
+  baseline     no attack, default protection
+  unprotected  attack, with the hashing pool and login limits opened up so
+               every request thread hashes (the old behaviour)
+  protected    attack, default PASSWORD_HASH_* and LOGIN_* settings
+
+    python bench_login.py --attackers 16 --attack-ips 50 --seconds 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.models import get_db_connection
+from config import Config
+
+PASSWORD = 'correct horse'
+
+
+class BenchConfig(Config):
+    TESTING = True
+    DONOR_INDEX_ENABLED = False
+
+
+class UnprotectedConfig(BenchConfig):
+    PASSWORD_HASH_WORKERS = 256
+    PASSWORD_HASH_QUEUE = 100000
+    LOGIN_IP_LIMIT = 10 ** 9
+    LOGIN_EMAIL_LIMIT = 10 ** 9
+
+
+def seed(users, method):
+    password_hash = generate_password_hash(PASSWORD, method)
+    conn = get_db_connection()
+    conn.executemany(
+        "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+        "VALUES ('donor', 'Bench', ?, ?, ?, 'Atar', 'O+', ?)",
+        ((f'{i:08d}', f'u{i}@bench', password_hash, f'n{i}') for i in range(users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def attacker(app, stop, users, ips, delay, statuses, seed_value):
+    rnd = random.Random(seed_value)
+    client = app.test_client()
+    while not stop.is_set():
+        response = client.post('/auth/login', data={'email': f'u{rnd.randrange(users)}@bench', 'password': 'guess'},
+                               environ_base={'REMOTE_ADDR': f'203.0.113.{rnd.randrange(ips)}'})
+        statuses[response.status_code] += 1
+        # Round trip; the attack runs in this process, so without a pause the
+        # refused requests alone would eat the CPU the server is measured on
+        stop.wait(delay)
+
+
+def legitimate(app, stop, users, latencies, statuses, index):
+    client = app.test_client()
+    n = 0
+    while not stop.is_set():
+        n += 1
+        started = time.perf_counter()
+        response = client.post('/auth/login', data={'email': f'u{(index * 7919 + n) % users}@bench', 'password': PASSWORD},
+                               environ_base={'REMOTE_ADDR': f'198.51.{index}.{n % 250}'})
+        latencies.append((started, time.perf_counter() - started))
+        statuses[response.status_code] += 1
+        client.get('/auth/logout')
+        stop.wait(0.25)
+
+
+def run(label, config, args, attack):
+    config.DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_login_'), 'app.db')
+    app = create_app(config)
+    with app.app_context():
+        seed(args.users, app.config['PASSWORD_HASH_METHOD'])
+
+    stop = threading.Event()
+    latencies, legit_statuses, attack_statuses = [], Counter(), Counter()
+    threads = [threading.Thread(target=legitimate, args=(app, stop, args.users, latencies, legit_statuses, i))
+               for i in range(args.legitimate)]
+    if attack:
+        threads += [threading.Thread(target=attacker, args=(app, stop, args.users, args.attack_ips, args.attack_delay,
+                                                        attack_statuses, i))
+                    for i in range(args.attackers)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    def pct(values, p):
+        return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0
+
+    # Second half only: every attack address has been seen by then
+    overall = sorted(latency for _, latency in latencies)
+    settled = sorted(latency for started, latency in latencies if started - began >= args.seconds / 2)
+    print(f"{label:>12}: legit p50 {pct(overall, 0.5):7.1f} ms  p95 {pct(overall, 0.95):7.1f} ms  "
+          f"(second half p50 {pct(settled, 0.5):7.1f} ms  p95 {pct(settled, 0.95):7.1f} ms)")
+    print(f"{'':>12}  legit {dict(legit_statuses)}  attack {dict(attack_statuses)}")
+    with app.app_context():
+        print(f"{'':>12}  hashing {app.extensions['password_hasher'].stats()}")
+    app.extensions['password_hasher'].shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--attackers', type=int, default=16)
+    parser.add_argument('--attack-ips', type=int, default=50)
+    parser.add_argument('--attack-delay', type=float, default=0.05, help='seconds between requests per attacker')
+    parser.add_argument('--legitimate', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    run('baseline', BenchConfig, args, attack=False)
+    run('unprotected', UnprotectedConfig, args, attack=True)
+    run('protected', BenchConfig, args, attack=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Online schema changes on a large users table, and what writers see meanwhile.
+
+Seeds a throwaway database with --rows users, then runs each change while a
+writer thread keeps committing one-row updates (as live traffic would) and
+records how long each of its transactions took, lock waits included.
+
+  add column   ALTER TABLE ... ADD COLUMN through the migration runner
+  index        CREATE INDEX on the new column
+  one-shot     the backfill as a single UPDATE over the whole table
+  batched      the same backfill as a migrations.Backfill, --batch-size rows
+               per transaction with --pause seconds between them
+
+    python bench_migrations.py --rows 1000000 --batch-size 1000 --pause 0.02
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, migrations  # noqa: E402
+from app.migrations import AddColumn, Backfill, CreateIndex, Migration  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def seed(app, rows, batch=50000):
+    from app.models import get_db_connection
+
+    with app.app_context():
+        conn = get_db_connection()
+        for start in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+                "VALUES ('donor', ?, ?, ?, 'x', 'Rosso', 'O+', ?)",
+                ((f'Donor {i}', f'{i:08d}', f'd{i}@bench.mr', f'{i:010d}') for i in range(start, min(start + batch, rows))),
+            )
+            conn.commit()
+        conn.close()
+
+
+def writer(database, stop, latencies):
+    conn = sqlite3.connect(database, timeout=600, isolation_level=None)
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE bench_writes SET n = n + 1 WHERE id = 1")
+        conn.execute("COMMIT")
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.005)
+    conn.close()
+
+
+def measure(label, database, change):
+    latencies, stop = [], threading.Event()
+    thread = threading.Thread(target=writer, args=(database, stop, latencies), daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    change()
+    took = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[int(len(ms) * 0.99)] if ms else 0
+    print(f"{label:>12}: {took:7.2f} s   writer commits {len(ms):5d}  p50 {statistics.median(ms):7.1f}  "
+          f"p99 {p99:7.1f}  max {ms[-1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=migrations.BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=migrations.PAUSE)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix='bench_migrations_'), 'app.db')
+
+    class BenchConfig(Config):
+        DATABASE = database
+        DONOR_INDEX_ENABLED = False
+
+    app = create_app(BenchConfig)
+    started = time.perf_counter()
+    seed(app, args.rows)
+    print(f"seeded {args.rows} users in {time.perf_counter() - started:.1f} s")
+
+    conn = sqlite3.connect(database, timeout=600)
+    # Any table will do: the write lock covers the whole database
+    conn.execute("CREATE TABLE bench_writes (id INTEGER PRIMARY KEY, n INTEGER)")
+    conn.execute("INSERT INTO bench_writes VALUES (1, 0)")
+    conn.commit()
+
+    def quiet(line):
+        pass
+
+    def run(*steps):
+        version = migrations.MIGRATIONS[-1].version + 1
+        migrations.MIGRATIONS.append(Migration(version, f'bench_{version}', list(steps)))
+        migrations.migrate(conn, batch_size=args.batch_size, pause=args.pause, log=quiet)
+
+    def score(conn, start, end):
+        return conn.execute("UPDATE users SET score_b = length(name) WHERE rowid > ? AND rowid <= ?", (start, end)).rowcount
+
+    def one_shot():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE users SET score_a = length(name)")
+        conn.commit()
+
+    measure('add column', database, lambda: run(AddColumn('users', 'score_a', 'INTEGER'),
+                                                AddColumn('users', 'score_b', 'INTEGER')))
+    measure('index', database, lambda: run(CreateIndex('idx_users_score_a', 'users', 'score_a')))
+    measure('one-shot', database, one_shot)
+    measure('batched', database, lambda: run(Backfill('users', score, 'score users')))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Memory use and construction time of model lists, before and after __slots__.
+
+Seeds a throwaway database with users and donation requests, then loads
+--rows of each three ways:
+
+  legacy     SELECT *, sqlite3.Row -> dict -> **kwargs into a __dict__ class
+             (how every loader in app/models.py worked before)
+  slots/all  SELECT *, built by Model.row_factory()
+  slots/page the columns the listing pages select, built by Model.row_factory()
+
+Times are the best of --repeat runs; memory is what the finished list keeps
+alive, measured with tracemalloc in a separate run.
+
+    python bench_models.py --rows 100000
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app
+from app.models import DonationRequest, User, get_db_connection
+from config import Config
+
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+class BenchConfig(Config):
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_models_'), 'app.db')
+    DONOR_INDEX_ENABLED = False
+
+
+class LegacyUser:
+    def __init__(self, id, role, name, phone, email, password_hash, city, blood_type=None, nni=None, is_available=True, last_donation_date=None, next_eligible_date=None, is_active=True, created_at=None, **kwargs):
+        self.id = id
+        self.role = role
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.password_hash = password_hash
+        self.city = city
+        self.blood_type = blood_type
+        self.nni = nni
+        self.is_available = is_available
+        self.last_donation_date = last_donation_date
+        self.next_eligible_date = next_eligible_date
+        self.is_active = is_active
+        self.created_at = created_at
+
+
+class LegacyDonationRequest:
+    def __init__(self, id, requester_id, blood_type_required, city, hospital_location, donation_date, donation_time_start, donation_time_end, message, status, created_at, is_broadcast, **kwargs):
+        self.id = id
+        self.requester_id = requester_id
+        self.blood_type_required = blood_type_required
+        self.city = city
+        self.hospital_location = hospital_location
+        self.donation_date = donation_date
+        self.donation_time_start = donation_time_start
+        self.donation_time_end = donation_time_end
+        self.message = message
+        self.status = status
+        self.created_at = created_at
+        self.is_broadcast = is_broadcast
+        self.exact_match = kwargs.get('exact_match')
+
+
+def seed(rows, batch=50000):
+    rnd = random.Random(5)
+    # A real scrypt hash is ~160 characters; the listing never needs it
+    password_hash = 'scrypt:32768:8:1$' + 'x' * 16 + '$' + 'f' * 128
+    conn = get_db_connection()
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+            "VALUES ('donor', ?, ?, ?, ?, ?, ?, ?)",
+            ((f'Donor {i}', f'{i:08d}', f'donor{i}@bench.mr', password_hash, rnd.choice(CITIES),
+              rnd.choice(BLOOD_TYPES), f'{i:010d}') for i in range(start, min(start + batch, rows))),
+        )
+        conn.executemany(
+            "INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location, donation_date, "
+            "donation_time_start, donation_time_end, message) "
+            "VALUES (1, ?, ?, 'Centre Hospitalier National', '2026-05-01', '08:00', '12:00', ?)",
+            ((rnd.choice(BLOOD_TYPES), rnd.choice(CITIES), 'Urgent need for surgery, please come early. ' * 4)
+             for _ in range(start, min(start + batch, rows))),
+        )
+        conn.commit()
+    conn.close()
+
+
+def legacy(cls, table):
+    def load():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM {table}")
+        result = [cls(**dict(r)) for r in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+        return result
+    return load
+
+
+def slots(cls, table, columns='*'):
+    def load():
+        conn = get_db_connection()
+        cursor = cls.cursor(conn)
+        cursor.execute(f"SELECT {columns} FROM {table}")
+        result = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return result
+    return load
+
+
+def measure(label, load, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = load()
+        best = min(best, time.perf_counter() - started)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:>28}: {best * 1000:8.1f} ms  {retained / 2**20:7.1f} MB retained  {peak / 2**20:7.1f} MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        seed(args.rows)
+        print(f"{args.rows} rows each\n")
+        measure('users legacy', legacy(LegacyUser, 'users'), args.repeat)
+        measure('users slots/all', slots(User, 'users'), args.repeat)
+        measure('users slots/page', slots(User, 'users', User.LISTING_COLUMNS), args.repeat)
+        print()
+        measure('requests legacy', legacy(LegacyDonationRequest, 'donation_requests'), args.repeat)
+        measure('requests slots/all', slots(DonationRequest, 'donation_requests'), args.repeat)
+        measure('requests slots/page', slots(DonationRequest, 'donation_requests', DonationRequest.LISTING_COLUMNS),
+                args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+k-nearest-donor search latency as the donor table grows.
+
+For each size, seeds a throwaway database with donors spread over the
+gazetteer towns and times app.geo.nearest_donors served from the in-memory
+donor index and straight from SQLite.
+
+    python bench_nearest.py --sizes 10000 100000 500000 --k 20 --radius 300
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.donor_index import get_donor_index
+from app.geo import GAZETTEER, nearest_donors
+from app.models import User, get_db_connection
+from config import Config
+
+BLOOD_TYPES = ['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-']
+
+
+def make_config(size):
+    class BenchConfig(Config):
+        DATABASE = os.path.join(tempfile.mkdtemp(prefix=f'bench_nearest_{size}_'), 'app.db')
+    return BenchConfig
+
+
+def seed(donors):
+    rnd = random.Random(11)
+    towns = [name for name, _, _ in GAZETTEER]
+    conn = get_db_connection()
+    conn.executemany(
+        "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni, is_available) "
+        "VALUES ('donor', ?, ?, ?, 'x', ?, ?, ?, ?)",
+        ((f'Donor {i}', f'p{i}', f'd{i}@bench', rnd.choice(towns), rnd.choice(BLOOD_TYPES), f'n{i}',
+          int(rnd.random() < 0.7)) for i in range(donors)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(source, args):
+    towns = [name for name, _, _ in GAZETTEER]
+    samples = []
+    for _ in range(args.repeat):
+        city, blood_type = random.choice(towns), random.choice(BLOOD_TYPES)
+        started = time.perf_counter()
+        nearest_donors(city, blood_type, k=args.k, radius_km=args.radius, source=source)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, max(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--radius', type=float, default=300)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'donors':>8} | {'index p50 ms':>12} | {'index max ms':>12} | {'sql p50 ms':>10} | {'sql max ms':>10}")
+    for size in args.sizes:
+        app = create_app(make_config(size))
+        with app.app_context():
+            seed(size)
+            index = get_donor_index()
+            index.sync()  # build outside the timed loop
+            index_p50, index_max = timed(index, args)
+            sql_p50, sql_max = timed(User, args)
+        print(f"{size:>8} | {index_p50:>12.2f} | {index_max:>12.2f} | {sql_p50:>10.2f} | {sql_max:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
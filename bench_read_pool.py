@@ -0,0 +1,131 @@
+"""
+Mixed workload: heavy GET readers alongside POST writers, with and without
+the read/write connection split.
+
+Seeds a throwaway database with --users donors, then for --seconds runs
+--readers threads looping over the users export and browse_donors (donor
+index off, so both hit SQLite) and --writers threads posting the contact
+form, all through the Flask test client, in three setups:
+
+  shared    DB_READ_POOL_SIZE = 0: every request uses the writer pool
+  split     GETs use the read-only pool
+  snapshot  split, and the export reads a backup-API copy
+
+Writers matter most: their latency is what donors and requesters feel.
+
+    python bench_read_pool.py --users 100000 --profile production
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app  # noqa: E402
+from app.db import refresh_snapshot  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def seed(app, users, batch=50000):
+    from app.models import get_db_connection
+
+    with app.app_context():
+        conn = get_db_connection()
+        for start in range(0, users, batch):
+            conn.executemany(
+                "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+                "VALUES ('donor', ?, ?, ?, 'x', 'Rosso', 'O-', ?)",
+                ((f'Donor {i}', f'{i:08d}', f'd{i}@bench.mr', f'{i:010d}') for i in range(start, min(start + batch, users))),
+            )
+            conn.commit()
+        conn.close()
+
+
+def reader(app, stop, latencies):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['role'] = 'admin'
+    paths = ['/admin/export/users', '/requester/browse_donors?city=Rosso&blood_type=O-']
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get(paths[i % len(paths)])
+        latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+def writer(app, stop, latencies, errors):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.post('/contact', data={'name': 'Bench', 'email': 'w@bench.mr', 'message': 'hello'})
+        if response.status_code != 302:
+            errors.append(response.status_code)
+        latencies.append(time.perf_counter() - started)
+
+
+def run(app, args):
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+    threads = [threading.Thread(target=reader, args=(app, stop, reads)) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(app, stop, writes, errors)) for _ in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return reads, writes, errors
+
+
+def report(label, reads, writes, errors, seconds):
+    def ms(values, q):
+        values = sorted(values)
+        return values[min(int(len(values) * q), len(values) - 1)] * 1000 if values else 0
+
+    print(f"{label:>9}: writes {len(writes) / seconds:6.1f}/s  p50 {ms(writes, 0.5):7.1f}  p99 {ms(writes, 0.99):7.1f}  "
+          f"max {max(writes, default=0) * 1000:7.1f} ms  failed {len(errors)}   "
+          f"reads {len(reads) / seconds:5.1f}/s  p50 {statistics.median(reads) * 1000 if reads else 0:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--profile', default='production')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench_read_pool_')
+
+    def make_app(read_pool_size, snapshot):
+        class BenchConfig(Config):
+            DATABASE = os.path.join(directory, 'app.db')
+            DB_POOL_SIZE = args.pool_size
+            DB_READ_POOL_SIZE = read_pool_size
+            DB_SNAPSHOT_PATH = os.path.join(directory, 'snapshot.db') if snapshot else ''
+            DB_TUNING_PROFILE = args.profile
+            DONOR_INDEX_ENABLED = False
+            USER_CACHE_TTL = 0
+        return create_app(BenchConfig)
+
+    seed(make_app(0, False), args.users)
+    for label, read_pool_size, snapshot in (('shared', 0, False), ('split', args.pool_size, False),
+                                            ('snapshot', args.pool_size, True)):
+        app = make_app(read_pool_size, snapshot)
+        if snapshot:
+            started = time.perf_counter()
+            refresh_snapshot(app)
+            print(f"snapshot copied in {time.perf_counter() - started:.2f} s")
+        report(label, *run(app, args), args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Bulk roster import versus one User.create per donor.
+
+Writes a synthetic roster (with a few bad and duplicate rows), then times
+User.create for a small sample, app.roster.import_roster for the whole file,
+and password hashing alone, to extrapolate both paths to the full roster.
+
+    python bench_roster_import.py --donors 100000 --with-passwords 2000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from config import Config
+
+
+class BenchConfig(Config):
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='bench_roster_'), 'app.db')
+    DONOR_INDEX_ENABLED = False
+
+
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+def make_roster(donors, with_passwords):
+    rnd = random.Random(5)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['name', 'phone', 'email', 'city', 'blood_type', 'nni', 'password'])
+    for i in range(donors):
+        phone = str(40000000 + i)
+        if i % 1000 == 999:
+            phone = str(40000000 + i - 1)  # duplicate of the previous row
+        blood_type = 'X+' if i % 5000 == 4999 else rnd.choice(BLOOD_TYPES)
+        password = f'pw{i}' if i < with_passwords else ''
+        writer.writerow([f'Donor {i}', phone, f'd{i}@bench', rnd.choice(CITIES), blood_type, f'N{i}', password])
+    out.seek(0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--donors', type=int, default=100000)
+    parser.add_argument('--with-passwords', type=int, default=2000, help='rows that carry a password to hash')
+    parser.add_argument('--sample', type=int, default=50, help='User.create calls to time')
+    parser.add_argument('--workers', type=int, default=0)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import User
+    from app.roster import import_roster
+    app = create_app(BenchConfig)
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(args.sample):
+            User.create('donor', f'Single {i}', str(50000000 + i), f's{i}@bench', f'pw{i}', 'Atar', 'O+', f'S{i}')
+        per_create = (time.perf_counter() - started) / args.sample
+        print(f"User.create: {per_create * 1000:.1f} ms/donor -> "
+              f"{per_create * args.donors / 60:.1f} min for {args.donors} donors")
+
+        roster = make_roster(args.donors, args.with_passwords)
+        workers = args.workers or os.cpu_count()
+        started = time.perf_counter()
+        summary = import_roster(roster, 'bench.csv', workers=workers)
+        elapsed = time.perf_counter() - started
+        print(f"import_roster ({workers} hashing processes): {summary['imported']} imported, "
+              f"{summary['rejected']} rejected in {elapsed:.1f}s, "
+              f"{args.with_passwords} of them with passwords")
+
+        hashed = min(args.with_passwords, summary['imported'])
+        if hashed:
+            roster = make_roster(args.donors, 0)
+            no_hash = time.perf_counter()
+            # Same rows again, all duplicates now: validation and dedupe only
+            import_roster(roster, 'bench-again.csv', workers=workers)
+            rest = time.perf_counter() - no_hash
+            print(f"Re-import of the same file (all duplicates): {rest:.1f}s")
+            print(f"Hashing throughput: {hashed / max(elapsed - rest, 1e-9):.1f} passwords/s with {workers} processes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Mixed read/write load benchmark for the SQLite tuning profiles.
+
+Builds a throwaway database from schema.sql for each profile, seeds it with
+donors and open requests, then runs reader threads (browse donors / open
+requests) against writer threads (a donor accepting a request, as in
+Donation.create) for a fixed time.
+
+    python bench_sqlite_profiles.py --donors 50000 --seconds 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from app.db import ConnectionPool, TUNING_PROFILES
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+CITIES = ['Nouakchott', 'Nouadhibou', 'Rosso', 'Kaedi', 'Kiffa', 'Atar', 'Zouerat', 'Selibaby']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+def seed(pool, donors, requests):
+    conn = pool.acquire()
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (('donor', f'Donor {i}', f'p{i}', f'd{i}@bench', 'x', rnd.choice(CITIES), rnd.choice(BLOOD_TYPES), f'n{i}')
+         for i in range(donors)),
+    )
+    conn.executemany(
+        """INSERT INTO donation_requests (requester_id, blood_type_required, city, hospital_location,
+           donation_date, donation_time_start, donation_time_end, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        ((rnd.randint(1, donors), rnd.choice(BLOOD_TYPES), rnd.choice(CITIES), 'Hospital',
+          f'2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}', '08:00', '12:00', 'bench')
+         for _ in range(requests)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def reader(pool, stop, latencies, donors):
+    rnd = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn = pool.acquire()
+        if rnd.random() < 0.5:
+            conn.execute(
+                "SELECT id, name, city, blood_type, is_available, next_eligible_date FROM users "
+                "WHERE (role = 'donor' OR role = 'both') AND is_active = 1 AND city = ? AND blood_type = ?",
+                (rnd.choice(CITIES), rnd.choice(BLOOD_TYPES)),
+            ).fetchall()
+        else:
+            conn.execute(
+                "SELECT * FROM donation_requests WHERE status = 'open' AND city = ? AND blood_type_required = ? "
+                "ORDER BY donation_date ASC",
+                (rnd.choice(CITIES), rnd.choice(BLOOD_TYPES)),
+            ).fetchall()
+        conn.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def writer(pool, stop, latencies, donors, requests):
+    rnd = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn = pool.acquire()
+        donor_id = rnd.randint(1, donors)
+        try:
+            conn.execute("INSERT INTO donations (request_id, donor_id) VALUES (?, ?)", (rnd.randint(1, requests), donor_id))
+            conn.execute("UPDATE users SET is_available = 0 WHERE id = ?", (donor_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, args):
+    workdir = tempfile.mkdtemp(prefix='bench_profile_')
+    pool = ConnectionPool(os.path.join(workdir, 'bench.db'), size=args.readers + args.writers + 1,
+                          timeout=30, profile=profile)
+    seed(pool, args.donors, args.requests)
+
+    stop = threading.Event()
+    read_lat, write_lat = [], []
+    threads = [threading.Thread(target=reader, args=(pool, stop, read_lat, args.donors)) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(pool, stop, write_lat, args.donors, args.requests))
+                for _ in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    pool.close_all()
+
+    return {
+        'profile': profile,
+        'reads/s': len(read_lat) / args.seconds,
+        'writes/s': len(write_lat) / args.seconds,
+        'read p50 ms': statistics.median(read_lat) * 1000 if read_lat else 0.0,
+        'read p99 ms': percentile(read_lat, 99) * 1000,
+        'write p50 ms': statistics.median(write_lat) * 1000 if write_lat else 0.0,
+        'write p99 ms': percentile(write_lat, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=list(TUNING_PROFILES), choices=list(TUNING_PROFILES))
+    parser.add_argument('--donors', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    results = [run_profile(profile, args) for profile in args.profiles]
+    columns = list(results[0])
+    print(' | '.join(f'{c:>12}' for c in columns))
+    for row in results:
+        print(' | '.join(f'{row[c]:>12.1f}' if isinstance(row[c], float) else f'{row[c]:>12}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
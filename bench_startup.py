@@ -0,0 +1,140 @@
+"""
+Cold start: create_app and the first request, in fresh processes.
+
+Seeds a throwaway database, then starts --runs processes one after another
+and --workers processes at once (like gunicorn workers booting), each
+timing its imports, create_app() and a first GET /. While they start, a
+writer thread keeps committing small transactions, as live traffic would.
+
+  current  the database is at SCHEMA_VERSION: one PRAGMA read, no DDL
+  always   each process resets PRAGMA user_version to 0 first, so every
+           start applies schema.sql and the backfills (the old behaviour)
+  upgrade  reset once, then the workers start together: one applies the
+           schema under the file lock, the others wait and skip it
+
+    python bench_startup.py --users 100000 --runs 10 --workers 8
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CHILD = """
+import json, sqlite3, sys, time
+if {reset!r}:
+    sqlite3.connect({database!r}, timeout=30).execute("PRAGMA user_version = 0").connection.close()
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from config import Config
+from app import create_app
+imported = time.perf_counter()
+
+class BenchConfig(Config):
+    DATABASE = {database!r}
+
+app = create_app(BenchConfig)
+created = time.perf_counter()
+status = app.test_client().get('/').status_code
+served = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created, 'status': status}}))
+"""
+
+
+def seed(database, users, batch=50000):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import create_app
+    from config import Config
+
+    class BenchConfig(Config):
+        DATABASE = database
+        DONOR_INDEX_ENABLED = False
+
+    from app.models import get_db_connection
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        conn = get_db_connection()
+        for start in range(0, users, batch):
+            conn.executemany(
+                "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+                "VALUES ('donor', ?, ?, ?, 'x', 'Rosso', 'O+', ?)",
+                ((f'Donor {i}', f'{i:08d}', f'd{i}@bench.mr', f'{i:010d}') for i in range(start, min(start + batch, users))),
+            )
+            conn.commit()
+        conn.close()
+
+
+def writer(database, stop, hold=0.02):
+    # Live traffic: short write transactions back to back
+    conn = sqlite3.connect(database, timeout=30)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE users SET is_available = 1 - is_available WHERE id = 1")
+        time.sleep(hold)
+        conn.commit()
+        time.sleep(0.005)
+    conn.close()
+
+
+def reset_version(database):
+    conn = sqlite3.connect(database, timeout=30)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+
+def start_processes(database, count, reset=False):
+    code = CHILD.format(root=os.path.dirname(os.path.abspath(__file__)), database=database, reset=reset)
+    procs = [subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+             for _ in range(count)]
+    results = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def report(label, results):
+    def ms(key, fn=statistics.median):
+        return fn(r[key] for r in results) * 1000
+
+    total = [r['import'] + r['create_app'] + r['first_request'] for r in results]
+    print(f"{label:>26}: import {ms('import'):6.1f}  create_app {ms('create_app'):6.1f} (max {ms('create_app', max):6.1f})"
+          f"  first request {ms('first_request'):6.1f}  total {statistics.median(total) * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'app.db')
+    seed(database, args.users)
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(database, stop), daemon=True)
+    thread.start()
+    try:
+        for mode in ('current', 'always'):
+            reset = mode == 'always'
+            sequential = []
+            for _ in range(args.runs):
+                sequential.extend(start_processes(database, 1, reset))
+            report(f'{mode}, one at a time', sequential)
+            report(f'{mode}, {args.workers} at once', start_processes(database, args.workers, reset))
+        reset_version(database)
+        report(f'upgrade, {args.workers} at once', start_processes(database, args.workers))
+    finally:
+        stop.set()
+        thread.join()
+
+
+if __name__ == '__main__':
+    main()
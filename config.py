@@ -1,6 +1,93 @@
 import os
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite database file and connection pool sizing
+    DATABASE = os.environ.get('DATABASE') or os.path.join(basedir, 'app.db')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+    # PRAGMA set from app.db.TUNING_PROFILES ('default', 'production', 'durable')
+    DB_TUNING_PROFILE = os.environ.get('DB_TUNING_PROFILE') or 'default'
+    # Read-only connections (app/db.py) for GET requests; 0 sends everything
+    # through the pool above
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+    # Optional copy of the database for exports and analytics, refreshed every
+    # DB_SNAPSHOT_INTERVAL seconds by the scheduler; empty turns it off
+    DB_SNAPSHOT_PATH = os.environ.get('DB_SNAPSHOT_PATH') or ''
+    DB_SNAPSHOT_INTERVAL = float(os.environ.get('DB_SNAPSHOT_INTERVAL', 300))
+
+    # Serve browse_donors from the in-process donor index (app/donor_index.py)
+    DONOR_INDEX_ENABLED = os.environ.get('DONOR_INDEX_ENABLED', '1') == '1'
+
+    # Logged-in user lookups (app/user_cache.py): users kept, and seconds before
+    # a cached user is reloaded (bounds staleness for writes by other processes)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 2048))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+
+    # Emergency broadcast fan-out (app/broadcast.py): rows per transaction when
+    # queueing notifications and their mail. Sending is paced by MAIL_RATE.
+    BROADCAST_BATCH_SIZE = int(os.environ.get('BROADCAST_BATCH_SIZE', 1000))
+
+    # Bulk roster import (app/roster.py): rows per insert transaction and
+    # password hashing processes (0 means one per CPU)
+    ROSTER_BATCH_SIZE = int(os.environ.get('ROSTER_BATCH_SIZE', 1000))
+    ROSTER_HASH_WORKERS = int(os.environ.get('ROSTER_HASH_WORKERS', 0))
+
+    # Password hashing (app/passwords.py). Hashes made with another method are
+    # replaced at the next login. Hashing runs on PASSWORD_HASH_WORKERS threads
+    # (0 means one per CPU) with at most PASSWORD_HASH_QUEUE jobs waiting;
+    # beyond that logins and registrations get a 503 to retry.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # Login attempts per IP and failed logins per email and IP within LOGIN_WINDOW seconds
+    LOGIN_IP_LIMIT = int(os.environ.get('LOGIN_IP_LIMIT', 30))
+    LOGIN_EMAIL_LIMIT = int(os.environ.get('LOGIN_EMAIL_LIMIT', 5))
+    LOGIN_WINDOW = float(os.environ.get('LOGIN_WINDOW', 300))
+
+    # Outbound mail queue (app/utils/email.py). Without MAIL_SERVER messages
+    # are printed instead of sent.
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 25))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '0') == '1'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'no-reply@blooddonation.com'
+    # The sender thread only starts in the web server (ServerConfig), not in
+    # scripts that call create_app()
+    MAIL_SENDER_ENABLED = os.environ.get('MAIL_SENDER_ENABLED', '0') == '1'
+    # Messages per second across all workers: one process sends at a time
+    MAIL_RATE = float(os.environ.get('MAIL_RATE', 20))
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+    MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+    MAIL_RETRY_BACKOFF = float(os.environ.get('MAIL_RETRY_BACKOFF', 30))
+    MAIL_POLL_INTERVAL = float(os.environ.get('MAIL_POLL_INTERVAL', 2))
+
+    # Donor supply forecast (app/forecast.py): horizon in days, and how many
+    # eligible compatible donors each open request should have before a day
+    # is flagged as a shortage
+    FORECAST_DAYS = int(os.environ.get('FORECAST_DAYS', 90))
+    FORECAST_DONORS_PER_REQUEST = int(os.environ.get('FORECAST_DONORS_PER_REQUEST', 3))
+
+    # Background jobs (app/scheduler.py); intervals in seconds, 0 disables a job.
+    # Like the mail sender, only started by the web server (ServerConfig).
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '0') == '1'
+    COOLDOWN_SWEEP_INTERVAL = float(os.environ.get('COOLDOWN_SWEEP_INTERVAL', 3600))
+    ANALYTICS_ROLLUP_INTERVAL = float(os.environ.get('ANALYTICS_ROLLUP_INTERVAL', 300))
+    # Index users/messages written outside the app (sqlite3 shell, scripts)
+    SEARCH_SYNC_INTERVAL = float(os.environ.get('SEARCH_SYNC_INTERVAL', 60))
+    # Pick up broadcasts a restart or an error stopped before all their mail
+    # was queued
+    BROADCAST_RESUME_INTERVAL = float(os.environ.get('BROADCAST_RESUME_INTERVAL', 300))
+
+
+class ServerConfig(Config):
+    # run.py: the web server is where background threads belong
+    MAIL_SENDER_ENABLED = os.environ.get('MAIL_SENDER_ENABLED', '1') == '1'
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
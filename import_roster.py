@@ -0,0 +1,49 @@
+"""
+Import a donor roster CSV into the users table.
+
+    python import_roster.py donors.csv [--report errors.csv] [--workers N]
+
+See app/roster.py for the expected columns. Rejected rows are listed in the
+error report (and kept in roster_import_errors).
+"""
+import argparse
+import csv
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--report', help='write rejected rows (line, reason) to this CSV file')
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--workers', type=int, help='password hashing processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    # Inside main: the hashing pool spawns processes that re-import this module
+    from app import create_app
+    from app.roster import import_roster, get_errors
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        with open(args.path, newline='', encoding='utf-8-sig') as f:
+            summary = import_roster(
+                f, args.path,
+                batch_size=args.batch_size or app.config['ROSTER_BATCH_SIZE'],
+                workers=args.workers or app.config['ROSTER_HASH_WORKERS'],
+            )
+        print(f"Import {summary['import_id']}: {summary['imported']} imported, "
+              f"{summary['rejected']} rejected of {summary['total_rows']} rows "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        if args.report and summary['rejected']:
+            with open(args.report, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'reason'])
+                writer.writerows(get_errors(summary['import_id']))
+            print(f"Error report written to {args.report}")
+    return 1 if summary['rejected'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,15 @@
-import sqlite3
-import os
+from app import create_app
+from app.models import SCHEMA_VERSION
+
 
 def init_db():
+    # create_app() creates the database from schema.sql, or runs the pending
+    # migrations on an existing one, and records the version
+    # (app.models.init_database)
     try:
-        # Get database path
-        db_path = os.path.join(os.path.dirname(__file__), 'app.db')
-        
-        conn = sqlite3.connect(db_path)
-        # Enable foreign key constraints
-        conn.execute('PRAGMA foreign_keys = ON')
-        cursor = conn.cursor()
-        
-        # Read schema
-        schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            schema = f.read()
-        
-        # Execute schema (SQLite can handle multiple statements with executescript)
-        cursor.executescript(schema)
-        
-        conn.commit()
-        print("Database initialized successfully.")
-        print(f"Database created at: {db_path}")
-        conn.close()
+        app = create_app()
+        print(f"Database initialized at schema version {SCHEMA_VERSION}.")
+        print(f"Database created at: {app.config['DATABASE']}")
     except Exception as e:
         print(f"Error initializing database: {e}")
 
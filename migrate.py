@@ -0,0 +1,54 @@
+import argparse
+import sys
+
+from app import migrations
+from app.date_columns import UnparseableDates
+from app.db import file_lock, get_pool
+from config import Config
+
+
+def main():
+    # The app runs pending migrations itself on startup. Run them by hand
+    # first on a big database to pick the batch size and pause, or with
+    # --dry-run to see what would run. The pool is opened directly so a
+    # failing migration can't stop this from starting.
+    parser = argparse.ArgumentParser(description="Apply pending database migrations.")
+    parser.add_argument('--dry-run', action='store_true', help="list the steps and rows they go through, change nothing")
+    parser.add_argument('--status', action='store_true', help="show every migration and whether it has run")
+    parser.add_argument('--target', type=int, help="stop after this version")
+    parser.add_argument('--batch-size', type=int, default=migrations.BATCH_SIZE, help="rows per backfill transaction")
+    parser.add_argument('--pause', type=float, default=migrations.PAUSE, help="seconds to sleep between backfill batches")
+    args = parser.parse_args()
+
+    pool = get_pool(Config.DATABASE, Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT, Config.DB_TUNING_PROFILE)
+    conn = pool.acquire()
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone() is None:
+            print("No database yet; the app creates it in its latest shape on first start.")
+            return 0
+        if args.status:
+            for version, name, state in migrations.status(conn):
+                print(f"  {version:>4} {name:<30} {state}")
+            return 0
+        if args.dry_run:
+            steps = migrations.plan(conn, args.target)
+            for migration, step, rows in steps:
+                print(f"  {migration.version:>4} {migration.name:<24} {step.description}" + (f"  ({rows} rows)" if rows else ""))
+            print("Dry run, nothing changed." if steps else "Nothing to do.")
+            return 0
+        with file_lock(pool.database):
+            applied = migrations.migrate(conn, args.target, args.batch_size, args.pause)
+    except UnparseableDates as err:
+        print("These values are not dates; fix or clear them and run again:")
+        for table, column, row_id, value in err.rows:
+            print(f"  {table}.{column:<20} id={row_id:<8} {value!r}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"Applied {', '.join(map(str, applied))}." if applied else "Nothing to do.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import sys
+
+from app import create_app
+from app.models import get_db_connection
+from app.stats import reconcile
+
+app = create_app()
+app.app_context().push()
+
+
+def main():
+    # --check only reports drift without rewriting the counters
+    fix = '--check' not in sys.argv[1:]
+    conn = get_db_connection()
+    try:
+        drift = reconcile(conn, fix=fix)
+    finally:
+        conn.close()
+
+    if not drift:
+        print("Counters are consistent.")
+        return 0
+
+    print(f"{len(drift)} counters drifted:")
+    for metric, city, blood_type, stored, actual in drift:
+        print(f"  {metric:<20} {city:<15} {blood_type:<8} stored={stored} actual={actual}")
+    print("Counters rewritten." if fix else "Run without --check to fix.")
+    return 1 if not fix else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from app import create_app
+from config import ServerConfig
 
-app = create_app()
+app = create_app(ServerConfig)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,5 +1,10 @@
 -- SQLite Schema for Blood Donation Platform
 -- Note: SQLite doesn't support ENUM types, so we use CHECK constraints instead
+-- Dates are ISO-8601 text. Columns declared 'DATE TEXT' / 'TIMESTAMP TEXT' keep
+-- TEXT affinity and come back as date/datetime objects (see app/db.py).
+-- Every change here needs a new migration in app/migrations.py (with no steps
+-- if existing databases only need this file applied again): they only run it
+-- when their PRAGMA user_version is behind the latest migration.
 
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,8 +36,8 @@ CREATE TABLE IF NOT EXISTS users (
     ),
     nni TEXT UNIQUE,
     is_available INTEGER DEFAULT 1,
-    last_donation_date TEXT,
-    next_eligible_date TEXT,
+    last_donation_date DATE TEXT,
+    next_eligible_date DATE TEXT,
     created_at TEXT DEFAULT(datetime('now')),
     is_active INTEGER DEFAULT 1
 );
@@ -54,7 +59,7 @@ CREATE TABLE IF NOT EXISTS donation_requests (
     ),
     city TEXT NOT NULL,
     hospital_location TEXT NOT NULL,
-    donation_date TEXT NOT NULL,
+    donation_date DATE TEXT NOT NULL,
     donation_time_start TEXT NOT NULL,
     donation_time_end TEXT NOT NULL,
     message TEXT,
@@ -98,7 +103,7 @@ CREATE TABLE IF NOT EXISTS contact_requests (
         )
     ),
     created_at TEXT DEFAULT(datetime('now')),
-    approved_at TEXT,
+    approved_at TIMESTAMP TEXT,
     FOREIGN KEY (requester_id) REFERENCES users (id),
     FOREIGN KEY (donor_id) REFERENCES users (id),
     UNIQUE (requester_id, donor_id)
@@ -111,4 +116,431 @@ CREATE TABLE IF NOT EXISTS messages (
     message TEXT NOT NULL,
     is_read INTEGER DEFAULT 0,
     created_at TEXT DEFAULT(datetime('now'))
-);
\ No newline at end of file
+);
+
+-- Secondary indexes
+-- Every model query should resolve to an index SEARCH (see verify_query_plans.py)
+
+-- Donor matching: User.get_active_donors and the admin role counts
+CREATE INDEX IF NOT EXISTS idx_users_donor_match ON users (role, is_active, city, blood_type);
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at);
+
+-- Open requests by location/type, already in donation_date order
+CREATE INDEX IF NOT EXISTS idx_requests_open_match ON donation_requests (city, blood_type_required, donation_date)
+WHERE status = 'open';
+
+CREATE INDEX IF NOT EXISTS idx_requests_requester ON donation_requests (requester_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_donations_request ON donations (request_id);
+
+CREATE INDEX IF NOT EXISTS idx_donations_donor ON donations (donor_id);
+
+-- Donor inbox of pending contact requests, newest first
+CREATE INDEX IF NOT EXISTS idx_contact_requests_donor ON contact_requests (donor_id, status, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages (created_at);
+
+-- Only unread messages, so the admin badge count stays small
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (created_at)
+WHERE is_read = 0;
+
+
+-- Donor -> recipient blood type pairs, seeded from app/matching.py
+CREATE TABLE IF NOT EXISTS blood_compatibility (
+    donor_type TEXT NOT NULL,
+    recipient_type TEXT NOT NULL,
+    PRIMARY KEY (donor_type, recipient_type)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_blood_compatibility_recipient ON blood_compatibility (recipient_type, donor_type);
+
+
+-- Change log of user ids, read by the in-process caches (app/donor_index.py)
+-- to pick up writes made by other processes. Trimmed to the last 10000 entries.
+CREATE TABLE IF NOT EXISTS user_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_log_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO user_changes (user_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_log_update AFTER UPDATE ON users
+BEGIN
+    INSERT INTO user_changes (user_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_log_delete AFTER DELETE ON users
+BEGIN
+    INSERT INTO user_changes (user_id) VALUES (OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_changes_trim AFTER INSERT ON user_changes
+BEGIN
+    DELETE FROM user_changes WHERE seq <= NEW.seq - 10000;
+END;
+
+
+-- Gazetteer for distance search, seeded from app/geo.py
+CREATE TABLE IF NOT EXISTS cities (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+) WITHOUT ROWID;
+
+
+-- Per-donor delivery state of broadcast requests (app/broadcast.py)
+CREATE TABLE IF NOT EXISTS broadcast_notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id INTEGER NOT NULL,
+    donor_id INTEGER NOT NULL,
+    status TEXT DEFAULT 'queued' CHECK (
+        status IN (
+            'queued',
+            'sent',
+            'failed'
+        )
+    ),
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    created_at TEXT DEFAULT(datetime('now')),
+    sent_at TEXT,
+    -- The donor's email in outbound_mail, once handed to the mail queue
+    mail_id INTEGER REFERENCES outbound_mail (id),
+    FOREIGN KEY (request_id) REFERENCES donation_requests (id),
+    FOREIGN KEY (donor_id) REFERENCES users (id),
+    UNIQUE (request_id, donor_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcast_notifications_status ON broadcast_notifications (request_id, status);
+
+CREATE INDEX IF NOT EXISTS idx_requests_broadcast ON donation_requests (created_at)
+WHERE is_broadcast = 1;
+
+
+-- Durable outbound mail queue, drained by app/utils/email.py:MailSender
+CREATE TABLE IF NOT EXISTS outbound_mail (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT DEFAULT 'queued' CHECK (
+        status IN (
+            'queued',
+            'sending',
+            'sent',
+            'failed'
+        )
+    ),
+    attempts INTEGER DEFAULT 0,
+    next_attempt_at TEXT DEFAULT(datetime('now')),
+    locked_until TEXT,
+    last_error TEXT,
+    created_at TEXT DEFAULT(datetime('now')),
+    sent_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbound_mail_due ON outbound_mail (next_attempt_at)
+WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_outbound_mail_sending ON outbound_mail (locked_until)
+WHERE status = 'sending';
+
+
+-- Donors waiting out their cooldown, for the expiry sweep (User.reactivate_expired)
+CREATE INDEX IF NOT EXISTS idx_users_cooldown ON users (next_eligible_date)
+WHERE is_available = 0;
+
+
+-- Materialized counters kept current by the triggers below (app/stats.py).
+-- One row per (metric, city, blood_type) plus a '*'/'*' total per metric;
+-- users without a blood type are counted under ''.
+CREATE TABLE IF NOT EXISTS stats_counters (
+    metric TEXT NOT NULL,
+    city TEXT NOT NULL,
+    blood_type TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, city, blood_type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('users.' || NEW.role, NEW.city, COALESCE(NEW.blood_type, ''), 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('users.' || NEW.role, '*', '*', 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'users.' || OLD.role AND ((city = OLD.city AND blood_type = COALESCE(OLD.blood_type, '')) OR (city = '*' AND blood_type = '*'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_update AFTER UPDATE OF role, city, blood_type ON users
+WHEN OLD.role IS NOT NEW.role OR OLD.city IS NOT NEW.city OR OLD.blood_type IS NOT NEW.blood_type
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'users.' || OLD.role AND ((city = OLD.city AND blood_type = COALESCE(OLD.blood_type, '')) OR (city = '*' AND blood_type = '*'));
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('users.' || NEW.role, NEW.city, COALESCE(NEW.blood_type, ''), 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('users.' || NEW.role, '*', '*', 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_requests_insert AFTER INSERT ON donation_requests
+BEGIN
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('requests.' || NEW.status, NEW.city, NEW.blood_type_required, 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('requests.' || NEW.status, '*', '*', 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_requests_delete AFTER DELETE ON donation_requests
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'requests.' || OLD.status AND ((city = OLD.city AND blood_type = OLD.blood_type_required) OR (city = '*' AND blood_type = '*'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_requests_update AFTER UPDATE OF status, city, blood_type_required ON donation_requests
+WHEN OLD.status IS NOT NEW.status OR OLD.city IS NOT NEW.city OR OLD.blood_type_required IS NOT NEW.blood_type_required
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'requests.' || OLD.status AND ((city = OLD.city AND blood_type = OLD.blood_type_required) OR (city = '*' AND blood_type = '*'));
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('requests.' || NEW.status, NEW.city, NEW.blood_type_required, 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('requests.' || NEW.status, '*', '*', 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_messages_insert AFTER INSERT ON messages
+BEGIN
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('messages.total', '*', '*', 1)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + 1;
+    INSERT INTO stats_counters (metric, city, blood_type, value) VALUES ('messages.unread', '*', '*', NEW.is_read = 0)
+    ON CONFLICT (metric, city, blood_type) DO UPDATE SET value = value + (NEW.is_read = 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_messages_delete AFTER DELETE ON messages
+BEGIN
+    UPDATE stats_counters SET value = value - 1 WHERE metric = 'messages.total' AND city = '*' AND blood_type = '*';
+    UPDATE stats_counters SET value = value - (OLD.is_read = 0) WHERE metric = 'messages.unread' AND city = '*' AND blood_type = '*';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_messages_update AFTER UPDATE OF is_read ON messages
+WHEN (OLD.is_read = 0) IS NOT (NEW.is_read = 0)
+BEGIN
+    UPDATE stats_counters SET value = value + (NEW.is_read = 0) - (OLD.is_read = 0)
+    WHERE metric = 'messages.unread' AND city = '*' AND blood_type = '*';
+END;
+
+
+-- Keyset pagination of the admin user list on (created_at, id), per filter
+CREATE INDEX IF NOT EXISTS idx_users_role_created ON users (role, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_users_active_created ON users (is_active, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_users_role_active_created ON users (role, is_active, created_at);
+
+
+-- Admin user search. Text is stored already normalized by normalize_search_text()
+-- and name_skeleton() in app/utils/text.py, so Arabic and Latin spellings of
+-- a name meet in the index. The triggers only queue the changed row in
+-- search_pending; app/search.py writes the normalized entry, in the same
+-- transaction for the app's own writes and on the next sync for any other
+-- writer (sqlite3 shell, scripts), which needs no app functions.
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    name, email, phone, city, skeleton,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TABLE IF NOT EXISTS search_pending (
+    tbl TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    PRIMARY KEY (tbl, row_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_insert AFTER INSERT ON users
+BEGIN
+    INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('users', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_update AFTER UPDATE OF name, email, phone, city ON users
+BEGIN
+    INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('users', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_delete AFTER DELETE ON users
+BEGIN
+    DELETE FROM users_fts WHERE rowid = OLD.id;
+    DELETE FROM search_pending WHERE tbl = 'users' AND row_id = OLD.id;
+END;
+
+
+-- Admin inbox: read messages newest first (unread ones use idx_messages_unread)
+CREATE INDEX IF NOT EXISTS idx_messages_read ON messages (created_at)
+WHERE is_read = 1;
+
+-- Admin inbox search, normalized and queued the same way as users_fts
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    name, email, message, skeleton,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert AFTER INSERT ON messages
+BEGIN
+    INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('messages', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update AFTER UPDATE OF name, email, message ON messages
+BEGIN
+    INSERT OR IGNORE INTO search_pending (tbl, row_id) VALUES ('messages', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete AFTER DELETE ON messages
+BEGIN
+    DELETE FROM messages_fts WHERE rowid = OLD.id;
+    DELETE FROM search_pending WHERE tbl = 'messages' AND row_id = OLD.id;
+END;
+
+
+-- Bulk donor roster imports (app/roster.py) and their per-row error reports
+CREATE TABLE IF NOT EXISTS roster_imports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    status TEXT DEFAULT 'running' CHECK (
+        status IN (
+            'running',
+            'done',
+            'failed'
+        )
+    ),
+    total_rows INTEGER DEFAULT 0,
+    imported INTEGER DEFAULT 0,
+    rejected INTEGER DEFAULT 0,
+    error TEXT,
+    created_at TEXT DEFAULT(datetime('now')),
+    finished_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS roster_import_errors (
+    import_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    PRIMARY KEY (import_id, line),
+    FOREIGN KEY (import_id) REFERENCES roster_imports (id)
+) WITHOUT ROWID;
+
+
+-- Daily analytics rollups (app/analytics.py). Flow counts are attributed to
+-- a day: requests to the day they were created, outcomes and donations to
+-- the request's donation_date, new donors to their signup day.
+-- eligible_donors is a snapshot, rewritten for the current day on every
+-- refresh and frozen once the day is over.
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    day TEXT NOT NULL,
+    city TEXT NOT NULL,
+    blood_type TEXT NOT NULL,
+    requests_created INTEGER NOT NULL DEFAULT 0,
+    requests_fulfilled INTEGER NOT NULL DEFAULT 0,
+    requests_cancelled INTEGER NOT NULL DEFAULT 0,
+    donations INTEGER NOT NULL DEFAULT 0,
+    new_donors INTEGER NOT NULL DEFAULT 0,
+    eligible_donors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, city, blood_type)
+) WITHOUT ROWID;
+
+-- Days whose flow counts must be recomputed, filled by the triggers below
+CREATE TABLE IF NOT EXISTS rollup_dirty_days (
+    day TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_requests_created_at ON donation_requests (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_requests_donation_date ON donation_requests (donation_date);
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_requests_insert AFTER INSERT ON donation_requests
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (date(NEW.created_at)), (date(NEW.donation_date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_requests_update
+AFTER UPDATE OF status, city, blood_type_required, donation_date, created_at ON donation_requests
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day)
+    VALUES (date(OLD.created_at)), (date(OLD.donation_date)), (date(NEW.created_at)), (date(NEW.donation_date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_requests_delete AFTER DELETE ON donation_requests
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (date(OLD.created_at)), (date(OLD.donation_date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_donations_insert AFTER INSERT ON donations
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day)
+    SELECT date(donation_date) FROM donation_requests WHERE id = NEW.request_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_donations_update AFTER UPDATE OF status, request_id ON donations
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day)
+    SELECT date(donation_date) FROM donation_requests WHERE id IN (OLD.request_id, NEW.request_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_donations_delete AFTER DELETE ON donations
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day)
+    SELECT date(donation_date) FROM donation_requests WHERE id = OLD.request_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_users_insert AFTER INSERT ON users
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (date(NEW.created_at));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_users_update AFTER UPDATE OF role, city, blood_type, created_at ON users
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (date(OLD.created_at)), (date(NEW.created_at));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_users_delete AFTER DELETE ON users
+BEGIN
+    INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (date(OLD.created_at));
+END;
+
+
+-- Donors on cooldown by return date, covering the supply forecast (app/forecast.py);
+-- is_available is repeated as a column so the index covers the query
+CREATE INDEX IF NOT EXISTS idx_users_cooldown_supply ON users (role, is_active, city, blood_type, next_eligible_date, is_available)
+WHERE is_available = 0;
+
+-- Change counters for caches that depend on a whole table (users have
+-- user_changes instead)
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_version_requests_insert AFTER INSERT ON donation_requests
+BEGIN
+    INSERT INTO data_versions (name, version) VALUES ('donation_requests', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_version_requests_update AFTER UPDATE ON donation_requests
+BEGIN
+    INSERT INTO data_versions (name, version) VALUES ('donation_requests', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_version_requests_delete AFTER DELETE ON donation_requests
+BEGIN
+    INSERT INTO data_versions (name, version) VALUES ('donation_requests', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+END;
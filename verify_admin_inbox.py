@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import create_app
+from app.models import Message, get_db_connection
+from app.search import sync_search_index
+from config import Config
+
+
+class AdminInboxConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='admin_inbox_'), 'app.db')
+
+
+class AdminInboxTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(AdminInboxConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        # A plain connection, as the sqlite3 shell or a script would use
+        conn = sqlite3.connect(AdminInboxConfig.DATABASE)
+        conn.execute("DELETE FROM messages")
+        conn.executemany(
+            "INSERT INTO messages (name, email, message, created_at) VALUES (?, ?, ?, datetime('2026-01-01', ? || ' minutes'))",
+            [(f'Sender {i}', f's{i}@test.com', 'Win a free prize now' if i % 2 else 'Where can I donate?', str(i))
+             for i in range(7)],
+        )
+        conn.commit()
+        conn.close()
+        # Their search entries are written by the next sync
+        conn = get_db_connection()
+        sync_search_index(conn)
+        conn.commit()
+        conn.close()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_keyset_pages_cover_every_message_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = Message.get_page(cursor=cursor, per_page=3)
+            seen.extend(m.name for m in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Sender {i}' for i in range(6, -1, -1)])
+
+    def test_search_and_status_filter(self):
+        rows, _ = Message.search('donate')
+        self.assertEqual(sorted(m.name for m in rows), ['Sender 0', 'Sender 2', 'Sender 4', 'Sender 6'])
+        Message.mark_many_read([m.id for m in rows])
+        rows, _ = Message.search('donate', is_read=False)
+        self.assertEqual(rows, [])
+        unread, _ = Message.get_page(is_read=False)
+        self.assertEqual(len(unread), 3)
+
+    def test_bulk_mark_read_routes(self):
+        ids = [m.id for m in Message.get_page(per_page=2)[0]]
+        response = self.client.post('/admin/messages/read', data={'message_ids': ids})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Message.get_unread_count(), 5)
+
+        self.client.post('/admin/messages/read', data={'all': '1'})
+        self.assertEqual(Message.get_unread_count(), 0)
+
+        response = self.client.get('/admin/messages?status=read&search=prize')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Sender 1', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
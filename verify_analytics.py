@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from app import create_app
+from app.analytics import refresh_rollups, trend
+from app.models import User, DonationRequest, get_db_connection
+from config import Config
+
+
+class AnalyticsConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='analytics_'), 'app.db')
+
+
+TODAY = '2026-03-10'
+
+
+class AnalyticsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(AnalyticsConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        for table in ('donations', 'donation_requests', 'users', 'daily_rollups', 'rollup_dirty_days'):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        conn.close()
+
+        User.create('requester', 'Req', '20000001', 'req@test.com', 'pass', 'Rosso', None, 'A1')
+        User.create('donor', 'Donor A', '20000002', 'a@test.com', 'pass', 'Rosso', 'O-', 'A2')
+        User.create('donor', 'Donor B', '20000003', 'b@test.com', 'pass', 'Rosso', 'O-', 'A3')
+        self.requester = User.get_by_email('req@test.com')
+        for donation_date in ('2026-03-08', '2026-03-08', '2026-03-09'):
+            DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', donation_date, '08:00', '10:00', '')
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET created_at = '2026-03-08 09:00:00'")
+        conn.execute("UPDATE donation_requests SET created_at = '2026-03-07 12:00:00'")
+        conn.execute("UPDATE users SET is_available = 0 WHERE email = 'b@test.com'")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def day(self, series, day):
+        return next(d for d in series if d['day'] == day)
+
+    def test_rollups_follow_writes(self):
+        refresh_rollups(today=TODAY)
+        series = trend(days=5, today=TODAY)
+        self.assertEqual(self.day(series, '2026-03-07')['requests_created'], 3)
+        self.assertEqual(self.day(series, '2026-03-08')['new_donors'], 2)
+        self.assertEqual(self.day(series, TODAY)['eligible_donors'], 1)
+
+        conn = get_db_connection()
+        conn.execute("UPDATE donation_requests SET status = 'fulfilled' WHERE donation_date = '2026-03-09'")
+        conn.commit()
+        dirty = [row[0] for row in conn.execute("SELECT day FROM rollup_dirty_days")]
+        conn.close()
+        self.assertEqual(dirty, ['2026-03-07', '2026-03-09'])
+
+        self.assertEqual(refresh_rollups(today=TODAY), {'days': 2})
+        series = trend('Rosso', 'O-', days=5, today=TODAY)
+        self.assertEqual(self.day(series, '2026-03-09')['requests_fulfilled'], 1)
+        self.assertEqual(self.day(series, '2026-03-07')['requests_created'], 3)
+        self.assertEqual(trend('Atar', days=5, today=TODAY)[-1]['eligible_donors'], 0)
+
+    def test_trend_page(self):
+        refresh_rollups()
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = self.requester.id
+            sess['role'] = 'admin'
+        response = client.get('/admin/analytics?city=Rosso&days=90')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Eligible donors', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
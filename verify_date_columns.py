@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from app import migrations
+from app.date_columns import UnparseableDates, pending_tables
+from app.models import ContactRequest, DonationRequest, User, get_db_connection
+from config import Config
+
+
+class DateColumnsConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='date_columns_'), 'app.db')
+
+
+class DateColumnsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(DateColumnsConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        for table in ('contact_requests', 'donations', 'donation_requests', 'users'):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        conn.close()
+        User.create('requester', 'Req', '20000001', 'req@test.com', 'pass', 'Rosso', None, 'T1')
+        User.create('donor', 'Donor', '20000002', 'donor@test.com', 'pass', 'Rosso', 'O-', 'T2')
+        self.requester = User.get_by_email('req@test.com')
+        self.donor = User.get_by_email('donor@test.com')
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def _untype(self, value):
+        # Turn the database back into one created before the typed columns
+        conn = get_db_connection()
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'users'").fetchone()[0]
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        conn.execute("PRAGMA writable_schema = ON")
+        conn.execute("UPDATE sqlite_master SET sql = ? WHERE name = 'users'",
+                     (sql.replace('next_eligible_date DATE TEXT', 'next_eligible_date TEXT'),))
+        conn.execute(f"PRAGMA schema_version = {version + 1}")
+        conn.execute("PRAGMA writable_schema = OFF")
+        conn.execute("UPDATE users SET next_eligible_date = ? WHERE id = ?", (value, self.donor.id))
+        conn.execute("DELETE FROM schema_migrations WHERE version = 2")
+        conn.commit()
+        return conn
+
+    def test_columns_come_back_typed(self):
+        self.donor.set_cooldown()
+        self.assertEqual(User.get_by_id(self.donor.id).next_eligible_date, date.today() + timedelta(days=90))
+        self.assertFalse(DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', 'next week', '08:00', '10:00', ''))
+        upcoming = date.today() + timedelta(days=3)
+        DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', upcoming.isoformat(), '08:00', '10:00', '')
+        DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', '2020-01-01', '08:00', '10:00', '')
+        self.assertEqual([r.donation_date for r in DonationRequest.get_compatible_requests('Rosso', 'O-')], [upcoming])
+
+    def test_contact_window(self):
+        ContactRequest.create(self.requester.id, self.donor.id)
+        conn = get_db_connection()
+        request_id = conn.execute("SELECT id FROM contact_requests").fetchone()[0]
+        conn.close()
+        ContactRequest.update_status(request_id, 'approved')
+        self.assertIsInstance(ContactRequest.check_status(self.requester.id, self.donor.id)['approved_at'], datetime)
+
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = self.requester.id
+            sess['role'] = 'requester'
+        self.assertTrue(client.get(f'/requester/get_contact_info/{self.donor.id}').get_json()['success'])
+        conn = get_db_connection()
+        conn.execute("UPDATE contact_requests SET approved_at = datetime('now', '-11 minutes')")
+        conn.commit()
+        conn.close()
+        self.assertFalse(client.get(f'/requester/get_contact_info/{self.donor.id}').get_json()['success'])
+
+    def test_migration(self):
+        conn = self._untype('2026-05-01 00:00:00')
+        try:
+            self.assertEqual(list(pending_tables(conn)), ['users'])
+            migrations.migrate(conn, log=lambda line: None)
+            self.assertEqual(pending_tables(conn), {})
+        finally:
+            conn.close()
+        self.assertEqual(User.get_by_id(self.donor.id).next_eligible_date, date(2026, 5, 1))
+
+        conn = self._untype('soon')
+        try:
+            with self.assertRaises(UnparseableDates):
+                migrations.migrate(conn, log=lambda line: None)
+            # Nothing changed
+            self.assertEqual(list(pending_tables(conn)), ['users'])
+            conn.execute("UPDATE users SET next_eligible_date = NULL WHERE id = ?", (self.donor.id,))
+            conn.commit()
+            migrations.migrate(conn, log=lambda line: None)
+            self.assertEqual(pending_tables(conn), {})
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
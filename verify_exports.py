@@ -0,0 +1,65 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from app import create_app
+from app.models import User, get_db_connection
+from config import Config
+
+
+class ExportConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='exports_'), 'app.db')
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(ExportConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'Old Donor', '11000001', 'old@test.com', 'pass', 'Rosso', 'O+', 'E1')
+        User.create('donor', 'New Donor', '11000002', 'new@test.com', 'pass', 'Nouakchott', 'A+', 'E2')
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET created_at = '2024-03-01 10:00:00' WHERE email = 'old@test.com'")
+        conn.commit()
+        conn.close()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_csv_export_omits_password_hash(self):
+        response = self.client.get('/admin/export/users')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([r['email'] for r in rows], ['old@test.com', 'new@test.com'])
+        self.assertNotIn('password_hash', rows[0])
+
+    def test_filters_and_gzip_jsonl(self):
+        response = self.client.get('/admin/export/users?format=jsonl&gzip=1&until=2024-03-01')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Old Donor'])
+
+        response = self.client.get('/admin/export/users?format=jsonl&city=Nouakchott&since=2024-03-02')
+        self.assertEqual([json.loads(line)['name'] for line in response.data.decode().splitlines()], ['New Donor'])
+
+    def test_bad_input(self):
+        self.assertEqual(self.client.get('/admin/export/messages').status_code, 404)
+        self.assertEqual(self.client.get('/admin/export/users?since=yesterday').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,18 @@
-
+import os
+import tempfile
 import unittest
 from app import create_app
 from app.models import User
 import mysql.connector
 from config import Config
 
+class FeaturesConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='features_'), 'app.db')
+
 class FeaturesTestCase(unittest.TestCase):
     def setUp(self):
-        self.app = create_app()
+        self.app = create_app(FeaturesConfig)
         self.client = self.app.test_client()
         self.app.config['TESTING'] = True
         
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from app import create_app
+from app.forecast import get_supply_forecast
+from app.models import User, DonationRequest, get_db_connection
+from config import Config
+
+
+class ForecastConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='forecast_'), 'app.db')
+    FORECAST_DAYS = 30
+    FORECAST_DONORS_PER_REQUEST = 2
+
+
+TODAY = '2026-03-10'
+
+
+class ForecastTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(ForecastConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        for table in ('donations', 'donation_requests', 'users'):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        conn.close()
+
+        User.create('requester', 'Req', '20000001', 'req@test.com', 'pass', 'Rosso', None, 'F1')
+        User.create('donor', 'Donor A', '20000002', 'a@test.com', 'pass', 'Rosso', 'O-', 'F2')
+        User.create('donor', 'Donor B', '20000003', 'b@test.com', 'pass', 'Rosso', 'O-', 'F3')
+        User.create('donor', 'Donor C', '20000004', 'c@test.com', 'pass', 'Rosso', 'A+', 'F4')
+        User.create('donor', 'Donor D', '20000005', 'd@test.com', 'pass', 'Atar', 'O-', 'F5')
+        self.requester = User.get_by_email('req@test.com')
+        conn = get_db_connection()
+        # B returns on the 15th, C on the 20th; D was due back already
+        conn.execute("UPDATE users SET is_available = 0, next_eligible_date = '2026-03-15' WHERE email = 'b@test.com'")
+        conn.execute("UPDATE users SET is_available = 0, next_eligible_date = '2026-03-20' WHERE email = 'c@test.com'")
+        conn.execute("UPDATE users SET is_available = 0, next_eligible_date = '2026-03-01' WHERE email = 'd@test.com'")
+        conn.commit()
+        conn.close()
+        self.forecast = get_supply_forecast()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_returning_donors_are_bucketed_by_day(self):
+        self.assertEqual(self.forecast.supply_on('Rosso', 'O-', '2026-03-10', today=TODAY), 1)
+        self.assertEqual(self.forecast.supply_on('Rosso', 'O-', '2026-03-14', today=TODAY), 1)
+        self.assertEqual(self.forecast.supply_on('Rosso', 'O-', '2026-03-15', today=TODAY), 2)
+        self.assertEqual(self.forecast.supply_on('Rosso', 'A+', '2026-03-19', today=TODAY), 0)
+        self.assertEqual(self.forecast.supply_on('Rosso', 'A+', '2026-03-20', today=TODAY), 1)
+        self.assertEqual(self.forecast.supply_on('Atar', 'O-', '2026-03-10', today=TODAY), 1)
+        with self.assertRaises(ValueError):
+            self.forecast.supply_on('Rosso', 'O-', '2026-04-30', today=TODAY)
+
+    def test_shortages_count_compatible_donors(self):
+        DonationRequest.create(self.requester.id, 'A+', 'Rosso', 'CHR', '2026-03-12', '08:00', '10:00', '')
+        DonationRequest.create(self.requester.id, 'A+', 'Rosso', 'CHR', '2026-03-22', '08:00', '10:00', '')
+        DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', '2026-03-22', '08:00', '10:00', '')
+        shortages = self.forecast.get(TODAY)['shortages']
+        # On the 12th only A is back for A+; by the 22nd A, B (O-) and C (A+) all are
+        self.assertEqual(len(shortages), 1)
+        self.assertEqual(shortages[0]['day'], '2026-03-12')
+        self.assertEqual(shortages[0]['compatible_donors'], 1)
+        self.assertEqual(shortages[0]['needed'], 2)
+
+    def test_cache_until_data_changes(self):
+        first = self.forecast.get(TODAY)
+        self.assertIs(self.forecast.get(TODAY), first)
+        self.assertEqual(self.forecast.hits, 1)
+
+        DonationRequest.create(self.requester.id, 'O-', 'Atar', 'CHA', '2026-03-11', '08:00', '10:00', '')
+        second = self.forecast.get(TODAY)
+        self.assertIsNot(second, first)
+        self.assertEqual(second['shortages'][0]['city'], 'Atar')
+
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET is_available = 1, next_eligible_date = NULL WHERE email = 'c@test.com'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.forecast.supply_on('Rosso', 'A+', '2026-03-10', today=TODAY), 1)
+        self.assertEqual(self.forecast.misses, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.models import User, get_db_connection
+from app.passwords import HashingBusy, PasswordHasher
+from app.utils.ratelimit import SlidingWindowLimiter
+from config import Config
+
+
+class LoginConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='login_'), 'app.db')
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:2000'
+    LOGIN_IP_LIMIT = 8
+    LOGIN_EMAIL_LIMIT = 3
+
+
+class LoginProtectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(LoginConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'Donor A', '20000001', 'a@test.com', 'secret', 'Rosso', 'O-', 'L1')
+        User.create('donor', 'Donor B', '20000002', 'b@test.com', 'secret', 'Rosso', 'O-', 'L2')
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def login(self, email, password, ip='10.0.0.1'):
+        return self.client.post('/auth/login', data={'email': email, 'password': password},
+                                environ_base={'REMOTE_ADDR': ip})
+
+    def test_sliding_window(self):
+        limiter = SlidingWindowLimiter(3, 0.2)
+        self.assertEqual([limiter.hit('k') for _ in range(3)], [0, 0, 0])
+        self.assertGreater(limiter.hit('k'), 0)
+        self.assertEqual(limiter.hit('other'), 0)
+        self.assertGreater(limiter.hit('other', limit=1), 0)
+        time.sleep(0.25)
+        self.assertEqual(limiter.hit('k'), 0)
+
+    def test_failed_logins_lock_the_email_for_that_client(self):
+        for _ in range(3):
+            self.assertEqual(self.login('a@test.com', 'wrong', ip='10.0.0.2').status_code, 200)
+        response = self.login('a@test.com', 'secret', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.login('b@test.com', 'secret', ip='10.0.0.2').status_code, 302)
+        # Someone else failing on purpose does not lock the owner out
+        self.assertEqual(self.login('a@test.com', 'secret', ip='10.0.0.3').status_code, 302)
+
+    def test_attempts_per_ip(self):
+        for i in range(8):
+            self.login(f'nobody{i}@test.com', 'x')
+        self.assertEqual(self.login('a@test.com', 'secret').status_code, 429)
+        self.assertEqual(self.login('a@test.com', 'secret', ip='10.0.0.9').status_code, 302)
+
+    def test_rehash_on_login(self):
+        old = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET password_hash = ? WHERE email = 'a@test.com'", (old,))
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.login('a@test.com', 'secret').status_code, 302)
+        new = User.get_by_email('a@test.com').password_hash
+        self.assertTrue(new.startswith('pbkdf2:sha256:2000$'))
+        self.assertTrue(User.get_by_email('a@test.com').check_password('secret'))
+
+    def test_admission_control(self):
+        hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, queue_limit=2, timeout=5)
+        release = threading.Event()
+        threads = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        while hasher._pending < 3:
+            time.sleep(0.01)
+        with self.assertRaises(HashingBusy):
+            hasher.hash('pw')
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(hasher.stats()['rejected'], 1)
+
+        # Suspect callers only get half the queue
+        release.clear()
+        threads = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(2)]
+        for t in threads:
+            t.start()
+        while hasher._pending < 2:
+            time.sleep(0.01)
+        with self.assertRaises(HashingBusy):
+            hasher.hash('pw', suspect=True)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertTrue(hasher.verify(hasher.hash('pw'), 'pw'))
+        hasher.shutdown()
+
+    def test_timed_out_job_stays_pending_until_done(self):
+        hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, queue_limit=0, timeout=0.05)
+        release = threading.Event()
+        with self.assertRaises(HashingBusy):
+            hasher._run(release.wait)
+        # Still running on the only worker, so there is no room for another
+        self.assertEqual(hasher._pending, 1)
+        with self.assertRaises(HashingBusy):
+            hasher.hash('pw')
+        release.set()
+        while hasher._pending:
+            time.sleep(0.01)
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
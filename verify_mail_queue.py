@@ -0,0 +1,211 @@
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+
+from app import broadcast, create_app
+from app.models import DonationRequest, get_db_connection
+from app.utils.email import MailSender, send_email, queue_depth
+from config import Config
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages; rejects recipients listed in server.reject."""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        self.reply('220 stub ESMTP')
+        rcpt = None
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            if not line:
+                return
+            verb = line.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 stub')
+            elif verb == 'MAIL':
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt = line.split(':', 1)[1].strip(' <>')
+                if rcpt in server.reject:
+                    self.reply('550 No such user')
+                else:
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                server.delivered.append(rcpt)
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubSMTPHandler)
+        self.delivered = []
+        self.reject = set()
+        self.sessions = 0
+
+
+class MailQueueConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='mail_queue_'), 'app.db')
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_RATE = 0
+    MAIL_RETRY_BACKOFF = 0
+
+
+class MailQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.smtp = StubSMTPServer()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        MailQueueConfig.MAIL_PORT = self.smtp.server_address[1]
+
+        self.app = create_app(MailQueueConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM broadcast_notifications")
+        conn.execute("DELETE FROM outbound_mail")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.app_context.pop()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+
+    def test_send_email_only_enqueues(self):
+        self.assertTrue(send_email('a@test.com', 'Hi', 'Body'))
+        self.assertEqual(queue_depth()['queued'], 1)
+        self.assertEqual(self.smtp.delivered, [])
+
+    def test_batch_is_sent_over_one_session(self):
+        for i in range(5):
+            send_email(f'user{i}@test.com', 'Hi', 'Body')
+        sender = MailSender(self.app)
+        self.assertEqual(sender.drain(), 5)
+        sender.transport.close()
+
+        self.assertEqual(sorted(self.smtp.delivered), [f'user{i}@test.com' for i in range(5)])
+        self.assertEqual(self.smtp.sessions, 1)
+        self.assertEqual(queue_depth(), {'queued': 0, 'sending': 0})
+        self.assertEqual(sender.stats()['sent'], 5)
+
+    def test_rejected_recipient_fails_without_blocking_others(self):
+        self.smtp.reject.add('bad@test.com')
+        send_email('bad@test.com', 'Hi', 'Body')
+        send_email('good@test.com', 'Hi', 'Body')
+        sender = MailSender(self.app)
+        sender.drain()
+        sender.transport.close()
+
+        conn = get_db_connection()
+        rows = dict(conn.execute("SELECT to_email, status FROM outbound_mail").fetchall())
+        conn.close()
+        self.assertEqual(rows, {'bad@test.com': 'failed', 'good@test.com': 'sent'})
+
+    def test_unreachable_server_is_retried_with_backoff(self):
+        send_email('later@test.com', 'Hi', 'Body')
+        self.app.config['MAIL_RETRY_BACKOFF'] = 60
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        sender = MailSender(self.app)
+        sender.drain()
+
+        conn = get_db_connection()
+        row = conn.execute(
+            "SELECT status, attempts, next_attempt_at > datetime('now') FROM outbound_mail"
+        ).fetchone()
+        conn.close()
+        self.assertEqual(tuple(row), ('queued', 1, 1))
+        self.assertEqual(sender.stats()['retried'], 1)
+
+    def sos_donors(self):
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users WHERE email LIKE '%@sos.test' OR nni = 'SOS_NO_MAIL'")
+        conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+            "VALUES ('donor', ?, ?, ?, 'x', 'SOS Town', 'O-', ?)",
+            [('Donor A', '44000001', 'a@sos.test', 'SOS_A'), ('Donor B', '44000002', 'b@sos.test', 'SOS_B'),
+             ('No Mail', '44000003', None, 'SOS_NO_MAIL')],
+        )
+        conn.commit()
+        conn.close()
+        return DonationRequest.create(None, 'O-', 'SOS Town', 'CHN', '2026-01-01', '08:00', '10:00', 'sos',
+                                      is_broadcast=True)
+
+    def test_one_sender_per_database(self):
+        senders = [MailSender(self.app) for _ in range(2)]
+        for sender in senders:
+            sender.poll_interval = 0.05
+            sender.start()
+        try:
+            time.sleep(0.2)
+            self.assertEqual(sorted(sender._lock is not None for sender in senders), [False, True])
+            active = next(sender for sender in senders if sender._lock is not None)
+            standby = next(sender for sender in senders if sender is not active)
+            # The other one takes over when the active sender goes away
+            active.stop()
+            time.sleep(0.2)
+            self.assertIsNotNone(standby._lock)
+            send_email('handover@test.com', 'Hi', 'Body')
+            deadline = time.monotonic() + 5
+            while not self.smtp.delivered and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(self.smtp.delivered, ['handover@test.com'])
+        finally:
+            for sender in senders:
+                sender.stop()
+
+    def test_broadcast_is_delivered_through_the_queue(self):
+        request_id = self.sos_donors()
+        broadcast.run_broadcast(self.app, request_id)
+
+        def progress():
+            (b,) = [b for b in broadcast.get_progress(limit=50) if b['id'] == request_id]
+            return {key: b[key] for key in ('queued', 'sent', 'failed', 'total')}
+
+        # Handed to the mail queue is not sent yet
+        self.assertEqual(progress(), {'queued': 2, 'sent': 0, 'failed': 1, 'total': 3})
+        self.assertEqual(queue_depth()['queued'], 2)
+        # Running it again (a resume) queues nobody twice
+        broadcast.run_broadcast(self.app, request_id)
+        self.assertEqual(queue_depth()['queued'], 2)
+
+        self.smtp.reject.add('b@sos.test')
+        sender = MailSender(self.app)
+        sender.drain()
+        sender.transport.close()
+        self.assertEqual(self.smtp.delivered, ['a@sos.test'])
+        self.assertEqual(progress(), {'queued': 0, 'sent': 1, 'failed': 2, 'total': 3})
+
+    def test_interrupted_broadcast_is_resumed(self):
+        request_id = self.sos_donors()
+        # Stopped after the fan-out, before any mail was queued
+        broadcast.fan_out(DonationRequest.get_by_id(request_id))
+        self.assertEqual(queue_depth()['queued'], 0)
+
+        self.assertEqual(broadcast.resume_broadcasts(self.app), [request_id])
+        self.assertEqual(queue_depth()['queued'], 2)
+        self.assertEqual(broadcast.resume_broadcasts(self.app), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
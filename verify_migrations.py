@@ -0,0 +1,136 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from app import create_app, migrations
+from app.migrations import AddColumn, Backfill, CreateIndex, Migration, SQL
+from app.models import SCHEMA_VERSION, get_db_connection
+from config import Config
+
+
+class MigrationsConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='migrations_'), 'app.db')
+
+
+def quiet(line):
+    pass
+
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(MigrationsConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.shipped = migrations.MIGRATIONS
+        self.conn = get_db_connection()
+        self.conn.execute("DELETE FROM users")
+        self.conn.execute("DELETE FROM schema_migrations WHERE version > ?", (migrations.LATEST,))
+        self.conn.executemany(
+            "INSERT INTO users (role, name, phone, email, password_hash, city, blood_type, nni) "
+            "VALUES ('donor', ?, ?, ?, 'x', 'Rosso', 'O+', ?)",
+            [(f'Donor {i}', f'3000{i:04d}', f'd{i}@test.com', f'M{i}') for i in range(25)],
+        )
+        self.conn.commit()
+
+    def tearDown(self):
+        migrations.MIGRATIONS = self.shipped
+        self.conn.close()
+        self.app_context.pop()
+
+    def add(self, *extra):
+        migrations.MIGRATIONS = self.shipped + list(extra)
+
+    def test_new_database_is_stamped(self):
+        self.assertEqual(self.conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        self.assertTrue(all(state.startswith('applied') for _, _, state in migrations.status(self.conn)))
+        self.assertEqual(migrations.plan(self.conn), [])
+
+    def test_steps_run_in_order_and_failed_steps_roll_back(self):
+        log = []
+        self.add(
+            Migration(90, 'add_badge', [AddColumn('users', 'badge', 'TEXT'),
+                                        CreateIndex('idx_users_badge', 'users', 'badge', where='badge IS NOT NULL')]),
+            Migration(91, 'badges', [
+                SQL("UPDATE users SET badge = 'gold' WHERE id % 2 = 0"),
+                SQL("UPDATE users SET badge = 'silver' WHERE badge IS NULL", "UPDATE no_such_table SET x = 1"),
+            ]),
+        )
+        with self.assertRaises(sqlite3.OperationalError):
+            migrations.migrate(self.conn, log=log.append)
+        self.assertEqual([line for line in log if line.startswith('Migration')], ['Migration 90 add_badge', 'Migration 91 badges'])
+        self.assertEqual(migrations.status(self.conn)[-1], (91, 'badges', 'stopped at step 2 of 2'))
+        # The silver update went back with the failing statement
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM users WHERE badge = 'silver'").fetchone()[0], 0)
+        gold = self.conn.execute("SELECT COUNT(*) FROM users WHERE badge = 'gold'").fetchone()[0]
+
+        # Fix the failing step; the first one must not run again
+        migrations.MIGRATIONS[-1].steps[1] = SQL("UPDATE users SET badge = 'silver' WHERE badge IS NULL")
+        self.conn.execute("UPDATE users SET badge = 'bronze' WHERE badge = 'gold'")
+        self.conn.commit()
+        self.assertEqual(migrations.migrate(self.conn, log=quiet), [91])
+        counts = dict(self.conn.execute("SELECT badge, COUNT(*) FROM users GROUP BY badge").fetchall())
+        self.assertEqual(counts, {'bronze': gold, 'silver': 25 - gold})
+
+    def test_backfill_resumes_after_interruption(self):
+        calls = []
+
+        def double_phone(conn, start, end):
+            calls.append(start)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return conn.execute("UPDATE users SET phone = phone || 'x' WHERE rowid > ? AND rowid <= ?", (start, end)).rowcount
+
+        first = self.conn.execute("SELECT MIN(rowid) FROM users").fetchone()[0] - 1
+        self.add(Migration(90, 'phones', [Backfill('users', double_phone, 'mark phones')]))
+        with self.assertRaises(KeyboardInterrupt):
+            migrations.migrate(self.conn, batch_size=5, log=quiet)
+        self.assertEqual(migrations.status(self.conn)[-1][2], f'stopped at step 1 of 1, rowid {first + 10}')
+        ((_, _, rows),) = migrations.plan(self.conn)
+        self.assertEqual(rows, 25 - 10)
+
+        self.assertEqual(migrations.migrate(self.conn, batch_size=5, log=quiet), [90])
+        self.assertEqual(calls, [first, first + 5, first + 10, first + 10, first + 15, first + 20])
+        phones = [row[0] for row in self.conn.execute("SELECT phone FROM users")]
+        self.assertTrue(all(phone.endswith('x') and not phone.endswith('xx') for phone in phones))
+
+    def test_dry_run_changes_nothing(self):
+        self.add(Migration(90, 'add_badge', [AddColumn('users', 'badge', 'TEXT'),
+                                             CreateIndex('idx_users_badge', 'users', 'badge')]))
+        before = self.conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+        steps = migrations.plan(self.conn)
+        self.assertEqual([(m.version, step.description, rows) for m, step, rows in steps], [
+            (90, 'ALTER TABLE users ADD COLUMN badge TEXT', 0),
+            (90, 'CREATE INDEX IF NOT EXISTS idx_users_badge ON users (badge)', 25),
+        ])
+        self.assertEqual(self.conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall(), before)
+        self.assertEqual(migrations.status(self.conn)[-1], (90, 'add_badge', 'pending'))
+
+
+class UpgradeTestCase(unittest.TestCase):
+    def test_repository_database_upgrades(self):
+        # The tracked app.db predates the migrations, and most of the tables
+        # they change; schema.sql creates those afterwards
+        directory = tempfile.mkdtemp(prefix='upgrade_')
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.db'), directory)
+
+        class UpgradeConfig(Config):
+            TESTING = True
+            DATABASE = os.path.join(directory, 'app.db')
+
+        app = create_app(UpgradeConfig)
+        with app.app_context():
+            conn = get_db_connection()
+            try:
+                self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+                self.assertEqual(migrations.pending(conn), [])
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(broadcast_notifications)")]
+                self.assertIn('mail_id', columns)
+            finally:
+                conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
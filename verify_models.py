@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app
+from app.geo import MAX_RADIUS_KM
+from app.models import ContactRequest, DonationRequest, User, get_db_connection
+from config import Config
+
+
+class ModelsConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='models_'), 'app.db')
+
+
+class ModelsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(ModelsConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        for table in ('contact_requests', 'donations', 'donation_requests', 'users'):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        conn.close()
+        User.create('requester', 'Req', '20000001', 'req@test.com', 'pass', 'Rosso', None, 'M1')
+        User.create('donor', 'Donor', '20000002', 'donor@test.com', 'pass', 'Rosso', 'O-', 'M2')
+        self.requester = User.get_by_email('req@test.com')
+        self.donor = User.get_by_email('donor@test.com')
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_listings_skip_secrets(self):
+        self.assertTrue(self.donor.password_hash.startswith('scrypt:'))
+        listed = {user.email: user for user in User.get_all_users()}
+        self.assertIsNone(listed['donor@test.com'].password_hash)
+        self.assertIsNone(listed['donor@test.com'].nni)
+        self.assertEqual(listed['donor@test.com']['name'], 'Donor')
+        # Columns a query didn't select fall back to the class defaults
+        self.assertIs(listed['donor@test.com'].is_available, True)
+        self.assertIsNone(User.get_by_id(self.donor.id).password_hash)
+        self.assertFalse(hasattr(self.donor, '__dict__'))
+
+    def test_requests_and_contacts(self):
+        DonationRequest.create(self.requester.id, 'O-', 'Rosso', 'CHR', '2030-01-01', '08:00', '10:00', 'Urgent')
+        compatible = DonationRequest.get_compatible_requests('Rosso', 'O-')
+        self.assertEqual([(r.message, r.exact_match) for r in compatible], [('Urgent', 1)])
+        self.assertIsNone(compatible[0].requester_id)
+        full = DonationRequest.get_by_id(compatible[0].id)
+        self.assertEqual(full.requester_id, self.requester.id)
+
+        ContactRequest.create(self.requester.id, self.donor.id)
+        [contact] = ContactRequest.get_requests_for_donor(self.donor.id)
+        self.assertEqual((contact.requester_name, contact.status), ('Req', 'pending'))
+
+    def test_unknown_columns_raise(self):
+        with self.assertRaises(TypeError):
+            User(id=1, password='plain')
+        conn = get_db_connection()
+        cursor = User.cursor(conn)
+        try:
+            with self.assertRaises(TypeError):
+                cursor.execute("SELECT id, 1 AS score FROM users").fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def test_nearest_search_radius_is_bounded(self):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = self.requester.id
+            sess['role'] = 'requester'
+
+        def browse(radius):
+            return client.get('/requester/browse_donors', query_string={
+                'mode': 'nearest', 'city': 'Rosso', 'blood_type': 'O-', 'radius': radius})
+
+        for radius in ('inf', 'nan', '-5', '0'):
+            response = browse(radius)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'Search radius must be a positive number', response.data)
+        with mock.patch('app.geo.nearest_donors', return_value=[]) as nearest:
+            self.assertEqual(browse('200000').status_code, 200)
+        self.assertEqual(nearest.call_args.kwargs['radius_km'], MAX_RADIUS_KM)
+
+
+if __name__ == '__main__':
+    unittest.main()
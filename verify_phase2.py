@@ -1,13 +1,18 @@
-
+import os
+import tempfile
 import unittest
 from app import create_app
 from app.models import User, ContactRequest
 import mysql.connector
 from config import Config
 
+class Phase2Config(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='phase2_'), 'app.db')
+
 class Phase2FeaturesTestCase(unittest.TestCase):
     def setUp(self):
-        self.app = create_app()
+        self.app = create_app(Phase2Config)
         self.client = self.app.test_client()
         self.app.config['TESTING'] = True
         
@@ -38,7 +43,7 @@ class Phase2FeaturesTestCase(unittest.TestCase):
         self.assertEqual(user.role, 'both')
         self.assertTrue(user.is_donor)
         self.assertTrue(user.is_requester)
-        self.assertTrue(User.check_nni_exists(nni))
+        self.assertEqual(user.nni, nni)
 
     def test_nni_uniqueness(self):
         email1 = "nni1@example.com"
@@ -51,9 +56,10 @@ class Phase2FeaturesTestCase(unittest.TestCase):
         # Register first
         User.create('donor', 'U1', '111', email1, 'pass', 'City', 'A+', nni)
         
-        # Try register second with same NNI via route logic check (mock request)
-        # Here we just check the static method returns true
-        self.assertTrue(User.check_nni_exists(nni))
+        # Registering a second user with the same NNI is refused
+        user, errors = User.register('donor', 'U2', '112', email2, 'pass', 'City', 'A+', nni)
+        self.assertIsNone(user)
+        self.assertEqual(errors.get('nni'), 'nni_exists_error')
         
         # Cleanup
         self.cleanup_user(email1)
@@ -1,13 +1,20 @@
+import os
+import tempfile
 import unittest
 import uuid
 import traceback
 from app import create_app
 from app.models import User, ContactRequest, get_db_connection
 from datetime import date, timedelta
+from config import Config
+
+class Phase4Config(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='phase4_'), 'app.db')
 
 class Phase4TestCase(unittest.TestCase):
     def setUp(self):
-        self.app = create_app()
+        self.app = create_app(Phase4Config)
         self.app.config['TESTING'] = True
         self.app_context = self.app.app_context()
         self.app_context.push()
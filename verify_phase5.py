@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import uuid
 import traceback
@@ -5,10 +7,15 @@ import time
 from datetime import datetime, timedelta
 from app import create_app
 from app.models import User, ContactRequest, get_db_connection
+from config import Config
+
+class Phase5Config(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='phase5_'), 'app.db')
 
 class Phase5TestCase(unittest.TestCase):
     def setUp(self):
-        self.app = create_app()
+        self.app = create_app(Phase5Config)
         self.app.config['TESTING'] = True
         self.app_context = self.app.app_context()
         self.app_context.push()
@@ -0,0 +1,182 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app import analytics, broadcast, export, forecast, roster
+from app.utils import email
+from app.models import User, DonationRequest, Donation, ContactRequest, Message, get_db_connection
+from config import Config
+
+
+class QueryPlanConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='query_plans_'), 'app.db')
+
+
+# The only statements allowed to SCAN rather than SEARCH, each with the one
+# plan step it may have. Anything else walking a table or a whole index fails.
+ALLOWED_SCANS = [
+    # Unpaginated listings: reading every row is the point
+    (r'^SELECT [\w, ]+ FROM users ORDER BY created_at DESC$', 'SCAN users USING INDEX idx_users_created_at'),
+    (r'^SELECT [\w, ]+ FROM messages ORDER BY created_at DESC$', 'SCAN messages USING INDEX idx_messages_created_at'),
+    # First page, newest first: walks the index from the end and stops at LIMIT
+    (r'^SELECT [\w, ]+ FROM users WHERE 1 = 1 ORDER BY created_at DESC, id DESC LIMIT \d+$',
+     'SCAN users USING INDEX idx_users_created_at'),
+    (r'^SELECT [\w, ]+ FROM messages WHERE 1 = 1 ORDER BY created_at DESC, id DESC LIMIT \d+$',
+     'SCAN messages USING INDEX idx_messages_created_at'),
+    (r'^SELECT [\w, ]+ FROM messages WHERE 1 = 1 AND is_read = 0 ORDER BY created_at DESC, id DESC LIMIT \d+$',
+     'SCAN messages USING INDEX idx_messages_unread'),
+    (r'^SELECT [\w, ]+ FROM messages WHERE 1 = 1 AND is_read = 1 ORDER BY created_at DESC, id DESC LIMIT \d+$',
+     'SCAN messages USING INDEX idx_messages_read'),
+    (r'^SELECT [\w, ]+ FROM donation_requests WHERE is_broadcast = 1 ORDER BY created_at DESC LIMIT \d+$',
+     'SCAN donation_requests USING INDEX idx_requests_broadcast'),
+    # Same, on the table's own key
+    (r'^SELECT \* FROM roster_imports ORDER BY id DESC LIMIT \d+$', 'SCAN roster_imports'),
+    (r'^SELECT day FROM rollup_dirty_days ORDER BY day LIMIT \d+$', 'SCAN rollup_dirty_days'),
+    # Partial indexes holding only the rows asked for
+    (r"^SELECT COUNT\(\*\) FROM outbound_mail WHERE status = 'queued'$",
+     'SCAN outbound_mail USING INDEX idx_outbound_mail_due'),
+    (r"^SELECT COUNT\(\*\) FROM outbound_mail WHERE status = 'sending'$",
+     'SCAN outbound_mail USING INDEX idx_outbound_mail_sending'),
+    (r'^UPDATE messages SET is_read = 1 WHERE is_read = 0$', 'SCAN messages USING INDEX idx_messages_unread'),
+]
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Run EXPLAIN QUERY PLAN on every statement the models issue and fail on unexpected scans."""
+
+    def setUp(self):
+        self.statements = []
+        connect = db.ConnectionPool._connect
+
+        def traced_connect(pool):
+            conn = connect(pool)
+            conn.set_trace_callback(self.statements.append)
+            return conn
+
+        self.patcher = mock.patch.object(db.ConnectionPool, '_connect', traced_connect)
+        self.patcher.start()
+        db.get_pool(QueryPlanConfig.DATABASE).close_all()
+
+        self.app = create_app(QueryPlanConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app_context.pop()
+        self.patcher.stop()
+
+    def exercise_models(self):
+        User.create('donor', 'Plan Donor', '1111', 'plan_donor@test.com', 'pass', 'Nouakchott', 'O-', 'PLAN_D')
+        User.create('requester', 'Plan Req', '2222', 'plan_req@test.com', 'pass', 'Nouakchott', None, 'PLAN_R')
+        donor = User.get_by_email('plan_donor@test.com')
+        requester = User.get_by_id(User.get_by_email('plan_req@test.com').id)
+
+        User.get_all_users()
+        _, cursor = User.get_users_page(per_page=1)
+        User.get_users_page(cursor=cursor, per_page=1)
+        User.get_users_page(role='donor', cursor=cursor)
+        User.get_users_page(is_active=True, cursor=cursor)
+        User.get_users_page(role='donor', is_active=False, cursor=cursor)
+        User.search('plan')
+        User.search('محمد', role='donor', is_active=True, page=2)
+        User.register('donor', 'Dup', '33000009', 'plan_donor@test.com', 'pw', 'Atar', 'O+', 'PLAN_D')
+        User.get_active_donors()
+        User.get_active_donors('Nouakchott')
+        User.get_active_donors(None, 'O-')
+        User.get_active_donors('Nouakchott', 'O-')
+        User.get_compatible_donors('A+')
+        User.get_compatible_donors('A+', 'Nouakchott', available_only=True)
+        donor.set_cooldown()
+        User.reactivate_expired()
+        User.toggle_active(donor.id)
+
+        DonationRequest.create(requester.id, 'O-', 'Nouakchott', 'CHN', '2026-01-01', '08:00', '10:00', 'plan')
+        DonationRequest.get_open_requests('Nouakchott', 'O-')
+        DonationRequest.get_compatible_requests('Nouakchott', 'O-')
+        DonationRequest.get_by_requester(requester.id)
+        DonationRequest.get_by_id(1)
+        Donation.create(1, donor.id)
+
+        request_id = DonationRequest.create(requester.id, 'O-', 'Nouakchott', 'CHN', '2026-01-01', '08:00', '10:00', 'sos', is_broadcast=True)
+        sos = DonationRequest.get_by_id(request_id)
+        broadcast.fan_out(sos)
+        broadcast.queue_mail(sos)
+        broadcast.get_progress()
+
+        email.send_email('plan@test.com', 'Plan', 'Body')
+        email.queue_depth()
+        email.MailSender(self.app, transport=email.MockTransport()).drain()
+
+        ContactRequest.create(requester.id, donor.id)
+        ContactRequest.get_requests_for_donor(donor.id)
+        ContactRequest.check_status(requester.id, donor.id)
+        ContactRequest.update_status(1, 'approved')
+
+        Message.create('Plan', 'plan@test.com', 'hello')
+        Message.get_all()
+        _, cursor = Message.get_page(per_page=1)
+        Message.get_page(cursor=cursor)
+        Message.get_page(is_read=False, cursor=cursor)
+        Message.get_page(is_read=True, cursor=cursor)
+        Message.search('hello')
+        Message.search('plan', is_read=False, page=2)
+        Message.get_unread_count()
+        Message.mark_read(1)
+        Message.mark_many_read([1, 2])
+        Message.mark_all_read()
+
+        summary = roster.import_roster(io.StringIO(
+            "name,phone,email,city,blood_type,nni,password\n"
+            "Roster One,33000001,roster1@test.com,Atar,O+,RP1,pw\n"
+            "Roster Two,1111,,Atar,O+,,\n"
+        ), 'plan.csv', workers=1)
+        roster.get_imports()
+        roster.get_errors(summary['import_id'])
+
+        analytics.refresh_rollups()
+        analytics.trend(days=7)
+        analytics.trend('Nouakchott', 'O-', days=7)
+        analytics.rollup_cities()
+        forecast.get_supply_forecast().get()
+
+        for name in export.EXPORTS:
+            list(export.stream_export(name, batch_size=1))
+            list(export.stream_export(name, 'jsonl', since='2020-01-01', until='2030-01-01', city='Nouakchott'))
+
+        # Admin dashboard counters run outside the models
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = requester.id
+            sess['role'] = 'admin'
+        self.client.get('/admin/dashboard')
+
+    def test_no_full_table_scans(self):
+        # Only what the models run on behalf of requests, not startup DDL/backfills
+        del self.statements[:]
+        self.exercise_models()
+
+        queries = [s for s in self.statements if re.match(r'\s*(SELECT|UPDATE|DELETE)\b', s, re.I)]
+        self.assertTrue(queries, "No model queries were captured.")
+
+        conn = get_db_connection()
+        try:
+            for sql in queries:
+                statement = ' '.join(sql.split())
+                plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+                for step in plan:
+                    # "SCAN t VIRTUAL TABLE" is an FTS5 MATCH or rowid lookup, or json_each
+                    # over a list parameter; every other SCAN must be listed in ALLOWED_SCANS
+                    if not step.startswith('SCAN') or 'VIRTUAL TABLE' in step:
+                        continue
+                    if not any(step == allowed and re.search(pattern, statement) for pattern, allowed in ALLOWED_SCANS):
+                        self.fail(f"Unexpected scan in:\n  {statement}\nplan: {plan}")
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import create_app
+from app.db import ConnectionPool, refresh_snapshot
+from app.models import User, get_db_connection
+from config import Config
+
+directory = tempfile.mkdtemp(prefix='read_pool_')
+
+
+class ReadPoolConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(directory, 'app.db')
+    DB_SNAPSHOT_PATH = os.path.join(directory, 'snapshot.db')
+    DONOR_INDEX_ENABLED = False
+
+
+class ReadPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(ReadPoolConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'Donor One', '12000001', 'one@test.com', 'pass', 'Rosso', 'O+', 'R1')
+        self.donor = User.get_by_email('one@test.com')
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.donor.id
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def checkouts(self, name):
+        stats = self.app.extensions[name].stats()
+        return stats['hits'] + stats['misses']
+
+    def test_get_reads_through_read_only_pool(self):
+        writes, reads = self.checkouts('db_pool'), self.checkouts('db_read_pool')
+        self.assertEqual(self.client.get('/admin/users').status_code, 200)
+        self.assertEqual(self.checkouts('db_pool'), writes)
+        self.assertGreater(self.checkouts('db_read_pool'), reads)
+
+        conn = self.app.extensions['db_read_pool'].acquire()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM users")
+        finally:
+            conn.close()
+
+    def test_marked_get_handlers_can_write(self):
+        self.client.get(f'/admin/toggle_user/{self.donor.id}')
+        self.assertFalse(User.get_by_id(self.donor.id).is_active)
+        # Outside a request, connections still come from the writer pool
+        self.assertFalse(self.app.extensions['db_pool'].stats()['readonly'])
+
+    def test_reports_read_the_snapshot(self):
+        def exported():
+            return self.client.get('/admin/export/users').get_data(as_text=True)
+
+        snapshot = self.app.extensions['db_snapshot_pool']
+        if os.path.exists(snapshot.database):
+            os.remove(snapshot.database)
+        # No snapshot yet: the live database through the read-only pool
+        self.assertIn('one@test.com', exported())
+
+        refresh_snapshot(self.app)
+        User.create('donor', 'Donor Two', '12000002', 'two@test.com', 'pass', 'Rosso', 'A+', 'R2')
+        self.assertNotIn('two@test.com', exported())
+        self.assertEqual(self.client.get('/admin/users').get_data(as_text=True).count('two@test.com'), 1)
+
+        refresh_snapshot(self.app)
+        self.assertIn('two@test.com', exported())
+
+    def test_replaced_snapshot_reaches_every_pool(self):
+        path = os.path.join(directory, 'shared_snapshot.db')
+
+        def write(value):
+            partial = path + '.tmp'
+            conn = sqlite3.connect(partial)
+            conn.execute("CREATE TABLE t (v TEXT)")
+            conn.execute("INSERT INTO t VALUES (?)", (value,))
+            conn.commit()
+            conn.close()
+            os.replace(partial, path)
+
+        def read(pool):
+            conn = pool.acquire()
+            try:
+                return conn.execute("SELECT v FROM t").fetchone()[0]
+            finally:
+                conn.close()
+
+        # One pool per worker process; only the first one's process refreshes
+        write('old')
+        refreshing, other = ConnectionPool(path, immutable=True), ConnectionPool(path, immutable=True)
+        self.assertEqual((read(refreshing), read(other)), ('old', 'old'))
+        write('new')
+        refreshing.recycle()
+        self.assertEqual((read(refreshing), read(other)), ('new', 'new'))
+        refreshing.close_all()
+        other.close_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from app import create_app
+from app.models import User, get_db_connection
+from config import Config
+
+
+class RegistrationConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='registration_'), 'app.db')
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_QUEUE = 1000
+
+
+class RegistrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(RegistrationConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_register_returns_user_and_field_errors(self):
+        user, errors = User.register('donor', 'Donor A', '20000001', 'a@test.com', 'pw', 'Rosso', 'O-', 'R1')
+        self.assertEqual(errors, {})
+        self.assertEqual((user.name, user.email, user.password_hash), ('Donor A', 'a@test.com', None))
+        self.assertTrue(User.get_by_email('a@test.com').check_password('pw'))
+
+        _, errors = User.register('donor', 'Copy', '20000001', 'a@test.com', 'pw', 'Rosso', 'O-', 'R2')
+        self.assertEqual(errors, {'phone': 'phone_exists_error', 'email': 'email_exists_error'})
+        _, errors = User.register('donor', 'Copy', '123456789', None, 'pw', 'Rosso', 'O-', 'R12345678901')
+        self.assertEqual(set(errors), {'phone', 'nni'})
+
+        # Blank email and NNI are stored as NULL, so they never collide
+        for i, phone in enumerate(('20000002', '20000003')):
+            user, errors = User.register('requester', f'R{i}', phone, '', 'pw', 'Atar', None, '')
+            self.assertEqual(errors, {})
+            self.assertIsNone(user.email)
+
+    def test_register_page_flashes_field_errors(self):
+        User.register('donor', 'Donor A', '20000001', 'a@test.com', 'pw', 'Rosso', 'O-', 'R1')
+        client = self.app.test_client()
+        response = client.post('/auth/register', data={
+            'role': 'donor', 'name': 'B', 'phone': '20000001', 'email': 'b@test.com', 'password': 'pw',
+            'city': 'Rosso', 'blood_type': 'O+', 'nni': 'R1',
+        })
+        self.assertIn(b'This phone number is already registered.', response.data)
+        self.assertIn(b'This NNI is already registered.', response.data)
+        response = client.post('/auth/register', data={
+            'role': 'donor', 'name': 'B', 'phone': '20000009', 'email': '', 'password': 'pw',
+            'city': 'Rosso', 'blood_type': 'O+', 'nni': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        with client.session_transaction() as sess:
+            self.assertEqual(sess['name'], 'B')
+
+    def test_concurrent_signups(self):
+        # 40 threads, every phone wanted by four of them and every NNI by two
+        results, start = [], threading.Barrier(40)
+
+        def sign_up(i):
+            start.wait()
+            with self.app.app_context():
+                results.append(User.register('donor', f'D{i}', f'3000{i % 10:04d}', f'd{i}@test.com', 'pw',
+                                             'Atar', 'O+', f'N{i % 20}'))
+
+        threads = [threading.Thread(target=sign_up, args=(i,)) for i in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        created = [user for user, _ in results if user]
+        self.assertEqual(len(results), 40)
+        self.assertEqual(len(created), 10)
+        self.assertEqual(len({user.phone for user in created}), 10)
+        self.assertEqual(len({user.id for user in created}), 10)
+        for user, errors in results:
+            if user is None:
+                self.assertTrue(set(errors) <= {'phone', 'nni'} and errors)
+        conn = get_db_connection()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 10)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
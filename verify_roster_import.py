@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from app import create_app
+from app.models import User, get_db_connection
+from app.roster import import_roster, get_errors, get_imports
+from config import Config
+
+
+class RosterConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='roster_'), 'app.db')
+    ROSTER_HASH_WORKERS = 2
+
+
+ROSTER = """name,phone,email,city,blood_type,nni,password
+Amadou Ba,30000001,amadou@test.com,Kaedi,O+,R1,secret1
+Mariem Sy,30000002,,Rosso,a-,R2,
+Existing Donor,30000099,other@test.com,Atar,B+,R3,
+No Phone,,,Atar,B+,,
+Bad Blood,30000004,,Atar,C+,,
+Amadou Again,30000001,again@test.com,Kaedi,O+,,
+Taken Email,30000005,taken@test.com,Atar,AB+,,
+"""
+
+
+class RosterImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(RosterConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'Registered', '30000099', 'taken@test.com', 'pass', 'Atar', 'O+', 'R9')
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_import_with_error_report(self):
+        summary = import_roster(io.StringIO(ROSTER), 'test.csv', batch_size=2, workers=2)
+        self.assertEqual((summary['total_rows'], summary['imported'], summary['rejected']), (7, 2, 5))
+        self.assertEqual(get_errors(summary['import_id']), [
+            (4, 'phone already registered'),
+            (5, 'missing phone'),
+            (6, 'unknown blood type C+'),
+            (7, 'duplicate phone earlier in the file'),
+            (8, 'email already registered'),
+        ])
+
+        amadou = User.get_by_email('amadou@test.com')
+        self.assertTrue(amadou.check_password('secret1'))
+        conn = get_db_connection()
+        mariem = conn.execute("SELECT blood_type, password_hash FROM users WHERE phone = '30000002'").fetchone()
+        status = conn.execute("SELECT status FROM roster_imports WHERE id = ?", (summary['import_id'],)).fetchone()[0]
+        conn.close()
+        self.assertEqual(mariem['blood_type'], 'A-')
+        self.assertFalse(User(id=0, role='donor', name='', phone='', email='', password_hash=mariem['password_hash'],
+                              city='').check_password(''))
+        self.assertEqual(status, 'done')
+
+    def test_admin_upload_runs_in_background(self):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'admin'
+        response = client.post('/admin/import', data={'roster': (io.BytesIO(ROSTER.encode()), 'upload.csv')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+
+        for _ in range(100):
+            latest = get_imports(limit=1)[0]
+            if latest['status'] != 'running':
+                break
+            time.sleep(0.1)
+        self.assertEqual((latest['source'], latest['status'], latest['imported']), ('upload.csv', 'done', 2))
+        report = client.get(f"/admin/import/{latest['id']}/errors").data.decode().splitlines()
+        self.assertEqual(report[:2], ['line,reason', '4,phone already registered'])
+
+
+if __name__ == '__main__':
+    unittest.main()
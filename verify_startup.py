@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from app import create_app, db
+from app.scheduler import Scheduler
+from app.models import SCHEMA_VERSION, get_db_connection, init_database, schema_version
+from config import Config
+
+
+class StartupConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='startup_'), 'app.db')
+
+
+class StartupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(StartupConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def execute(self, sql):
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(sql).fetchall()
+            conn.commit()
+            return [tuple(row) for row in rows]
+        finally:
+            conn.close()
+
+    def test_schema_only_applied_when_behind(self):
+        self.assertEqual(self.execute("PRAGMA user_version"), [(SCHEMA_VERSION,)])
+        self.assertFalse(init_database())
+
+        # The seeds in apply_schema would put the city back
+        self.execute("DELETE FROM cities WHERE name = 'Rosso'")
+        create_app(StartupConfig)
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM cities WHERE name = 'Rosso'"), [(0,)])
+
+        self.execute("PRAGMA user_version = 0")
+        create_app(StartupConfig)
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM cities WHERE name = 'Rosso'"), [(1,)])
+
+    def test_concurrent_upgrade_applies_once(self):
+        self.execute("PRAGMA user_version = 0")
+        results, start = [], threading.Barrier(4)
+
+        def boot():
+            start.wait()
+            with self.app.app_context():
+                results.append(init_database())
+
+        threads = [threading.Thread(target=boot) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(results), [False, False, False, True])
+        conn = get_db_connection()
+        try:
+            self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+        finally:
+            conn.close()
+
+    def test_scheduler_runs_in_one_process_after_one_interval(self):
+        runs = []
+        first, second = Scheduler(self.app), Scheduler(self.app)
+        for scheduler in (first, second):
+            scheduler.lock_poll = 0.05
+            scheduler.add_job('count', 0.4, lambda scheduler=scheduler: runs.append(scheduler))
+        first.start()
+        try:
+            threading.Event().wait(0.1)
+            self.assertEqual(runs, [])
+            # The lock is per open file, so a second scheduler here stands in
+            # for another worker process
+            second.start()
+            threading.Event().wait(0.5)
+            self.assertEqual(runs, [first])
+            self.assertIsNone(second._lock)
+
+            # The other one takes over when the first goes away
+            first.stop()
+            threading.Event().wait(0.4)
+            self.assertEqual(runs[-1], second)
+        finally:
+            first.stop()
+            second.stop()
+        lock = db.try_lock(self.app.config['DATABASE'] + '.scheduler.lock')
+        self.assertIsNotNone(lock)
+        lock.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+
+from app import create_app
+from app.models import User, get_db_connection
+from app.user_cache import UserCache, get_user_cache
+from config import Config
+
+
+class UserCacheConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='user_cache_'), 'app.db')
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+
+class UserCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(UserCacheConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'Donor A', '20000001', 'a@test.com', 'secret', 'Rosso', 'O-', 'C1')
+        self.user_id = User.get_by_email('a@test.com').id
+        self.cache = get_user_cache()
+        self.cache.clear()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_dashboard_reuses_cached_user(self):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['role'] = 'donor'
+        self.assertEqual(client.get('/donor/dashboard').status_code, 200)
+        self.assertEqual(client.get('/donor/dashboard').status_code, 200)
+        # Loaded from the database once; after that from g or the cache
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_projection_and_copies(self):
+        user = self.cache.get(self.user_id)
+        self.assertIsNone(user.password_hash)
+        self.assertFalse(user.check_password('secret'))
+        self.assertTrue(User.get_by_email('a@test.com').check_password('secret'))
+        user.is_available = False
+        self.assertTrue(self.cache.get(self.user_id).is_available)
+
+    def test_writes_invalidate(self):
+        self.assertTrue(self.cache.get(self.user_id).is_active)
+        User.toggle_active(self.user_id)
+        self.assertFalse(self.cache.get(self.user_id).is_active)
+
+        self.cache.get(self.user_id).set_cooldown()
+        self.assertFalse(self.cache.get(self.user_id).is_available)
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_ttl_and_size(self):
+        cache = UserCache(max_size=1, ttl=0.05)
+        cache.get(self.user_id)
+        cache.get(self.user_id)
+        time.sleep(0.06)
+        cache.get(self.user_id)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIsNone(cache.get(999999))
+        self.assertEqual(cache.stats()['size'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import create_app
+from app.models import User, get_db_connection
+from config import Config
+
+
+class UserSearchConfig(Config):
+    TESTING = True
+    DATABASE = os.path.join(tempfile.mkdtemp(prefix='user_search_'), 'app.db')
+
+
+class UserSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(UserSearchConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.commit()
+        conn.close()
+        User.create('donor', 'مُحَمَّد ولد أحمد', '22113344', 'med@test.com', 'pass', 'Nouakchott', 'O+', 'S1')
+        User.create('donor', 'Fatimetou Mint Sidi', '36000001', 'fatim@test.com', 'pass', 'Rosso', 'A+', 'S2')
+        User.create('requester', 'Mohammed Salem', '46000002', 'salem@test.com', 'pass', 'Kiffa', None, 'S3')
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def names(self, query, **kwargs):
+        rows, _ = User.search(query, **kwargs)
+        return [row['name'] for row in rows]
+
+    def test_arabic_query_ignores_diacritics_and_alef_forms(self):
+        self.assertEqual(self.names('احمد'), ['مُحَمَّد ولد أحمد'])
+        self.assertEqual(self.names('محمد ولد'), ['مُحَمَّد ولد أحمد'])
+
+    def test_latin_and_arabic_spellings_find_each_other(self):
+        self.assertEqual(sorted(self.names('mohamed')), ['Mohammed Salem', 'مُحَمَّد ولد أحمد'])
+        self.assertEqual(self.names('فاطمة'), ['Fatimetou Mint Sidi'])
+
+    def test_prefix_email_phone_and_city(self):
+        self.assertEqual(self.names('fati'), ['Fatimetou Mint Sidi'])
+        self.assertEqual(self.names('salem@test'), ['Mohammed Salem'])
+        self.assertEqual(self.names('221133'), ['مُحَمَّد ولد أحمد'])
+        self.assertEqual(self.names('kif'), ['Mohammed Salem'])
+
+    def test_filters_and_pages(self):
+        self.assertEqual(self.names('mohamed', role='requester'), ['Mohammed Salem'])
+        rows, has_next = User.search('test', per_page=2)
+        self.assertEqual((len(rows), has_next), (2, True))
+        rows, has_next = User.search('test', per_page=2, page=2)
+        self.assertEqual((len(rows), has_next), (1, False))
+
+    def test_index_follows_updates_and_deletes(self):
+        # Any connection can write users; no app SQL functions needed
+        conn = sqlite3.connect(UserSearchConfig.DATABASE)
+        conn.execute("UPDATE users SET name = 'Khadija Mint Ely' WHERE email = 'fatim@test.com'")
+        conn.execute("DELETE FROM users WHERE email = 'salem@test.com'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.names('salem'), [])
+        # The update is queued until the next sync; the app's own writes sync too
+        self.assertEqual(self.names('fatimetou'), ['Khadija Mint Ely'])
+        User.create('donor', 'Sidi Ely', '36000009', 'sidi@test.com', 'pass', 'Rosso', 'B+', 'S9')
+        self.assertEqual(self.names('خديجة'), ['Khadija Mint Ely'])
+        self.assertEqual(self.names('fatimetou'), [])
+        self.assertEqual(self.names('sidi@test'), ['Sidi Ely'])
+
+    def test_startup_indexes_rows_written_meanwhile(self):
+        conn = sqlite3.connect(UserSearchConfig.DATABASE)
+        conn.execute("UPDATE users SET city = 'Atar' WHERE email = 'salem@test.com'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.names('atar'), [])
+        create_app(UserSearchConfig)
+        self.assertEqual(self.names('atar'), ['Mohammed Salem'])
+
+if __name__ == '__main__':
+    unittest.main()